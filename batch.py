@@ -0,0 +1,247 @@
+"""Analysis of many positions and self-play of many games at once.
+
+Positions are read from an iterator (or a file with one position per
+line: a board string optionally followed by "b" or "r" for the player to
+move, black by default) and handed to a pool of worker processes through
+a bounded queue so that arbitrarily large inputs can be streamed.
+Results come back as soon as they are ready, i.e. not necessarily in the
+order of the input, as dictionaries (printed as JSON lines by the
+command line interface) with the index of the position in the input.
+
+Usage:
+  python batch.py analyze [--depth D | --time T] [--workers N] [--input F]
+  python batch.py selfplay --games N [--depth D | --time T] [--workers N]
+                           [--records F]
+
+The summary printed to stderr at the end gives the throughput in
+positions (or games) per second per worker.  Self-play games can also be
+appended to a record file (see records.py) with --records.
+"""
+__author__ = 'lhurd'
+
+import argparse
+import json
+import multiprocessing
+import sys
+import threading
+import time
+
+import history
+import records
+import tree_search
+from moves_test import STARTING_BOARD
+from transposition import DEFAULT_SIZE, TranspositionTable
+
+QUEUE_SIZE = 64
+MAX_GAME_MOVES = 200
+
+
+def parse_position(line):
+    """Parse a line of the input file.
+
+    Args:
+      line: board string optionally followed by "b" or "r"
+
+    Returns:
+      tuple of board string and True if black is to move.
+    """
+    fields = line.split()
+    if len(fields) == 1:
+        return fields[0], True
+    if len(fields) == 2 and fields[1] in ('b', 'r'):
+        return fields[0], fields[1] == 'b'
+    raise ValueError('Bad position line: %r' % line)
+
+
+def read_positions(lines):
+    """Generate positions from lines of text skipping blank lines and
+    comments (starting with #).
+    """
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield parse_position(line)
+
+
+def _analyze_task(table, task, time_limit, max_depth):
+    index, (board, is_black) = task
+    start = time.time()
+    analysis = tree_search.analyze(board, is_black, time_limit, max_depth,
+                                   table)
+    return {'index': index, 'board': board, 'is_black': is_black,
+            'move': analysis.move, 'score': analysis.score,
+            'depth': analysis.depth, 'nodes': analysis.nodes,
+            'pv': analysis.pv, 'seconds': time.time() - start}
+
+
+def _play_task(table, task, time_limit, max_depth):
+    index, max_moves = task
+    start = time.time()
+    board = STARTING_BOARD
+    black = True
+    game = [board]
+    nodes = 0
+    winner = None
+    draw = False
+    while len(game) <= max_moves:
+        analysis = tree_search.analyze(board, black, time_limit, max_depth,
+                                       table, history=game[:-1])
+        nodes += analysis.nodes
+        if analysis.move is None:
+            winner = 'red' if black else 'black'
+            break
+        board = analysis.move
+        game.append(board)
+        black = not black
+        if history.is_drawn(game):
+            draw = True
+            break
+    return {'index': index, 'winner': winner, 'draw': draw,
+            'moves': len(game) - 1, 'positions': game[1:], 'nodes': nodes,
+            'seconds': time.time() - start}
+
+
+def _worker(function, tasks, results, time_limit, max_depth, table_size):
+    table = TranspositionTable(table_size)
+    for task in iter(tasks.get, None):
+        try:
+            results.put(function(table, task, time_limit, max_depth))
+        except Exception as e:
+            results.put({'index': task[0], 'error': repr(e)})
+    results.put(None)
+
+
+def _run(function, tasks, workers, time_limit, max_depth, queue_size,
+         table_size):
+    """Run function over tasks in a pool of processes and generate the
+    results as they arrive.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    task_queue = multiprocessing.Queue(queue_size)
+    result_queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(
+        target=_worker, args=(function, task_queue, result_queue, time_limit,
+                              max_depth, table_size))
+                 for _ in range(workers)]
+    for p in processes:
+        p.daemon = True
+        p.start()
+
+    # The input may be a slow or unbounded iterator so it is fed from its
+    # own thread, which blocks whenever the task queue is full.
+    def feed():
+        for task in tasks:
+            task_queue.put(task)
+        for _ in processes:
+            task_queue.put(None)
+
+    feeder = threading.Thread(target=feed)
+    feeder.daemon = True
+    feeder.start()
+    running = len(processes)
+    try:
+        while running:
+            result = result_queue.get()
+            if result is None:
+                running -= 1
+            else:
+                yield result
+    finally:
+        for p in processes:
+            if p.is_alive():
+                p.terminate()
+            p.join()
+
+
+def analyze_positions(positions, workers=None, time_limit=None,
+                      max_depth=None, queue_size=QUEUE_SIZE,
+                      table_size=DEFAULT_SIZE):
+    """Analyze positions in parallel.
+
+    Args:
+      positions: iterable of (board, is_black) tuples
+      workers: number of processes (defaults to the number of CPUs)
+      time_limit: seconds per position (see tree_search.analyze)
+      max_depth: depth of the search (see tree_search.analyze)
+      queue_size: maximum number of positions waiting for a worker
+      table_size: size of the transposition table of each worker
+
+    Returns:
+      generator of dictionaries with the index, board, is_black, move,
+      score, depth, nodes, principal variation (pv) and seconds of each
+      position in the order they finish.
+    """
+    return _run(_analyze_task, enumerate(positions), workers, time_limit,
+                max_depth, queue_size, table_size)
+
+
+def play_games(games, workers=None, time_limit=None, max_depth=None,
+               max_moves=MAX_GAME_MOVES, table_size=DEFAULT_SIZE):
+    """Play self-play games in parallel from the starting position.
+
+    Args:
+      games: number of games
+      workers: number of processes (defaults to the number of CPUs)
+      time_limit: seconds per move (see tree_search.analyze)
+      max_depth: depth of the search (see tree_search.analyze)
+      max_moves: games still going after this many moves are unfinished
+        (winner None and draw False)
+      table_size: size of the transposition table of each worker
+
+    Returns:
+      generator of dictionaries with the index, winner, draw (True if the
+      game was drawn by repetition or the 40 move rule), moves,
+      positions, nodes and seconds of each game in the order they
+      finish.
+    """
+    return _run(_play_task, ((i, max_moves) for i in range(games)),
+                workers, time_limit, max_depth, QUEUE_SIZE, table_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batch checkers analysis.')
+    parser.add_argument('mode', choices=('analyze', 'selfplay'))
+    parser.add_argument('--input', help='file of positions (default stdin)')
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument('--depth', type=int, help='search depth')
+    parser.add_argument('--time', type=float, help='seconds per move')
+    parser.add_argument('--games', type=int, default=1)
+    parser.add_argument('--max-moves', type=int, default=MAX_GAME_MOVES)
+    parser.add_argument('--records',
+                        help='record file to append self-play games to')
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    count = 0
+    nodes = 0
+    if args.mode == 'analyze':
+        lines = open(args.input) if args.input else sys.stdin
+        results = analyze_positions(read_positions(lines), args.workers,
+                                    args.time, args.depth)
+        unit = 'positions'
+    else:
+        results = play_games(args.games, args.workers, args.time, args.depth,
+                             args.max_moves)
+        unit = 'games'
+    writer = None
+    if args.records and args.mode == 'selfplay':
+        writer = records.RecordWriter(args.records,
+                                      records.RESULT | records.GAME)
+    for result in results:
+        count += 1
+        nodes += result.get('nodes', 0)
+        print json.dumps(result, sort_keys=True)
+        sys.stdout.flush()
+        if writer is not None and 'error' not in result:
+            writer.write_all(records.game_records(result))
+    if writer is not None:
+        writer.close()
+    elapsed = max(time.time() - start, 1e-9)
+    sys.stderr.write('%d %s in %.2fs: %.2f %s/s/core, %d nodes/s\n' % (
+        count, unit, elapsed, count / elapsed / args.workers, unit,
+        nodes / elapsed))
+
+
+if __name__ == '__main__':
+    main()
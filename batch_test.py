@@ -0,0 +1,58 @@
+"""Tests for batch analysis and self-play."""
+
+__author__ = 'lhurd'
+
+import unittest
+
+import batch
+import moves
+from moves_test import STARTING_BOARD, TEST_BOARD1
+from transposition import TranspositionTable
+
+
+class BatchTest(unittest.TestCase):
+    def test_read_positions(self):
+        self.assertEqual([(STARTING_BOARD, True), (TEST_BOARD1, False)],
+                         list(batch.read_positions(
+                             ['# comment', STARTING_BOARD, '',
+                              TEST_BOARD1 + ' r'])))
+        self.assertRaises(ValueError, batch.parse_position,
+                          STARTING_BOARD + ' x')
+
+    def test_analyze_positions(self):
+        positions = [(STARTING_BOARD, True), (TEST_BOARD1, True)] * 3
+        results = list(batch.analyze_positions(positions, workers=2,
+                                               max_depth=2, queue_size=2,
+                                               table_size=1024))
+        self.assertEqual(range(6), sorted(r['index'] for r in results))
+        for result in results:
+            self.assertIn(result['move'],
+                          moves.find_children(result['board']))
+            self.assertEqual(2, result['depth'])
+            self.assertGreater(result['nodes'], 0)
+
+    def test_play_games(self):
+        results = list(batch.play_games(3, workers=2, max_depth=1,
+                                        max_moves=6, table_size=1024))
+        self.assertEqual([0, 1, 2], sorted(r['index'] for r in results))
+        for result in results:
+            self.assertEqual(6, result['moves'])
+            self.assertIsNone(result['winner'])
+            self.assertFalse(result['draw'])
+
+    def test_play_game_to_a_win(self):
+        # A game played in this process from a board where black takes
+        # the last checker of red, who then cannot move.
+        start = batch.STARTING_BOARD
+        batch.STARTING_BOARD = 'b----r' + '-' * 26
+        try:
+            result = batch._play_task(TranspositionTable(1024), (0, 10),
+                                      None, 4)
+        finally:
+            batch.STARTING_BOARD = start
+        self.assertEqual('black', result['winner'])
+        self.assertFalse(result['draw'])
+        self.assertEqual(['-' * 9 + 'b' + '-' * 22], result['positions'])
+
+if __name__ == '__main__':
+    unittest.main()
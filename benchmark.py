@@ -0,0 +1,237 @@
+"""Benchmarks of move generation, evaluation and search.
+
+Each benchmark measures one hot path on fixed inputs and reports
+
+  seconds  the best time over the repetitions
+  rate     units of work per second (higher is better)
+  count    for the benchmarks whose work is fully determined by the
+           inputs (perft leaf counts), the amount of work, which doubles
+           as a check that the move generator is still correct
+  nodes    for the search benchmarks, the number of nodes searched (for
+           information: it changes whenever the search does)
+
+The results are printed as JSON and can be compared against a baseline
+written by an earlier run.  A benchmark fails the comparison when its
+count differs from the baseline or its rate dropped by more than the
+tolerance.  Timings only mean something against a baseline taken on the
+same machine, so refresh the baseline with --save when moving to a new
+one.
+
+Usage:
+  python benchmark.py [--repeat N] [--baseline FILE] [--tolerance T]
+                      [--save] [--output FILE] [--only NAME ...]
+
+The exit status is 1 when the comparison with the baseline failed.
+"""
+__author__ = 'lhurd'
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import bitboard
+import evaluate
+import moves
+import perft
+import positional
+import tree_search
+from moves_test import STARTING_BOARD, TEST_BOARD1, TEST_BOARD3
+from transposition import TranspositionTable
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'benchmark_baseline.json')
+DEFAULT_TOLERANCE = 0.2
+DEFAULT_REPEAT = 3
+
+PERFT_POSITIONS = [('start', STARTING_BOARD, 7), ('board1', TEST_BOARD1, 9),
+                   ('board3', TEST_BOARD3, 7)]
+MEMOIZED_PERFT_DEPTH = 9
+EVALUATE_GAMES = 20
+EVALUATE_ROUNDS = 20
+SEARCH_DEPTH = 7
+SEARCH_PLIES = (10, 20, 30)
+SEED = 1
+
+
+def random_boards(games=EVALUATE_GAMES, seed=SEED):
+    """The positions of random games (black to move) as board strings."""
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(games):
+        board = STARTING_BOARD
+        children = moves.find_children(board)
+        while children:
+            boards.append(board)
+            board = moves.flip(rng.choice(children))
+            children = moves.find_children(board)
+    return boards
+
+
+def search_positions(plies=SEARCH_PLIES, seed=SEED):
+    """Positions reached after a number of plies of random play, plus the
+    test positions, as (board, is_black) tuples.
+    """
+    positions = [(STARTING_BOARD, True), (TEST_BOARD1, True),
+                 (TEST_BOARD3, True)]
+    game = random_boards(1, seed)
+    for ply in plies:
+        if ply < len(game):
+            positions.append((game[ply], True))
+    return positions
+
+
+def _time(function, repeat):
+    """Best time of repeat calls to function and its (last) result."""
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        result = function()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return max(best, 1e-9), result
+
+
+def _perft_benchmark(count_leaves, repeat):
+    seconds, count = _time(count_leaves, repeat)
+    return {'seconds': seconds, 'count': count, 'rate': count / seconds}
+
+
+def _evaluate_benchmark(function, positions, repeat):
+    def run():
+        for _ in range(EVALUATE_ROUNDS):
+            for position in positions:
+                function(position)
+    seconds, _ = _time(run, repeat)
+    return {'seconds': seconds,
+            'rate': EVALUATE_ROUNDS * len(positions) / seconds}
+
+
+def _search_benchmark(positions, depth, repeat):
+    def run():
+        nodes = 0
+        for board, is_black in positions:
+            nodes += tree_search.analyze(board, is_black, max_depth=depth,
+                                         table=TranspositionTable()).nodes
+        return nodes
+    seconds, nodes = _time(run, repeat)
+    return {'seconds': seconds, 'nodes': nodes,
+            'rate': len(positions) / seconds}
+
+
+def benchmarks():
+    """The benchmarks as a dictionary mapping names to functions of the
+    number of repetitions that return the results.
+    """
+    result = {}
+    for name, board, depth in PERFT_POSITIONS:
+        result['perft_%s' % name] = (
+            lambda repeat, board=board, depth=depth: _perft_benchmark(
+                lambda: perft.reference_perft(board, depth), repeat))
+        result['perft_bitboard_%s' % name] = (
+            lambda repeat, board=board, depth=depth: _perft_benchmark(
+                lambda: perft.perft(bitboard.from_string(board), depth,
+                                    memoize=False),
+                repeat))
+    result['perft_memoized_start'] = lambda repeat: _perft_benchmark(
+        lambda: perft.perft(STARTING_BOARD, MEMOIZED_PERFT_DEPTH),
+        repeat)
+    boards = random_boards()
+    result['evaluate'] = lambda repeat: _evaluate_benchmark(
+        evaluate.evaluate, boards, repeat)
+    positions = [bitboard.from_string(board) for board in boards]
+    result['evaluate_position'] = lambda repeat: _evaluate_benchmark(
+        evaluate.evaluate_position, positions, repeat)
+    result['evaluate_positional'] = lambda repeat: _evaluate_benchmark(
+        positional.evaluate_position, positions, repeat)
+    result['search'] = lambda repeat: _search_benchmark(
+        search_positions(), SEARCH_DEPTH, repeat)
+    return result
+
+
+def run(names=None, repeat=DEFAULT_REPEAT):
+    """Run benchmarks.
+
+    Args:
+      names: names of the benchmarks to run (all of them by default)
+      repeat: number of times each benchmark is run (the best time is
+        kept)
+
+    Returns:
+      dictionary mapping the names of the benchmarks to their results.
+    """
+    available = benchmarks()
+    results = {}
+    for name in sorted(names or available):
+        if name not in available:
+            raise ValueError('Unknown benchmark: %s' % name)
+        results[name] = available[name](repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compare results with a baseline.
+
+    Args:
+      results: dictionary returned by run
+      baseline: results of an earlier run
+      tolerance: largest acceptable drop in rate as a fraction of the
+        baseline
+
+    Returns:
+      list of messages describing the regressions (empty if there are
+      none).  Benchmarks missing from either side are ignored.
+    """
+    problems = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        new = results[name]
+        if 'count' in old and new.get('count') != old['count']:
+            problems.append('%s: count %s, expected %s' % (
+                name, new.get('count'), old['count']))
+        if new['rate'] < old['rate'] * (1 - tolerance):
+            problems.append('%s: rate %.1f/s, %.0f%% below %.1f/s' % (
+                name, new['rate'], 100 * (1 - new['rate'] / old['rate']),
+                old['rate']))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Checkers benchmarks.')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--save', action='store_true',
+                        help='write the results to the baseline')
+    parser.add_argument('--output', help='write the results to a file')
+    parser.add_argument('--only', nargs='+', help='benchmarks to run')
+    args = parser.parse_args(argv)
+
+    results = run(args.only, args.repeat)
+    text = json.dumps(results, indent=2, separators=(',', ': '),
+                      sort_keys=True)
+    print text
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            f.write(text + '\n')
+        return 0
+    if not os.path.exists(args.baseline):
+        sys.stderr.write('No baseline at %s\n' % args.baseline)
+        return 0
+    with open(args.baseline) as f:
+        problems = compare(results, json.load(f), args.tolerance)
+    for problem in problems:
+        sys.stderr.write(problem + '\n')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
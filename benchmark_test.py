@@ -0,0 +1,33 @@
+"""Tests for the benchmark suite."""
+
+__author__ = 'lhurd'
+
+import unittest
+
+import benchmark
+
+
+class BenchmarkTest(unittest.TestCase):
+    def test_run(self):
+        results = benchmark.run(['perft_board1', 'evaluate'], repeat=1)
+        self.assertEqual(['evaluate', 'perft_board1'], sorted(results))
+        self.assertEqual(23584, results['perft_board1']['count'])
+        self.assertGreater(results['evaluate']['rate'], 0)
+        self.assertRaises(ValueError, benchmark.run, ['nonsense'])
+
+    def test_compare(self):
+        baseline = {'a': {'count': 10, 'rate': 100.0},
+                    'b': {'rate': 100.0}, 'c': {'rate': 1.0}}
+        self.assertEqual([], benchmark.compare(
+            {'a': {'count': 10, 'rate': 85.0}, 'b': {'rate': 200.0},
+             'd': {'rate': 1.0}}, baseline, 0.2))
+        problems = benchmark.compare(
+            {'a': {'count': 11, 'rate': 100.0}, 'b': {'rate': 70.0}},
+            baseline, 0.2)
+        self.assertEqual(2, len(problems))
+        self.assertTrue(problems[0].startswith('a: count 11'))
+        self.assertTrue(problems[1].startswith('b: rate 70.0'))
+
+
+if __name__ == '__main__':
+    unittest.main()
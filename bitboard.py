@@ -0,0 +1,375 @@
+"""Bitboard version of the move generator in the moves module.
+
+A position is a triple of 32-bit masks (black, red, kings) where bit i
+corresponds to character i of the board strings used by the moves module
+and the kings mask holds the kings of both colors.  As in the moves module
+all moves are generated from black's point of view and flip() is used to
+hand the move to the other player.
+
+The squares of a row alternate between the two diagonals depending on
+whether the row is even or odd so a one step diagonal move is a shift by
+3, 4 or 5 depending on the parity of the source row and its column:
+
+  even rows: forward +4 and +5 (not column 3)
+  odd rows:  forward +3 (not column 0) and +4
+
+Backward moves are the mirror image.  The tables below split every
+direction into its even and odd row sources so that each entry is a
+single shift of a masked set of pieces.
+"""
+__author__ = 'lhurd'
+
+from collections import namedtuple
+
+Position = namedtuple('Position', ['black', 'red', 'kings'])
+
+MASK = 0xFFFFFFFF
+
+EVEN_ROWS = 0x0F0F0F0F
+ODD_ROWS = 0xF0F0F0F0
+COLUMN_0 = 0x11111111
+COLUMN_3 = 0x88888888
+LAST_ROW = 0xF0000000  # Squares 28-31 where black checkers are kinged.
+
+# (source mask, shift) pairs for single step moves.
+FWD_STEPS = ((EVEN_ROWS & ~COLUMN_3 & MASK, 5), (ODD_ROWS, 4),
+             (EVEN_ROWS, 4), (ODD_ROWS & ~COLUMN_0 & MASK, 3))
+BWD_STEPS = ((ODD_ROWS & ~COLUMN_0 & MASK, -5), (EVEN_ROWS, -4),
+             (ODD_ROWS, -4), (EVEN_ROWS & ~COLUMN_3 & MASK, -3))
+
+# (source mask, shift to jumped checker, shift to landing square) triples.
+FWD_JUMP_STEPS = ((EVEN_ROWS & ~COLUMN_3 & MASK, 5, 9),
+                  (ODD_ROWS & ~COLUMN_3 & MASK, 4, 9),
+                  (EVEN_ROWS & ~COLUMN_0 & MASK, 4, 7),
+                  (ODD_ROWS & ~COLUMN_0 & MASK, 3, 7))
+BWD_JUMP_STEPS = ((ODD_ROWS & ~COLUMN_0 & MASK, -5, -9),
+                  (EVEN_ROWS & ~COLUMN_0 & MASK, -4, -9),
+                  (ODD_ROWS & ~COLUMN_3 & MASK, -4, -7),
+                  (EVEN_ROWS & ~COLUMN_3 & MASK, -3, -7))
+
+
+def _reverse_byte(b):
+    return int('{0:08b}'.format(b)[::-1], 2)
+
+REVERSED_BYTES = tuple(_reverse_byte(b) for b in range(256))
+
+
+def _shift(bits, n):
+    """Shift bits left by n (right if n is negative) keeping 32 bits."""
+    if n > 0:
+        return (bits << n) & MASK
+    return bits >> -n
+
+
+def _reverse(bits):
+    """Reverse the order of the 32 bits in bits."""
+    return ((REVERSED_BYTES[bits & 0xFF] << 24)
+            | (REVERSED_BYTES[(bits >> 8) & 0xFF] << 16)
+            | (REVERSED_BYTES[(bits >> 16) & 0xFF] << 8)
+            | REVERSED_BYTES[bits >> 24])
+
+
+def square(bit):
+    """Index of the square represented by a single bit mask."""
+    return bit.bit_length() - 1
+
+
+def popcount(bits):
+    """Number of squares in a mask."""
+    return bin(bits).count('1')
+
+
+def from_string(board):
+    """Convert a board string into a Position.
+
+    Args:
+      board: board string
+
+    Returns:
+      Position with the same checkers.
+    """
+    black = red = kings = 0
+    for i, c in enumerate(board):
+        if c == 'b':
+            black |= 1 << i
+        elif c == 'B':
+            black |= 1 << i
+            kings |= 1 << i
+        elif c == 'r':
+            red |= 1 << i
+        elif c == 'R':
+            red |= 1 << i
+            kings |= 1 << i
+    return Position(black, red, kings)
+
+
+def to_string(position):
+    """Convert a Position into a board string (empty squares are '-').
+
+    Args:
+      position: Position
+
+    Returns:
+      board string.
+    """
+    black, red, kings = position
+    board_list = []
+    for i in range(32):
+        bit = 1 << i
+        if black & bit:
+            board_list.append('B' if kings & bit else 'b')
+        elif red & bit:
+            board_list.append('R' if kings & bit else 'r')
+        else:
+            board_list.append('-')
+    return ''.join(board_list)
+
+
+def flip(position):
+    """Flip player whose turn it is (see moves.flip).
+
+    Args:
+      position: Position
+
+    Returns:
+      flipped Position.
+    """
+    return Position(_reverse(position.red), _reverse(position.black),
+                    _reverse(position.kings))
+
+
+def find_children(position):
+    """Equivalent of moves.find_children for a Position.
+
+    Args:
+      position: Position with black to move
+
+    Returns:
+      list of successor Positions.
+    """
+    positions = [_apply_jump(position, m) for m in _jump_moves(position)]
+    if not positions:
+        positions = [_apply_move(position, m)
+                     for m in _normal_moves(position)]
+    return positions
+
+
+def count_moves(position):
+    """Number of children of a position without building them, i.e.
+    len(find_children(position)).
+
+    Args:
+      position: Position with black to move
+
+    Returns:
+      number of legal moves.
+    """
+    if has_jump(position):
+        return _count_jumps(position)
+    black, red, kings = position
+    empty = ~(black | red) & MASK
+    count = 0
+    for steps, movers in ((FWD_STEPS, black), (BWD_STEPS, black & kings)):
+        for mask, n in steps:
+            count += popcount(_shift(movers & mask, n) & empty)
+    return count
+
+
+#
+# Logic for non-jump moves.
+#
+def _normal_moves(position):
+    """Return a list of (start, finish) tuples for legal non-jump moves.
+
+    Args:
+      position: Position
+
+    Returns:
+      list of tuples giving start and finish coordinates
+    """
+    black, red, kings = position
+    empty = ~(black | red) & MASK
+    result = []
+    for steps, movers in ((FWD_STEPS, black), (BWD_STEPS, black & kings)):
+        for mask, n in steps:
+            targets = _shift(movers & mask, n) & empty
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                to_square = square(bit)
+                result.append((to_square - n, to_square))
+    return result
+
+
+def _apply_move(position, move):
+    """Apply a non-jump move to a position.
+
+    Args:
+      position: Position
+      move: move tuple
+
+    Returns:
+      Position after the move.
+    """
+    black, red, kings = position
+    source = 1 << move[0]
+    target = 1 << move[1]
+    assert black & source
+    black = black ^ source | target
+    if kings & source or target & LAST_ROW:
+        kings = kings & ~source | target
+    return Position(black, red, kings)
+
+
+#
+# Logic for jump moves.
+#
+def has_jump(position):
+    """Returns True if black has a jump in the position.
+
+    Args:
+      position: Position
+
+    Returns:
+      True if black has a jump.
+    """
+    black, red, kings = position
+    empty = ~(black | red) & MASK
+    for mask, over, land in FWD_JUMP_STEPS:
+        if _shift(_shift(black & mask, over) & red, land - over) & empty:
+            return True
+    black_kings = black & kings
+    if black_kings:
+        for mask, over, land in BWD_JUMP_STEPS:
+            if (_shift(_shift(black_kings & mask, over) & red, land - over)
+                    & empty):
+                return True
+    return False
+
+
+def _jump_moves(position):
+    """Return the legal jump moves in the same path format as
+    moves._jump_moves, i.e., the source square followed by alternating
+    jumped and landing squares.
+
+    Args:
+      position: Position
+
+    Returns:
+      list of lists giving path of checker and jumped locations.
+    """
+    black, red, kings = position
+    empty = ~(black | red) & MASK
+    jumps = []
+    for steps, movers in ((FWD_JUMP_STEPS, black),
+                          (BWD_JUMP_STEPS, black & kings)):
+        for mask, over, land in steps:
+            targets = (_shift(_shift(movers & mask, over) & red, land - over)
+                       & empty)
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                to_square = square(bit)
+                jumps += _continue_jump(
+                    position, [to_square - land, to_square - land + over,
+                               to_square])
+    return jumps
+
+
+def _count_jumps(position):
+    """Number of jump moves (len(_jump_moves(position)))."""
+    black, red, kings = position
+    empty = ~(black | red) & MASK
+    count = 0
+    for steps, movers in ((FWD_JUMP_STEPS, black),
+                          (BWD_JUMP_STEPS, black & kings)):
+        for mask, over, land in steps:
+            targets = (_shift(_shift(movers & mask, over) & red, land - over)
+                       & empty)
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                source = _shift(bit, -land)
+                count += _count_extend(bit, red & ~_shift(bit, over - land),
+                                       empty | source, kings & source)
+    return count
+
+
+def _count_extend(current, victims, empty, is_king):
+    """Number of paths of _extend_jump from a landing square."""
+    count = 0
+    for steps in (FWD_JUMP_STEPS, BWD_JUMP_STEPS) if is_king else (
+            FWD_JUMP_STEPS,):
+        for mask, over, land in steps:
+            if not current & mask:
+                continue
+            middle = _shift(current, over) & victims
+            if middle and _shift(current, land) & empty:
+                count += _count_extend(_shift(current, land),
+                                       victims & ~middle, empty, is_king)
+    return count or 1
+
+
+def _continue_jump(position, jump_list):
+    """Return the possible continuations of a partial jump (see
+    moves._continue_jump).
+
+    Args:
+      position: Position
+      jump_list: list of jump move (includes source location and
+        jumped locations)
+
+    Returns:
+      list of continuations (a list with a single element containing
+      the input if no continuation is possible).
+    """
+    black, red, kings = position
+    origin = 1 << jump_list[0]
+    # The moving checker has left its origin so it may land there again.
+    empty = (~(black | red) | origin) & MASK
+    jumped = 0
+    for i in jump_list[1::2]:
+        jumped |= 1 << i
+    return _extend_jump(jump_list, 1 << jump_list[-1], red & ~jumped, empty,
+                        kings & origin)
+
+
+def _extend_jump(jump_list, current, victims, empty, is_king):
+    continuations = []
+    for steps in (FWD_JUMP_STEPS, BWD_JUMP_STEPS) if is_king else (
+            FWD_JUMP_STEPS,):
+        for mask, over, land in steps:
+            if not current & mask:
+                continue
+            middle = _shift(current, over) & victims
+            if middle and _shift(current, land) & empty:
+                continuations += _extend_jump(
+                    jump_list + [square(middle), square(current) + land],
+                    _shift(current, land), victims & ~middle, empty, is_king)
+    if continuations:
+        return continuations
+    else:
+        return [jump_list]
+
+
+def _apply_jump(position, move):
+    """Apply a jump move to a position.
+
+    Args:
+      position: Position
+      move: move path as returned by _jump_moves
+
+    Returns:
+      Position after the jump.
+    """
+    black, red, kings = position
+    source = 1 << move[0]
+    target = 1 << move[-1]
+    assert black & source
+    captured = 0
+    for i in move[1::2]:
+        captured |= 1 << i
+    if kings & source or target & LAST_ROW:
+        kings = kings & ~source | target
+    return Position(black & ~source | target, red & ~captured,
+                    kings & ~captured)
@@ -0,0 +1,138 @@
+"""Tests for the bitboard move generator.  The cases are those of
+moves_test run through the string conversion, together with a check that
+both generators agree along a self-play game.
+"""
+
+__author__ = 'lhurd'
+
+import random
+import unittest
+
+import bitboard
+import moves
+from bitboard import from_string, to_string
+from moves_test import (STARTING_BOARD, TEST_BOARD1, TEST_BOARD2,
+                        TEST_BOARD3, TEST_BOARD4)
+
+
+def _children(board):
+    return [to_string(p) for p in bitboard.find_children(from_string(board))]
+
+
+class BitboardTest(unittest.TestCase):
+    def test_conversion(self):
+        for board in (STARTING_BOARD, TEST_BOARD1, TEST_BOARD2, TEST_BOARD3,
+                      TEST_BOARD4):
+            self.assertEqual(board, to_string(from_string(board)))
+
+    def test_children(self):
+        self.assertItemsEqual(['bbbbbbbb-bbbb-------rrrrrrrrrrrr',
+                               'bbbbbbbb-bbb-b------rrrrrrrrrrrr',
+                               'bbbbbbbbb-bb-b------rrrrrrrrrrrr',
+                               'bbbbbbbbb-bb--b-----rrrrrrrrrrrr',
+                               'bbbbbbbbbb-b--b-----rrrrrrrrrrrr',
+                               'bbbbbbbbbb-b---b----rrrrrrrrrrrr',
+                               'bbbbbbbbbbb----b----rrrrrrrrrrrr'],
+                              _children(STARTING_BOARD))
+        self.assertItemsEqual(['---------------b-----b-br-r---B-',
+                               '-----b---r-----------b--r-----BB',
+                               '-----b---r-----b--r-------r-B-B-',
+                               '-----b---r----Bb-----b--r-------'],
+                              _children(TEST_BOARD1))
+
+    def test_flip(self):
+        self.assertEqual('bbbb----bbbb--------rrrrrrrrrrrr',
+                         to_string(bitboard.flip(
+                             from_string('bbbbbbbbbbbb--------rrrr----rrrr'))))
+        self.assertEqual('BBBB----BBBB--------RRRRRRRRRRRR',
+                         to_string(bitboard.flip(
+                             from_string('BBBBBBBBBBBB--------RRRR----RRRR'))))
+
+    def test_normal_moves(self):
+        self.assertItemsEqual([(5, 8), (15, 19), (21, 25), (30, 25)],
+                              bitboard._normal_moves(from_string(TEST_BOARD1)))
+
+    def test_apply_move(self):
+        for board, move in ((STARTING_BOARD, (9, 14)),
+                            ('----rrrr----------------bbbb----', (24, 29)),
+                            ('bbbbbbbbbBbb--------rrrrrrrrrrrr', (9, 14)),
+                            ('----rrrr----------------Bbbb----', (24, 29)),
+                            ('----rrrr-----------------bbb-B--', (29, 24))):
+            self.assertEqual(moves._apply_move(board, move),
+                             to_string(bitboard._apply_move(
+                                 from_string(board), move)))
+
+    def test_jump_moves(self):
+        self.assertItemsEqual([[5, 9, 14, 18, 23], [15, 18, 22, 26, 31],
+                               [21, 24, 28], [30, 26, 23, 18, 14]],
+                              bitboard._jump_moves(from_string(TEST_BOARD1)))
+        self.assertItemsEqual([[5, 9, 14, 17, 21, 24, 28], [5, 9, 14, 18, 23]],
+                              bitboard._jump_moves(from_string(TEST_BOARD2)))
+        self.assertItemsEqual([[29, 24, 20, 16, 13, 17, 22, 25, 29],
+                               [29, 24, 20, 16, 13, 17, 22, 26, 31],
+                               [29, 24, 20, 16, 13, 17, 22, 18, 15],
+                               [29, 25, 22, 26, 31],
+                               [29, 25, 22, 17, 13, 16, 20, 24, 29],
+                               [29, 25, 22, 18, 15]],
+                              bitboard._jump_moves(from_string(TEST_BOARD3)))
+        self.assertItemsEqual([[29, 24, 20, 16, 13, 17, 22, 25, 29],
+                               [29, 24, 20, 16, 13, 17, 22, 18, 15],
+                               [29, 25, 22, 17, 13, 16, 20, 24, 29],
+                               [29, 25, 22, 18, 15]],
+                              bitboard._jump_moves(from_string(TEST_BOARD4)))
+
+    def test_continue_jump(self):
+        position = from_string(TEST_BOARD1)
+        self.assertItemsEqual([[5, 9, 14, 18, 23]],
+                              bitboard._continue_jump(position, [5, 9, 14]))
+        self.assertItemsEqual([[15, 18, 22, 26, 31]],
+                              bitboard._continue_jump(position, [15, 18, 22]))
+        self.assertItemsEqual([[21, 24, 28]],
+                              bitboard._continue_jump(position, [21, 24, 28]))
+        self.assertItemsEqual([[30, 26, 23, 18, 14]],
+                              bitboard._continue_jump(position, [30, 26, 23]))
+        self.assertItemsEqual([[5, 9, 14, 17, 21, 24, 28], [5, 9, 14, 18, 23]],
+                              bitboard._continue_jump(
+                                  from_string(TEST_BOARD2), [5, 9, 14]))
+        self.assertItemsEqual([[29, 25, 22, 26, 31],
+                               [29, 25, 22, 17, 13, 16, 20, 24, 29],
+                               [29, 25, 22, 18, 15]],
+                              bitboard._continue_jump(
+                                  from_string(TEST_BOARD3), [29, 25, 22]))
+
+    def test_apply_jump(self):
+        for move in ((5, 9, 14), (21, 24, 28), (15, 18, 22, 26, 31),
+                     (30, 26, 23, 18, 14)):
+            self.assertEqual(moves._apply_jump(TEST_BOARD1, move),
+                             to_string(bitboard._apply_jump(
+                                 from_string(TEST_BOARD1), move)))
+
+    def test_count_moves(self):
+        self.assertEqual(7, bitboard.count_moves(from_string(STARTING_BOARD)))
+        # Two of the jumps of the king lead to the same position.
+        self.assertEqual(6, bitboard.count_moves(from_string(TEST_BOARD3)))
+        self.assertEqual(0, bitboard.count_moves(from_string(
+            '----------------------------bbbb')))
+
+    def test_random_games(self):
+        # Both generators must agree on every position of a few random
+        # games (played from the side to move as in tree_search).
+        rng = random.Random(7)
+        for _ in range(20):
+            board = STARTING_BOARD
+            for _ in range(200):
+                expected = moves.find_children(board)
+                self.assertItemsEqual(expected, _children(board))
+                self.assertEqual(moves.has_jump(board),
+                                 bitboard.has_jump(from_string(board)))
+                self.assertEqual(moves.flip(board),
+                                 to_string(bitboard.flip(from_string(board))))
+                self.assertEqual(len(expected),
+                                 bitboard.count_moves(from_string(board)))
+                if not expected:
+                    break
+                board = moves.flip(rng.choice(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,295 @@
+"""Mutable position for the search.
+
+bitboard.find_children builds a new Position for every child of a node
+and the search then flips each of them although alpha-beta usually cuts
+off after the first few.  A Board is instead changed in place by make()
+and restored by unmake(), and its moves are generated lazily as small
+tuples so that nothing is built for the moves that are never searched.
+
+Unlike a Position, which is always seen from the player to move, a Board
+keeps the checkers in their real colors along with the side to move.  The
+moves of red are generated with the step tables of black the other way
+around: the men of red step backward and the kings of both sides step
+both ways.  Along with the checkers the board keeps the number of
+checkers of each kind and the two hashes of transposition.hash_position
+up to date, and key() is the hash of the position seen from the player
+to move, which is what the transposition table expects.
+"""
+__author__ = 'lhurd'
+
+from collections import namedtuple
+
+from bitboard import (BWD_JUMP_STEPS, BWD_STEPS, FWD_JUMP_STEPS, FWD_STEPS,
+                      LAST_ROW, MASK, Position, _shift, flip, popcount)
+from transposition import FLIPPED_KEYS, KEYS, hash_position
+
+BLACK = 0
+RED = 1
+
+# Step tables of the men of each side (the kings use both).
+STEPS = (FWD_STEPS, BWD_STEPS)
+JUMP_STEPS = (FWD_JUMP_STEPS, BWD_JUMP_STEPS)
+# Squares where the men of each side are crowned.
+KING_ROWS = (LAST_ROW, 0x0000000F)
+
+# Kinds of moves: a man that stays a man, a man that is crowned and a king.
+MAN = 0
+CROWN = 1
+KING = 2
+
+# A move as bits: the squares the checker left and reached, the squares
+# of the captured checkers and those of them that were kings, and the
+# kind of the move.  A move is only valid in the position it was
+# generated for.
+Move = namedtuple('Move', ['source', 'target', 'captured', 'captured_kings',
+                           'kind'])
+
+
+class Board(object):
+    """A position that is changed in place by making and unmaking moves.
+
+    Attributes:
+      pieces: list of the masks of the black and of the red checkers
+      kings: mask of the kings of both sides
+      side: BLACK or RED, the player to move
+      material: list of the numbers of black men, black kings, red men
+        and red kings (the same order as the keys of transposition.KEYS)
+      hash: transposition.hash_position(self.position())[0]
+      flipped_hash: transposition.hash_position(self.position())[1]
+    """
+
+    __slots__ = ('pieces', 'kings', 'side', 'material', 'hash',
+                 'flipped_hash')
+
+    def __init__(self, position, side=BLACK):
+        """
+        Args:
+          position: bitboard.Position in real colors
+          side: the player to move
+        """
+        black, red, kings = position
+        self.pieces = [black, red]
+        self.kings = kings
+        self.side = side
+        self.material = [popcount(black & ~kings), popcount(black & kings),
+                         popcount(red & ~kings), popcount(red & kings)]
+        self.hash, self.flipped_hash = hash_position(position)
+
+    def position(self):
+        """The checkers as a bitboard.Position in real colors."""
+        return Position(self.pieces[BLACK], self.pieces[RED], self.kings)
+
+    def oriented(self):
+        """The position as seen by the player to move (as in the rest of
+        the program).
+        """
+        if self.side == BLACK:
+            return self.position()
+        return flip(self.position())
+
+    def key(self):
+        """The hash of oriented()."""
+        if self.side == BLACK:
+            return self.hash
+        return self.flipped_hash
+
+    def make(self, move):
+        """Play a move of the player to move."""
+        self._toggle(move, self.side, 1)
+        self.side ^= 1
+
+    def unmake(self, move):
+        """Take back the last move made."""
+        self.side ^= 1
+        self._toggle(move, self.side, -1)
+
+    def _toggle(self, move, side, sign):
+        source, target, captured, captured_kings, kind = move
+        pieces = self.pieces
+        material = self.material
+        # source ^ target so that a king jumping around back to its square
+        # stays there.
+        pieces[side] ^= source ^ target
+        before = 2 * side + (kind == KING)
+        after = 2 * side + (kind != MAN)
+        h = self.hash ^ KEYS[before][source] ^ KEYS[after][target]
+        fh = (self.flipped_hash ^ FLIPPED_KEYS[before][source]
+              ^ FLIPPED_KEYS[after][target])
+        if kind == KING:
+            self.kings ^= source ^ target
+        elif kind == CROWN:
+            self.kings ^= target
+            material[before] -= sign
+            material[after] += sign
+        if captured:
+            other = 1 - side
+            pieces[other] ^= captured
+            self.kings ^= captured_kings
+            for index, bits in ((2 * other, captured ^ captured_kings),
+                                (2 * other + 1, captured_kings)):
+                keys = KEYS[index]
+                flipped_keys = FLIPPED_KEYS[index]
+                while bits:
+                    bit = bits & -bits
+                    bits ^= bit
+                    h ^= keys[bit]
+                    fh ^= flipped_keys[bit]
+                    material[index] -= sign
+        self.hash = h
+        self.flipped_hash = fh
+
+    def moves(self):
+        """Generate the legal moves of the player to move (the jumps if
+        there are any and the other moves otherwise).
+        """
+        jumped = False
+        for move in self.jumps():
+            jumped = True
+            yield move
+        if not jumped:
+            for move in self.steps():
+                yield move
+
+    def steps(self):
+        """Generate the moves of the player to move that capture nothing
+        (which are only legal if there are no jumps).
+        """
+        side = self.side
+        movers = self.pieces[side]
+        kings = self.kings
+        king_row = KING_ROWS[side]
+        empty = ~(movers | self.pieces[1 - side]) & MASK
+        for steps, checkers in ((STEPS[side], movers),
+                                (STEPS[1 - side], movers & kings)):
+            for mask, n in steps:
+                targets = _shift(checkers & mask, n) & empty
+                while targets:
+                    target = targets & -targets
+                    targets ^= target
+                    source = _shift(target, -n)
+                    if source & kings:
+                        kind = KING
+                    elif target & king_row:
+                        kind = CROWN
+                    else:
+                        kind = MAN
+                    yield Move(source, target, 0, 0, kind)
+
+    def step(self, source, target):
+        """The move of the checker of the player to move on the square
+        source to the square target, or None if it cannot step there.
+        Like steps() this ignores the jumps.
+        """
+        side = self.side
+        if (not source & self.pieces[side] or not target
+                or target & (self.pieces[BLACK] | self.pieces[RED])):
+            return None
+        is_king = source & self.kings
+        for steps in ((STEPS[side], STEPS[1 - side]) if is_king
+                      else (STEPS[side],)):
+            for mask, n in steps:
+                if _shift(source & mask, n) == target:
+                    if is_king:
+                        kind = KING
+                    elif target & KING_ROWS[side]:
+                        kind = CROWN
+                    else:
+                        kind = MAN
+                    return Move(source, target, 0, 0, kind)
+        return None
+
+    def is_legal(self, move):
+        """True if a move (e.g. one found for the position by an earlier
+        search) is one of moves().
+        """
+        if move.captured:
+            return move in self.jumps()
+        return (self.step(move.source, move.target) == move
+                and not self.has_jump())
+
+    def jumps(self):
+        """Generate the jumps of the player to move (with every way of
+        continuing a multiple jump as a separate move).
+        """
+        side = self.side
+        movers = self.pieces[side]
+        opponents = self.pieces[1 - side]
+        kings = self.kings
+        empty = ~(movers | opponents) & MASK
+        for steps, checkers in ((JUMP_STEPS[side], movers),
+                                (JUMP_STEPS[1 - side], movers & kings)):
+            for mask, over, land in steps:
+                targets = (_shift(_shift(checkers & mask, over) & opponents,
+                                  land - over) & empty)
+                while targets:
+                    target = targets & -targets
+                    targets ^= target
+                    source = _shift(target, -land)
+                    middle = _shift(target, over - land)
+                    # The moving checker has left its source so it may
+                    # land there again.
+                    for move in self._extend(source, target, middle,
+                                             opponents & ~middle,
+                                             empty | source,
+                                             kings & source):
+                        yield move
+
+    def _extend(self, source, current, captured, victims, empty, is_king):
+        side = self.side
+        extended = False
+        for steps in ((JUMP_STEPS[side], JUMP_STEPS[1 - side]) if is_king
+                      else (JUMP_STEPS[side],)):
+            for mask, over, land in steps:
+                if not current & mask:
+                    continue
+                middle = _shift(current, over) & victims
+                target = _shift(current, land)
+                if middle and target & empty:
+                    extended = True
+                    for move in self._extend(source, target,
+                                             captured | middle,
+                                             victims & ~middle, empty,
+                                             is_king):
+                        yield move
+        if not extended:
+            if is_king:
+                kind = KING
+            elif current & KING_ROWS[side]:
+                kind = CROWN
+            else:
+                kind = MAN
+            yield Move(source, current, captured, captured & self.kings,
+                       kind)
+
+    def has_jump(self, side=None):
+        """Returns True if a player (by default the one to move) has a
+        jump.
+        """
+        if side is None:
+            side = self.side
+        movers = self.pieces[side]
+        opponents = self.pieces[1 - side]
+        empty = ~(movers | opponents) & MASK
+        for mask, over, land in JUMP_STEPS[side]:
+            if (_shift(_shift(movers & mask, over) & opponents, land - over)
+                    & empty):
+                return True
+        movers &= self.kings
+        if movers:
+            for mask, over, land in JUMP_STEPS[1 - side]:
+                if (_shift(_shift(movers & mask, over) & opponents,
+                           land - over) & empty):
+                    return True
+        return False
+
+    def any_moves(self):
+        """Returns True if the player to move has a legal move."""
+        side = self.side
+        movers = self.pieces[side]
+        empty = ~(movers | self.pieces[1 - side]) & MASK
+        for steps, checkers in ((STEPS[side], movers),
+                                (STEPS[1 - side], movers & self.kings)):
+            for mask, n in steps:
+                if _shift(checkers & mask, n) & empty:
+                    return True
+        return self.has_jump(side)
@@ -0,0 +1,114 @@
+"""Tests for the mutable board."""
+
+__author__ = 'lhurd'
+
+import random
+import unittest
+
+import bitboard
+import evaluate
+import transposition
+from board import BLACK, CROWN, KING, RED, Board
+from moves_test import STARTING_BOARD, TEST_BOARD3
+
+
+def _state(board):
+    return (list(board.pieces), board.kings, board.side,
+            list(board.material), board.hash, board.flipped_hash)
+
+
+def _children(board):
+    """The children of the player to move in the orientation of
+    bitboard.find_children, made and unmade on board.
+    """
+    children = []
+    for move in board.moves():
+        state = _state(board)
+        board.make(move)
+        child = board.position()
+        if board.side == BLACK:
+            child = bitboard.flip(child)
+        children.append(child)
+        board.unmake(move)
+        assert _state(board) == state
+    return children
+
+
+class BoardTest(unittest.TestCase):
+    def test_moves(self):
+        board = Board(bitboard.from_string(STARTING_BOARD))
+        self.assertItemsEqual(
+            bitboard.find_children(bitboard.from_string(STARTING_BOARD)),
+            _children(board))
+        # Red to move in the flipped position has the same moves.
+        board = Board(bitboard.flip(bitboard.from_string(TEST_BOARD3)), RED)
+        self.assertItemsEqual(
+            bitboard.find_children(bitboard.from_string(TEST_BOARD3)),
+            _children(board))
+        # The king (on square 29 from red's side) can jump around back
+        # to its square.
+        self.assertIn(1 << 2, [m.target for m in board.jumps()
+                               if m.source == m.target])
+
+    def test_kinds(self):
+        board = Board(bitboard.from_string('-' * 24 + 'b-----B-'))
+        self.assertEqual([CROWN, CROWN, KING, KING],
+                         sorted(move.kind for move in board.moves()))
+        board = Board(bitboard.from_string('----r' + '-' * 26 + 'b'), RED)
+        self.assertEqual([CROWN], [move.kind for move in board.moves()])
+
+    def test_random_games(self):
+        # Making moves keeps the material and the hashes of the checkers
+        # and the board agrees with the bitboard move generator.
+        rng = random.Random(5)
+        for _ in range(10):
+            board = Board(bitboard.from_string(STARTING_BOARD))
+            for _ in range(200):
+                position = board.oriented()
+                self.assertItemsEqual(bitboard.find_children(position),
+                                      _children(board))
+                self.assertEqual(transposition.hash_position(position)[0],
+                                 board.key())
+                self.assertEqual(
+                    transposition.hash_position(board.position()),
+                    (board.hash, board.flipped_hash))
+                self.assertEqual(Board(board.position()).material,
+                                 board.material)
+                self.assertEqual(evaluate.evaluate_position(position),
+                                 evaluate.evaluate_board(board))
+                self.assertEqual(bitboard.has_jump(position),
+                                 board.has_jump())
+                moves = list(board.moves())
+                self.assertEqual(bool(moves), board.any_moves())
+                if not moves:
+                    break
+                board.make(rng.choice(moves))
+
+    def test_is_legal(self):
+        # The moves of earlier positions of a game are legal again only
+        # if they are moves of the current position.
+        rng = random.Random(7)
+        for _ in range(10):
+            board = Board(bitboard.from_string(STARTING_BOARD))
+            played = set()
+            for _ in range(200):
+                moves = list(board.moves())
+                for move in played:
+                    self.assertEqual(move in moves, board.is_legal(move))
+                for move in board.steps():
+                    self.assertEqual(move, board.step(move.source,
+                                                      move.target))
+                if not moves:
+                    break
+                played.update(moves)
+                board.make(rng.choice(moves))
+        board = Board(bitboard.from_string(STARTING_BOARD))
+        # Onto a checker, with a checker of the opponent and from an empty
+        # square.
+        self.assertIsNone(board.step(1, 1 << 4))
+        self.assertIsNone(board.step(1 << 20, 1 << 16))
+        self.assertIsNone(board.step(1 << 16, 1 << 20))
+
+
+if __name__ == '__main__':
+    unittest.main()
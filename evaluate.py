@@ -9,6 +9,8 @@ better for black.
 
 __author__ = 'lhurd'
 
+from bitboard import popcount
+
 # Almost the simplest possible evaluation function.  We use the heuristic
 # that a king is worth 3/2 of a normal checker, a ratio cited in the book
 # Blondie24 (alongside the explanation that they were not using this
@@ -20,6 +22,8 @@ __author__ = 'lhurd'
 
 NEGATIVE_INFINITY = -99999
 INFINITY = 99999
+MAN_VALUE = 20
+KING_VALUE = 30
 
 
 # The calling code is supposed to have accounted for the cases where the
@@ -34,11 +38,56 @@ def evaluate(board):
         an integer which is positive if black has te upper hand (negative
         for red).
     """
-    bcount = 30 * board.count('B') + 20 * board.count('b')
+    bcount = KING_VALUE * board.count('B') + MAN_VALUE * board.count('b')
     if bcount == 0:
         return NEGATIVE_INFINITY
-    rcount = 30 * board.count('R') + 20 * board.count('r')
+    rcount = KING_VALUE * board.count('R') + MAN_VALUE * board.count('r')
     if rcount == 0:
         return INFINITY
     else:
         return bcount - rcount
+
+
+def evaluate_position(position):
+    """Bitboard version of evaluate.
+
+    Args:
+        a bitboard.Position.
+
+    Returns:
+        the same value as evaluate() on the equivalent board string.
+    """
+    black, red, kings = position
+    if not black:
+        return NEGATIVE_INFINITY
+    if not red:
+        return INFINITY
+    black_kings = popcount(black & kings)
+    red_kings = popcount(red & kings)
+    return (KING_VALUE * (black_kings - red_kings)
+            + MAN_VALUE * (popcount(black) - black_kings
+                           - popcount(red) + red_kings))
+
+
+def evaluate_board(board):
+    """Version of evaluate_position for a board.Board using the material
+    counts it keeps.
+
+    Args:
+        a board.Board.
+
+    Returns:
+        the value of evaluate_position() from the point of view of the
+        player to move.
+    """
+    side = board.side
+    pieces = board.pieces
+    if not pieces[side]:
+        return NEGATIVE_INFINITY
+    if not pieces[1 - side]:
+        return INFINITY
+    material = board.material
+    mine = 2 * side
+    theirs = 2 - mine
+    return (MAN_VALUE * (material[mine] - material[theirs])
+            + KING_VALUE * (material[mine + 1] - material[theirs + 1]))
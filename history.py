@@ -0,0 +1,105 @@
+"""Draws by repetition and by the 40 move rule.
+
+A game is drawn when the same position occurs for the third time with
+the same player to move, or when 40 moves of each player go by without a
+capture or a move of a man.  Captures and moves of men cannot be taken
+back, so only the positions since the last of them can come around again.
+
+Inside the search a return to a position of the game or of the line being
+searched is scored DRAW at once: the player who went back to it can do so
+again, so nothing below it needs to be searched.  The search keeps the
+positions in a History, with the number of times each occurs keyed by its
+hash (one dictionary per player to move) so that checking a node is a
+dictionary lookup, along with the number of plies since the last capture
+or move of a man.
+"""
+__author__ = 'lhurd'
+
+from bitboard import flip, from_string, popcount
+from board import BLACK
+from transposition import hash_position
+
+DRAW = 0
+# 40 moves of each player.
+NO_PROGRESS_PLIES = 80
+REPETITIONS = 3
+
+
+def is_progress(before, after):
+    """True if the move from one bitboard.Position to the next (in the
+    same colors) captured or moved a man.
+    """
+    pieces = before.black | before.red
+    new_pieces = after.black | after.red
+    return (pieces & ~before.kings != new_pieces & ~after.kings
+            or popcount(pieces) != popcount(new_pieces))
+
+
+def no_progress_plies(positions):
+    """Number of plies at the end of a game without a capture or a move
+    of a man.
+
+    Args:
+      positions: list of bitboard.Position in the same colors, one per
+        ply
+    """
+    plies = 0
+    for i in range(len(positions) - 1, 0, -1):
+        if is_progress(positions[i - 1], positions[i]):
+            break
+        plies += 1
+    return plies
+
+
+def is_drawn(boards, limit=NO_PROGRESS_PLIES):
+    """True if a game is drawn by repetition or by the 40 move rule.
+
+    Args:
+      boards: board strings of the game so far, one per ply
+      limit: number of plies without a capture or a move of a man that
+        draw the game
+    """
+    positions = [from_string(board) for board in boards]
+    plies = no_progress_plies(positions)
+    if plies >= limit:
+        return True
+    # The positions since the last progress with the same player to move.
+    return boards[-1 - plies:][::-2].count(boards[-1]) >= REPETITIONS
+
+
+class History(object):
+    """The positions of a game and of the line being searched.
+
+    Attributes:
+      seen: for each player (board.BLACK and board.RED), dictionary from
+        the hash (board.Board.hash) of each position with that player to
+        move to the number of times it occurs
+      quiet: number of plies without a capture or a move of a man up to
+        the current position
+      limit: number of such plies that draw the game
+    """
+
+    __slots__ = ('seen', 'quiet', 'limit')
+
+    def __init__(self, boards=(), is_black=True, limit=NO_PROGRESS_PLIES):
+        """
+        Args:
+          boards: board strings of the game so far, one per ply, ending
+            with the current position
+          is_black: True if black is to move in the current position
+          limit: number of plies without a capture or a move of a man
+            that draw the game
+        """
+        positions = [from_string(board) for board in boards]
+        if not is_black:
+            # The search sees the player to move as black.
+            positions = [flip(position) for position in positions]
+        self.seen = ({}, {})
+        self.quiet = no_progress_plies(positions)
+        self.limit = limit
+        side = BLACK
+        for position in positions[len(positions) - 1 - self.quiet:][::-1]:
+            seen = self.seen[side]
+            key = hash_position(position)[0]
+            seen[key] = seen.get(key, 0) + 1
+            side ^= 1
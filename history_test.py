@@ -0,0 +1,80 @@
+"""Tests for the draw rules."""
+
+__author__ = 'lhurd'
+
+import unittest
+
+import history
+from bitboard import find_children, flip, from_string
+from board import BLACK, RED
+from moves_test import STARTING_BOARD
+from transposition import hash_position
+
+
+def _kings(black, red):
+    """Board string with a black king and a red king on squares."""
+    squares = ['-'] * 32
+    squares[black] = 'B'
+    squares[red] = 'R'
+    return ''.join(squares)
+
+
+# Two kings going back and forth.
+SHUFFLE = [_kings(0, 31), _kings(4, 31), _kings(4, 27), _kings(0, 27)]
+
+
+class HistoryTest(unittest.TestCase):
+    def test_is_progress(self):
+        start = from_string(STARTING_BOARD)
+        for child in find_children(start):
+            self.assertTrue(history.is_progress(start, child))
+        kings = from_string('------B--------B-------R--------')
+        for child in find_children(kings):
+            self.assertFalse(history.is_progress(kings, child))
+        # A king capturing.
+        capture = from_string('------B---r---------------R-----')
+        children = find_children(capture)
+        self.assertEqual(1, len(children))
+        self.assertTrue(history.is_progress(capture, children[0]))
+
+    def test_no_progress_plies(self):
+        positions = [from_string(STARTING_BOARD)] + [
+            from_string(board) for board in SHUFFLE * 2]
+        self.assertEqual(7, history.no_progress_plies(positions))
+        self.assertEqual(0, history.no_progress_plies(positions[:2]))
+        self.assertEqual(0, history.no_progress_plies(positions[:1]))
+
+    def test_repetition(self):
+        self.assertFalse(history.is_drawn(SHUFFLE + SHUFFLE[:1]))
+        self.assertTrue(history.is_drawn(SHUFFLE * 2 + SHUFFLE[:1]))
+        # The same position with the other player to move.
+        self.assertFalse(history.is_drawn(SHUFFLE[:3] * 3))
+
+    def test_no_progress(self):
+        boards = [_kings(square, 31 - square % 2) for square in range(30)]
+        self.assertFalse(history.is_drawn(boards))
+        self.assertTrue(history.is_drawn(boards, limit=29))
+        self.assertFalse(history.is_drawn([STARTING_BOARD] + boards[:29],
+                                          limit=29))
+
+    def test_history(self):
+        boards = [STARTING_BOARD] + SHUFFLE * 2
+        for is_black in (True, False):
+            positions = [from_string(board) for board in boards]
+            if not is_black:
+                positions = [flip(position) for position in positions]
+            h = history.History(boards, is_black)
+            self.assertEqual(7, h.quiet)
+            self.assertEqual(history.NO_PROGRESS_PLIES, h.limit)
+            # The player to move in the last position is black for the
+            # search.
+            self.assertEqual(2, h.seen[BLACK][
+                hash_position(positions[-1])[0]])
+            self.assertEqual(2, h.seen[RED][
+                hash_position(positions[-2])[0]])
+            self.assertNotIn(hash_position(positions[0])[0], h.seen[BLACK])
+        self.assertEqual(0, history.History().quiet)
+
+
+if __name__ == '__main__':
+    unittest.main()
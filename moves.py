@@ -10,6 +10,7 @@ of move is legal.
 """
 __author__ = 'lhurd'
 
+import re
 import string
 
 TABLE = string.maketrans('bBrR', 'rRbB')
@@ -53,6 +54,32 @@ BWD_JUMPS = ((8, 5, 1), (9, 5, 0), (9, 6, 2), (10, 6, 1), (10, 7, 3),
              (31, 26, 22))
 
 
+def _by_square(moves):
+    """Group move tuples by their first square.
+
+    Returns:
+      tuple indexed by square of the tuples of the rest of the moves from
+      that square (in the order of moves).
+    """
+    table = [[] for _ in range(32)]
+    for t in moves:
+        table[t[0]].append(t[1:])
+    return tuple(tuple(entries) for entries in table)
+
+
+# The same moves indexed by the square they start from, so that only the
+# moves of the checkers on the board are looked at: the squares a checker
+# steps to and the (jumped, landing) squares of its jumps.
+FWD_NEIGHBORS = tuple(tuple(target for target, in entries)
+                      for entries in _by_square(FWD_MOVES))
+BWD_NEIGHBORS = tuple(tuple(target for target, in entries)
+                      for entries in _by_square(BWD_MOVES))
+FWD_JUMPS_FROM = _by_square(FWD_JUMPS)
+BWD_JUMPS_FROM = _by_square(BWD_JUMPS)
+
+BLACK_PIECE = re.compile('[bB]')
+
+
 def flip(board):
     """Flip player whose turn it is so we can always look at things from
     black's point of view.
@@ -73,6 +100,11 @@ def find_children(board):
     return boards
 
 
+def _pieces(board):
+    """The squares of the black checkers in increasing order."""
+    return [m.start() for m in BLACK_PIECE.finditer(board)]
+
+
 #
 # Logic for non-jump moves, i.e., a single forward diagonal move for any
 # piece or a backward diagonal move for a king,
@@ -87,10 +119,11 @@ def _normal_moves(board):
     Returns:
       list of tuples giving start and finish coordinates
     """
-    fwd = [t for t in FWD_MOVES if board[t[0]].lower() == 'b'
-           and board[t[1]] == '-']
-    bwd = [t for t in BWD_MOVES if board[t[0]] == 'B'
-           and board[t[1]] == '-']
+    pieces = _pieces(board)
+    fwd = [(s, t) for s in pieces for t in FWD_NEIGHBORS[s]
+           if board[t] == '-']
+    bwd = [(s, t) for s in pieces if board[s] == 'B'
+           for t in BWD_NEIGHBORS[s] if board[t] == '-']
     return fwd + bwd
 
 
@@ -125,14 +158,14 @@ def has_jump(board):
     Returns:
       True if black has a jump..
     """
-    for t in FWD_JUMPS:
-        if (board[t[0]].lower() == 'b' and board[t[1]].lower() == 'r'
-            and board[t[2]] == '-'):
-            return True
-    for t in BWD_JUMPS:
-        if (board[t[0]] == 'B' and board[t[1]].lower() == 'r'
-            and board[t[2]] == '-'):
-            return True
+    for s in _pieces(board):
+        for over, land in FWD_JUMPS_FROM[s]:
+            if board[over] in 'rR' and board[land] == '-':
+                return True
+        if board[s] == 'B':
+            for over, land in BWD_JUMPS_FROM[s]:
+                if board[over] in 'rR' and board[land] == '-':
+                    return True
     return False
 
 
@@ -149,14 +182,16 @@ def _jump_moves(board):
     Returns:
       list of tuples giving path of checker and jumped locations.
     """
-    fwd = [t for t in FWD_JUMPS if board[t[0]].lower() == 'b'
-           and board[t[1]].lower() == 'r' and board[t[2]] == '-']
-    bwd = [t for t in BWD_JUMPS if board[t[0]] == 'B'
-           and board[t[1]].lower() == 'r' and board[t[2]] == '-']
-    single_jumps = fwd + bwd
+    pieces = _pieces(board)
+    fwd = [(s, over, land) for s in pieces
+           for over, land in FWD_JUMPS_FROM[s]
+           if board[over] in 'rR' and board[land] == '-']
+    bwd = [(s, over, land) for s in pieces if board[s] == 'B'
+           for over, land in BWD_JUMPS_FROM[s]
+           if board[over] in 'rR' and board[land] == '-']
     jumps = []
-    for j in single_jumps:
-        jumps += tuple(_continue_jump(board, list(j)))
+    for j in fwd + bwd:
+        jumps += _continue_jump(board, list(j))
     return jumps
 
 
@@ -174,26 +209,33 @@ def _continue_jump(board, jump_list):
         the input if no continuation is possible).
     """
     continuations = []
-    # check for forward continuations
-    jumped = set(jump_list[1::2])  # checkers that have already been jumped
-    for t in FWD_JUMPS:
-        if (t[0] == jump_list[-1]
-            and (board[t[2]] == '-' or t[2] == jump_list[0])
-            and t[1] not in jumped and board[t[1]].lower() == 'r'):
-            continuations += _continue_jump(board, jump_list + [t[1], t[2]])
-    # if piece is a king, check for backward continuations
-    if board[jump_list[0]] == 'B':
-        for t in BWD_JUMPS:
-            if (t[0] == jump_list[-1]
-                and (board[t[2]] == '-' or t[2] == jump_list[0])
-                and t[1] not in jumped
-                and board[t[1]].lower() == 'r'):
-                continuations += _continue_jump(board, jump_list
-                                                + [t[1], t[2]])
-    if continuations:
-        return continuations
-    else:
-        return [jump_list]
+    tables = ((FWD_JUMPS_FROM, BWD_JUMPS_FROM) if board[jump_list[0]] == 'B'
+              else (FWD_JUMPS_FROM,))
+    _extend_jump(board, jump_list, set(jump_list[1::2]), tables,
+                 continuations)
+    return continuations
+
+
+def _extend_jump(board, jump_list, jumped, tables, continuations):
+    """Add the continuations of a jump to a list.  jump_list and jumped
+    (the set of the checkers that have already been jumped) are extended
+    in place and restored on return, so each step only looks at the jumps
+    from the landing square.
+    """
+    current = jump_list[-1]
+    extended = False
+    for table in tables:
+        for over, land in table[current]:
+            if (over not in jumped and board[over] in 'rR'
+                    and (board[land] == '-' or land == jump_list[0])):
+                extended = True
+                jumped.add(over)
+                jump_list += (over, land)
+                _extend_jump(board, jump_list, jumped, tables, continuations)
+                del jump_list[-2:]
+                jumped.remove(over)
+    if not extended:
+        continuations.append(list(jump_list))
 
 
 def _apply_jump(board, move):
@@ -208,10 +250,12 @@ def _apply_jump(board, move):
     """
     assert (board[move[0]].lower() == 'b')
     board_list = list(board)
-    board_list[move[-1]] = board_list[move[0]]
+    piece = board_list[move[0]]
+    # Clear the starting square first: a king can jump around back to it.
+    board_list[move[0]] = '-'
+    board_list[move[-1]] = piece
     if move[-1] > 27:  # King the piece if necessary.
         board_list[move[-1]] = board_list[move[-1]].upper()
-    board_list[move[0]] = '-'
     # remove the jumped checkers
     for i in move[1::2]:
         board_list[i] = '-'
@@ -154,6 +154,17 @@ class MovesTest(unittest.TestCase):
                                '-----b---r----Bb-----b--r-------'],
                               moves.find_children(TEST_BOARD1))
 
+    def test_square_tables(self):
+        self.assertEqual(moves.FWD_MOVES, tuple(
+            (s, t) for s in range(32) for t in moves.FWD_NEIGHBORS[s]))
+        self.assertEqual(moves.BWD_MOVES, tuple(
+            (s, t) for s in range(32) for t in moves.BWD_NEIGHBORS[s]))
+        self.assertEqual(moves.FWD_JUMPS, tuple(
+            (s,) + j for s in range(32) for j in moves.FWD_JUMPS_FROM[s]))
+        self.assertEqual(moves.BWD_JUMPS, tuple(
+            (s,) + j for s in range(32) for j in moves.BWD_JUMPS_FROM[s]))
+        self.assertEqual([5, 15, 21, 30], moves._pieces(TEST_BOARD1))
+
     def test_flip(self):
         self.assertEqual('bbbb----bbbb--------rrrrrrrrrrrr',
                          moves.flip('bbbbbbbbbbbb--------rrrr----rrrr'))
@@ -237,6 +248,11 @@ class MovesTest(unittest.TestCase):
         # backward jump (king).
         self.assertEqual('-----b---r----Bb-----b--r-------',
                          moves._apply_jump(TEST_BOARD1, (30, 26, 23, 18, 14)))
+        # multiple jump (king) back to the starting square.
+        self.assertEqual('------------------R-------R--B--',
+                         moves._apply_jump(TEST_BOARD3,
+                                           (29, 24, 20, 16, 13, 17, 22, 25,
+                                            29)))
 
 
 if __name__ == '__main__':
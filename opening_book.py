@@ -0,0 +1,253 @@
+"""Opening book.
+
+The book maps positions to weighted moves.  Positions are identified by
+their Zobrist hash (see the transposition module) from the point of view
+of the player to move and moves by the hash of the resulting child (from
+the same point of view, i.e. before flipping), so a book entry is a
+fixed size record
+
+  position hash (8 bytes), child hash (8 bytes), weight (4 bytes)
+
+and the file is the records sorted by position hash.  Lookups binary
+search the memory-mapped file.
+
+Books are built either from deep searches of the positions near the
+start of the game or from the games played by batch.play_games.
+
+Usage:
+  python opening_book.py search [--depth D] [--plies P] BOOK
+  python opening_book.py games [--plies P] GAMES BOOK
+
+where GAMES is the JSON lines output of "batch.py selfplay".
+"""
+__author__ = 'lhurd'
+
+import argparse
+import bisect
+import json
+import logging
+import mmap
+import random
+import struct
+from collections import defaultdict
+
+from bitboard import find_children, flip, from_string
+from moves_test import STARTING_BOARD
+from transposition import TranspositionTable, hash_position
+from tree_search import INITIAL_DEPTH, NEGATIVE_INFINITY, Search, _search_root
+
+RECORD = struct.Struct('<QQI')
+DEFAULT_PLIES = 6
+WIN_WEIGHT = 2
+DRAW_WEIGHT = 1
+
+
+def write_book(path, moves):
+    """Write a book.
+
+    Args:
+      path: file name
+      moves: dictionary mapping position hashes to dictionaries mapping
+        child hashes to weights
+    """
+    with open(path, 'wb') as f:
+        for key in sorted(moves):
+            for child, weight in sorted(moves[key].items()):
+                if weight > 0:
+                    f.write(RECORD.pack(key, child, weight))
+
+
+def _key(position):
+    return hash_position(position)[0]
+
+
+def build_from_games(games, plies=DEFAULT_PLIES):
+    """Collect the moves of finished games into book moves weighted by
+    how well they did for the player who made them.
+
+    Args:
+      games: iterable of dictionaries with the positions, winner and draw
+        flag of a game (as generated by batch.play_games); games with
+        neither a winner nor a draw were stopped unfinished and are
+        skipped
+      plies: number of moves from the start of each game to use
+
+    Returns:
+      dictionary to pass to write_book.
+    """
+    moves = defaultdict(lambda: defaultdict(int))
+    for game in games:
+        winner = game['winner']
+        if winner is None and not game['draw']:
+            continue
+        board = STARTING_BOARD
+        black = True
+        for after in game['positions'][:plies]:
+            position = from_string(board)
+            child = from_string(after)
+            if not black:
+                position = flip(position)
+                child = flip(child)
+            if winner is None:
+                weight = DRAW_WEIGHT
+            elif (winner == 'black') == black:
+                weight = WIN_WEIGHT
+            else:
+                weight = 0
+            moves[_key(position)][_key(child)] += weight
+            board = after
+            black = not black
+    return moves
+
+
+def build_from_search(depth=INITIAL_DEPTH, plies=DEFAULT_PLIES,
+                      board=STARTING_BOARD):
+    """Search the positions of the first plies plies where one player
+    has kept to the book (whatever the other played) and record the best
+    moves (all of them when there is a tie), for both players.
+
+    Args:
+      depth: depth of the searches
+      plies: number of plies from the start of the game
+      board: the starting position (black to move)
+
+    Returns:
+      dictionary to pass to write_book.
+    """
+    moves = {}
+    table = TranspositionTable()
+    start = from_string(board)
+    # The positions at each ply, flipped so that the player to move is
+    # black.
+    frontiers = [{} for _ in range(plies + 1)]
+    frontiers[0][_key(start)] = start
+    for ply in range(plies):
+        for key, position in frontiers[ply].items():
+            if key in moves:
+                continue
+            children = find_children(position)
+            if not children:
+                continue
+            values = _search_root(position, children, depth, Search(table))
+            best = max(values)
+            if best == NEGATIVE_INFINITY:
+                continue
+            best_children = [c for c, v in zip(children, values) if v == best]
+            moves[key] = dict((_key(c), 1) for c in best_children)
+            for child in best_children:
+                # The opponent to move after the book move and the player
+                # to move again after any reply.
+                opponent = flip(child)
+                frontiers[ply + 1][_key(opponent)] = opponent
+                if ply + 2 < plies:
+                    for reply in find_children(opponent):
+                        frontiers[ply + 2][_key(flip(reply))] = flip(reply)
+        logging.info('Ply %d: %d positions', ply, len(moves))
+    return moves
+
+
+class OpeningBook(object):
+    """A memory-mapped book file."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file.
+            self._data = ''
+        self._count = len(self._data) // RECORD.size
+        self._keys = _Keys(self._data, self._count)
+
+    def close(self):
+        if self._data:
+            self._data.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._count
+
+    def probe(self, position):
+        """The book moves of a position.
+
+        Args:
+          position: bitboard.Position with black to move
+
+        Returns:
+          dictionary mapping child hashes to weights (empty if the
+          position is not in the book).
+        """
+        key = _key(position)
+        i = bisect.bisect_left(self._keys, key)
+        result = {}
+        while i < self._count:
+            record_key, child, weight = RECORD.unpack_from(
+                self._data, i * RECORD.size)
+            if record_key != key:
+                break
+            result[child] = weight
+            i += 1
+        return result
+
+    def choose(self, position, children, rng=random):
+        """Choose a book move at random in proportion to the weights.
+
+        Args:
+          position: bitboard.Position with black to move
+          children: the children of position
+          rng: source of random numbers
+
+        Returns:
+          one of the children or None if the position is not in the book.
+        """
+        book_moves = self.probe(position)
+        if not book_moves:
+            return None
+        candidates = [(c, book_moves[_key(c)]) for c in children
+                      if _key(c) in book_moves]
+        total = sum(weight for _, weight in candidates)
+        if not total:
+            return None
+        pick = rng.uniform(0, total)
+        for child, weight in candidates:
+            pick -= weight
+            if pick <= 0:
+                return child
+        return candidates[-1][0]
+
+
+class _Keys(object):
+    """Sequence view of the position hashes of a book for bisect."""
+
+    def __init__(self, data, count):
+        self._data = data
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        return struct.unpack_from('<Q', self._data, i * RECORD.size)[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build an opening book.')
+    parser.add_argument('source', choices=('search', 'games'))
+    parser.add_argument('files', nargs='+',
+                        help='GAMES BOOK for games, BOOK for search')
+    parser.add_argument('--depth', type=int, default=INITIAL_DEPTH)
+    parser.add_argument('--plies', type=int, default=DEFAULT_PLIES)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if args.source == 'search':
+        moves = build_from_search(args.depth, args.plies)
+    else:
+        with open(args.files[0]) as f:
+            moves = build_from_games((json.loads(line) for line in f),
+                                     args.plies)
+    write_book(args.files[-1], moves)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Tests for the opening book."""
+
+__author__ = 'lhurd'
+
+import os
+import random
+import tempfile
+import unittest
+
+import opening_book
+import tree_search
+from bitboard import find_children, flip, from_string, to_string
+from moves_test import STARTING_BOARD, TEST_BOARD1
+
+
+class OpeningBookTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_search_book(self):
+        opening_book.write_book(self.path, opening_book.build_from_search(
+            depth=2, plies=3))
+        book = opening_book.OpeningBook(self.path)
+        position = from_string(STARTING_BOARD)
+        children = find_children(position)
+        self.assertTrue(book.probe(position))
+        move = book.choose(position, children)
+        self.assertIn(move, children)
+        # Red, to move after each book move of black, has book moves and
+        # so has black after every reply of red.
+        book_moves = book.probe(position)
+        for child in children:
+            if opening_book._key(child) not in book_moves:
+                continue
+            red = flip(child)
+            replies = find_children(red)
+            self.assertIsNotNone(book.choose(red, replies))
+            for reply in replies:
+                self.assertTrue(book.probe(flip(reply)))
+        self.assertEqual({}, book.probe(from_string(TEST_BOARD1)))
+        self.assertIn(tree_search.find_move(STARTING_BOARD, True, book=book),
+                      [to_string(c) for c in children])
+        book.close()
+
+    def test_games_book(self):
+        first = find_children(from_string(STARTING_BOARD))
+        won = to_string(first[0])
+        lost = to_string(first[1])
+        games = [{'positions': [won], 'winner': 'black', 'draw': False},
+                 {'positions': [won], 'winner': None, 'draw': True},
+                 {'positions': [lost], 'winner': 'red', 'draw': False},
+                 # Unfinished.
+                 {'positions': [lost], 'winner': None, 'draw': False}]
+        opening_book.write_book(self.path,
+                                opening_book.build_from_games(games))
+        book = opening_book.OpeningBook(self.path)
+        self.assertEqual(1, len(book))
+        self.assertEqual([3], book.probe(from_string(STARTING_BOARD)).values())
+        self.assertEqual(first[0], book.choose(from_string(STARTING_BOARD),
+                                               first, random.Random(1)))
+        book.close()
+
+    def test_empty_book(self):
+        book = opening_book.OpeningBook(self.path)
+        self.assertIsNone(book.choose(from_string(STARTING_BOARD),
+                                      find_children(from_string(
+                                          STARTING_BOARD))))
+        book.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""Move ordering for the alpha-beta search.
+
+Children are searched in the order: best move found by an earlier search
+(from the transposition table or the previous iteration), killer moves
+(quiet moves that caused a cut-off at the same ply elsewhere in the
+tree) and then quiet moves by their history score (how often and how
+deep they have caused cut-offs anywhere in the tree).
+
+Moves are identified by the squares the moving checker left and reached,
+i.e. move.source | move.target for a board.Move, so that the same move
+can be recognized in sibling positions.
+
+staged_moves generates the moves in that order one stage at a time so
+that a node that cuts off early never generates the rest: the hash move
+is checked and searched before anything is generated, the jumps (which
+are compulsory) come one continuation at a time, and the quiet moves are
+only generated and sorted once the killers have failed.
+"""
+__author__ = 'lhurd'
+
+MAX_PLY = 128
+KILLERS_PER_PLY = 2
+
+
+class MoveOrderer(object):
+    """Killer and history tables for one search along with statistics on
+    how well the ordering worked.
+    """
+
+    def __init__(self):
+        self.killers = [[] for _ in range(MAX_PLY)]
+        self.history = {}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def record_cutoff(self, move, ply, depth, index):
+        """Update the tables after a move caused a beta cut-off.
+
+        Args:
+          move: the board.Move that caused the cut-off
+          ply: distance of the position from the root
+          depth: remaining depth of the search at the position
+          index: position of the move in the order it was searched
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if move.captured:
+            # Captures are forced so there is nothing to learn from them.
+            return
+        squares = move.source | move.target
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if squares in killers:
+                killers.remove(squares)
+            killers.insert(0, squares)
+            del killers[KILLERS_PER_PLY:]
+        self.history[squares] = self.history.get(squares, 0) + depth * depth
+
+    def first_move_cutoff_rate(self):
+        """Fraction of cut-offs caused by the first child searched (the
+        closer to 1 the better the ordering).
+        """
+        if not self.cutoffs:
+            return 0.0
+        return float(self.first_move_cutoffs) / self.cutoffs
+
+
+def staged_moves(board, hash_move=None, orderer=None, ply=0,
+                 has_jump=None):
+    """Generate the legal moves of a position lazily in the order
+    described above.
+
+    Args:
+      board: board.Board, which may be changed between moves as long as
+        it is restored
+      hash_move: the best move found by an earlier search, if any (it is
+        skipped if it is not legal)
+      orderer: optional MoveOrderer with the killer and history tables
+        (without one the quiet moves come in the order of Board.steps)
+      ply: distance of the position from the root
+      has_jump: board.has_jump() if it is known
+    """
+    if has_jump is None:
+        has_jump = board.has_jump()
+    if hash_move is not None:
+        if hash_move.captured:
+            legal = has_jump and hash_move in board.jumps()
+        else:
+            legal = (not has_jump and board.step(
+                hash_move.source, hash_move.target) == hash_move)
+        if legal:
+            yield hash_move
+        else:
+            hash_move = None
+    if has_jump:
+        for move in board.jumps():
+            if move != hash_move:
+                yield move
+        return
+    if orderer is None:
+        for move in board.steps():
+            if move != hash_move:
+                yield move
+        return
+    movers = board.pieces[board.side]
+    killers = []
+    for squares in tuple(orderer.killers[ply] if ply < MAX_PLY else ()):
+        source = squares & movers
+        if source and source != squares:
+            move = board.step(source, squares ^ source)
+            if move is not None and move != hash_move:
+                killers.append(move)
+                yield move
+    history = orderer.history
+    for move in sorted(board.steps(),
+                       key=lambda m: history.get(m.source | m.target, 0),
+                       reverse=True):
+        if move != hash_move and move not in killers:
+            yield move
@@ -0,0 +1,101 @@
+"""Tests for move ordering."""
+
+__author__ = 'lhurd'
+
+import unittest
+
+import bitboard
+import tree_search
+from board import RED, Board
+from moves_test import STARTING_BOARD, TEST_BOARD1, TEST_BOARD2
+from ordering import MoveOrderer, staged_moves
+
+
+class MoveOrdererTest(unittest.TestCase):
+    def test_order(self):
+        orderer = MoveOrderer()
+        board = Board(bitboard.from_string(STARTING_BOARD))
+        moves = list(board.moves())
+
+        def first(ply, hash_move=None):
+            return next(staged_moves(board, hash_move, orderer, ply))
+
+        self.assertEqual(moves, list(staged_moves(board, None, orderer, 1)))
+        # The move that caused a cut-off is now first by its history
+        # score at any ply.
+        orderer.record_cutoff(moves[3], 1, 4, 2)
+        self.assertEqual(moves[3], first(1))
+        self.assertEqual(moves[3], first(2))
+        # A killer at the same ply beats a better history score and the
+        # hash move beats both.
+        orderer.record_cutoff(moves[1], 2, 1, 2)
+        self.assertEqual(moves[1], first(2))
+        self.assertEqual(moves[3], first(1))
+        self.assertEqual(moves[5], first(1, moves[5]))
+        self.assertEqual(0.0, orderer.first_move_cutoff_rate())
+        orderer.record_cutoff(moves[4], 1, 4, 0)
+        orderer.record_cutoff(moves[4], 1, 4, 0)
+        self.assertEqual(0.5, orderer.first_move_cutoff_rate())
+
+    def test_staged_moves(self):
+        orderer = MoveOrderer()
+        board = Board(bitboard.from_string(STARTING_BOARD))
+        moves = list(board.moves())
+        orderer.record_cutoff(moves[3], 1, 4, 2)
+        orderer.record_cutoff(moves[1], 1, 1, 2)
+        orderer.record_cutoff(moves[2], 2, 3, 2)
+        # The hash move, the killers of the ply (the latest first) and the
+        # rest by their history scores, each move once.
+        rest = [moves[2]] + [m for m in moves if m not in moves[1:4]]
+        for hash_move, expected in (
+                (None, [moves[1], moves[3]] + rest),
+                (moves[5], [moves[5], moves[1], moves[3]]
+                 + [m for m in rest if m != moves[5]]),
+                (moves[1], [moves[1], moves[3]] + rest)):
+            self.assertEqual(expected, list(staged_moves(board, hash_move,
+                                                         orderer, 1)))
+        self.assertEqual(moves, list(staged_moves(board)))
+        # The captures of another position are not legal here.
+        jumps = list(Board(bitboard.from_string(TEST_BOARD2)).jumps())
+        self.assertEqual(moves, list(staged_moves(board, jumps[0])))
+        board = Board(bitboard.from_string(TEST_BOARD2))
+        self.assertEqual(jumps, list(staged_moves(board, moves[0],
+                                                  orderer, 1)))
+
+    def test_lazy(self):
+        class CountingBoard(Board):
+            __slots__ = ('generated',)
+
+            def steps(self):
+                for move in Board.steps(self):
+                    self.generated += 1
+                    yield move
+
+        board = CountingBoard(bitboard.from_string(STARTING_BOARD))
+        board.generated = 0
+        moves = list(board.moves())
+        board.generated = 0
+        # A cut-off by the hash move generates nothing else.
+        self.assertEqual(moves[4], next(staged_moves(board, moves[4])))
+        self.assertEqual(0, board.generated)
+        next(staged_moves(board))
+        self.assertEqual(1, board.generated)
+
+    def test_search_values(self):
+        # Ordering must not change the result of the search (without the
+        # selective search, whose prunes depend on the order).
+        position = bitboard.from_string(TEST_BOARD1)
+        search = tree_search.Search(orderer=MoveOrderer(), late_moves=None,
+                                    futility_margin=None, razor_margin=None)
+        for child in bitboard.find_children(position):
+            self.assertEqual(
+                tree_search.negamax(Board(child, RED), 5,
+                                    tree_search.NEGATIVE_INFINITY,
+                                    tree_search.INFINITY),
+                tree_search.negamax(Board(child, RED), 5,
+                                    tree_search.NEGATIVE_INFINITY,
+                                    tree_search.INFINITY, search))
+
+
+if __name__ == '__main__':
+    unittest.main()
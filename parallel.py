@@ -0,0 +1,251 @@
+"""Searching the children of the root in parallel.
+
+The children of the root are independent searches so they are spread
+over a pool of processes (threads would be serialized by the GIL).  We
+use the young brothers wait scheme at the root: tree_search._search_root
+searches the first child (the best one of the previous iteration) on its
+own to get a bound and hands the remaining children to a ParallelSearch,
+whose workers search them with null windows that only tell whether they
+beat it.  As children finish, the bound is raised in shared memory so
+that later children start with the best bound known at the time.
+
+Everything else is tree_search.analyze: the book, the tablebase, the
+draw rules, iterative deepening with aspiration windows, the statistics
+and the principal variation all work the same with workers, e.g.
+
+  with ParallelSearch(workers=4) as workers:
+      analysis = tree_search.analyze(board, True, time_limit=5,
+                                     workers=workers)
+
+The workers search with the settings of the Search of the root (the
+evaluator, the draw history, the margins and so on) and the tablebase
+of the same directory.  Each keeps its own transposition table between
+tasks, ages it like tree_search.TABLE at every call to analyze and
+clears it when the settings change.  Since which worker gets which
+child depends on timing, the values of losing moves depend on timing
+too.  A ParallelSearch created with deterministic=True searches every
+child with the bound from the first child and an empty table, and
+analyze then breaks ties by taking the first of the best moves, so that
+the result is the same every time.
+"""
+__author__ = 'lhurd'
+
+import multiprocessing
+import time
+
+import tree_search
+from board import RED, Board
+from history import History, is_progress
+from ordering import MoveOrderer
+from stats import SearchStats
+from tablebase import Tablebase
+from transposition import DEFAULT_SIZE, TranspositionTable
+from tree_search import (NEGATIVE_INFINITY, Search, SearchTimeout,
+                         negamax)
+
+# The attributes of a Search that the workers search with.
+SETTINGS = ('quiescence_depth', 'delta_margin', 'evaluator', 'late_moves',
+            'late_move_reduction', 'late_move_depth', 'futility_margin',
+            'razor_margin')
+
+# State of a worker process (set by _init_worker).
+_shared_alpha = None
+_table = None
+_orderer = None
+_generation = None
+_settings = None
+_tablebases = {}
+
+
+def _init_worker(shared_alpha, table_size):
+    global _shared_alpha, _table
+    _shared_alpha = shared_alpha
+    _table = TranspositionTable(table_size)
+
+
+def _tablebase(directory):
+    """The tablebase of a directory, opened once per worker."""
+    if directory is None:
+        return None
+    tablebase = _tablebases.get(directory)
+    if tablebase is None:
+        tablebase = _tablebases[directory] = Tablebase(directory)
+    return tablebase
+
+
+def _search_child(task):
+    """Search a child of the root in a worker process.
+
+    Args:
+      task: tuple of the generation of the search (see
+        ParallelSearch.new_search), child, depth, the best value so far,
+        beta, deadline, settings (dictionary of the SETTINGS of the
+        Search and the directory of its tablebase), draw history (tuple
+        of the seen, quiet and limit attributes of a history.History, or
+        None), whether to collect stats and whether to search
+        deterministically (with best as the bound and an empty table)
+
+    Returns:
+      tuple of the value of the child (exact if it is at least the best
+      value and below beta, a bound otherwise), the line that follows it,
+      the number of nodes searched, the seconds spent and the
+      stats.SearchStats (or None), or None if the deadline passed.
+    """
+    global _orderer, _generation, _settings
+    (generation, child, depth, best, beta, deadline, settings, draws,
+     collect_stats, deterministic) = task
+    if settings != _settings or deterministic:
+        # The entries of searches with other settings would be wrong.
+        _table.clear()
+        _settings = settings
+    if generation != _generation or deterministic:
+        _table.new_search()
+        _orderer = MoveOrderer()
+        _generation = generation
+    if not deterministic:
+        best = max(best, _shared_alpha.value)
+    history = None
+    if draws is not None:
+        history = History()
+        history.seen, history.quiet, history.limit = draws
+    kwargs = dict(settings)
+    search = Search(_table, _orderer, deadline,
+                    tablebase=_tablebase(kwargs.pop('tablebase')),
+                    stats=SearchStats() if collect_stats else None,
+                    history=history, **kwargs)
+    board = Board(child, RED)
+    start = time.time()
+    try:
+        # The null window only tells whether the child is at least as
+        # good as the best so far and those that are get searched again
+        # for their exact value.
+        value = negamax(board, depth, -best, 1 - best, search)
+        if best <= value < beta:
+            value = negamax(board, depth, -beta, 1 - best, search)
+    except SearchTimeout:
+        return None
+    with _shared_alpha.get_lock():
+        if value > _shared_alpha.value:
+            _shared_alpha.value = value
+    return (value, search.pv.get(1, []), search.nodes, time.time() - start,
+            search.stats)
+
+
+class ParallelSearch(object):
+    """A pool of worker processes for searching the root in parallel.
+
+    Creating the pool is expensive so the object is meant to be kept for
+    the lifetime of the program (or used as a context manager).
+
+    Attributes:
+      workers: number of processes
+      deterministic: True if the same board always gives the same result
+      table: TranspositionTable for the searches of the first child
+    """
+
+    def __init__(self, workers=None, table_size=DEFAULT_SIZE,
+                 deterministic=False):
+        """
+        Args:
+          workers: number of processes (defaults to the number of CPUs)
+          table_size: size of the transposition table of each process
+          deterministic: if True the same board always gives the same
+            result (ties are not broken randomly)
+        """
+        self.workers = workers or multiprocessing.cpu_count()
+        self.deterministic = deterministic
+        self.table = TranspositionTable(table_size)
+        self._generation = 0
+        self._alpha = multiprocessing.Value('i', NEGATIVE_INFINITY)
+        self._pool = multiprocessing.Pool(self.workers, _init_worker,
+                                          (self._alpha, table_size))
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def analyze(self, board, is_black, time_limit=None, max_depth=None,
+                **kwargs):
+        """tree_search.analyze with the workers and self.table (or an
+        empty table if deterministic).
+
+        Args:
+          board: current board string
+          is_black: True if current player is black
+          time_limit: optional number of seconds to search for
+          max_depth: depth of the search (see tree_search.analyze)
+          kwargs: other arguments of tree_search.analyze
+
+        Returns:
+          tree_search.Analysis.
+        """
+        table = self.table
+        if self.deterministic:
+            table = TranspositionTable(table.size)
+        return tree_search.analyze(board, is_black, time_limit, max_depth,
+                                   table, workers=self, **kwargs)
+
+    def find_move(self, board, is_black, time_limit=None, max_depth=None):
+        """tree_search.find_move with the workers."""
+        return self.analyze(board, is_black, time_limit, max_depth).move
+
+    def new_search(self):
+        """Make the workers age the entries of their tables (called by
+        tree_search.analyze like TranspositionTable.new_search).
+        """
+        self._generation += 1
+
+    def search_children(self, position, children, depth, search, best,
+                        beta):
+        """Search children of the root with null windows below the best
+        value so far (see tree_search._search_root).
+
+        Args:
+          position: bitboard.Position of the root
+          children: the children to search
+          depth: depth of the searches
+          search: the Search of the root, whose nodes and stats the work
+            of the workers is added to
+          best: the best value so far
+          beta: the beta cut-off
+
+        Returns:
+          list of the value and the line that follows (list of
+          board.Move) of each child.
+
+        Raises:
+          SearchTimeout: if the deadline of search passed.
+        """
+        settings = dict((name, getattr(search, name)) for name in SETTINGS)
+        tablebase = search.tablebase
+        settings['tablebase'] = (None if tablebase is None
+                                 else tablebase.directory)
+        history = search.history
+        tasks = []
+        for child in children:
+            draws = None
+            if history is not None:
+                quiet = 0 if is_progress(position, child) else (
+                    history.quiet + 1)
+                draws = (history.seen, quiet, history.limit)
+            tasks.append((self._generation, child, depth, best, beta,
+                          search.deadline, settings, draws,
+                          search.stats is not None, self.deterministic))
+        self._alpha.value = best
+        results = self._pool.map(_search_child, tasks, chunksize=1)
+        if None in results:
+            raise SearchTimeout()
+        stats = search.stats
+        for child, (value, _, nodes, seconds, child_stats) in zip(children,
+                                                                  results):
+            search.nodes += nodes
+            if stats is not None:
+                stats.add(child_stats)
+                stats.root_child(child, value, nodes, seconds)
+        return [(value, line) for value, line, _, _, _ in results]
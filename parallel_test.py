@@ -0,0 +1,126 @@
+"""Tests for the parallel search."""
+
+__author__ = 'lhurd'
+
+import multiprocessing
+import time
+import unittest
+
+import bitboard
+import moves
+import parallel
+import tree_search
+from history import DRAW
+from moves_test import STARTING_BOARD, TEST_BOARD1
+from parallel import ParallelSearch
+from stats import SearchStats
+from transposition import TranspositionTable
+
+# Without the selective search, whose prunes depend on the move order.
+OFF = {'late_moves': None, 'futility_margin': None, 'razor_margin': None}
+
+
+class ParallelSearchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.workers = ParallelSearch(workers=2, table_size=1024)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.workers.close()
+
+    def test_matches_serial_search(self):
+        for board in (STARTING_BOARD, TEST_BOARD1):
+            position = bitboard.from_string(board)
+            children = bitboard.find_children(position)
+            values = tree_search._search_root(position, children, 4,
+                                              tree_search.Search(**OFF))
+            best = [bitboard.to_string(c) for c, v in
+                    zip(children, values) if v == max(values)]
+            stats = SearchStats()
+            analysis = tree_search.analyze(
+                board, True, max_depth=4, table=TranspositionTable(1024),
+                stats=stats, workers=self.workers, **OFF)
+            self.assertEqual(max(values), analysis.score)
+            self.assertIn(analysis.move, best)
+            # The line of the move comes back from the worker that searched
+            # it.
+            self.assertEqual(5, len(analysis.pv))
+            before = board
+            for i, after in enumerate(analysis.pv):
+                if i % 2:
+                    self.assertIn(moves.flip(after), moves.find_children(
+                        moves.flip(before)))
+                else:
+                    self.assertIn(after, moves.find_children(before))
+                before = after
+            # The work of the workers is in the stats.
+            self.assertEqual(len(children), len(stats.root_children))
+            self.assertEqual(analysis.nodes, stats.nodes)
+            self.assertEqual(analysis.nodes,
+                             sum(c[2] for c in stats.root_children))
+            self.assertGreater(stats.ply_nodes[2], len(children))
+
+    def test_deterministic(self):
+        with ParallelSearch(workers=2, table_size=1024,
+                            deterministic=True) as workers:
+            for board in (STARTING_BOARD, TEST_BOARD1):
+                analysis = workers.analyze(board, True, max_depth=4)
+                for _ in range(3):
+                    self.assertEqual(analysis[:4],
+                                     workers.analyze(board, True,
+                                                     max_depth=4)[:4])
+
+    def test_shared_alpha(self):
+        # A child that cannot beat the best value found by another worker
+        # is refuted with fewer nodes.
+        child = bitboard.find_children(bitboard.from_string(TEST_BOARD1))[0]
+        search = tree_search.Search()
+        settings = dict((name, getattr(search, name))
+                        for name in parallel.SETTINGS)
+        settings['tablebase'] = None
+        results = []
+        for generation, shared in enumerate((tree_search.NEGATIVE_INFINITY,
+                                             None)):
+            if shared is None:
+                shared = results[0][0][0] + 1
+            alpha = multiprocessing.Value('i', shared)
+            parallel._init_worker(alpha, 1024)
+            results.append((parallel._search_child(
+                (generation, child, 5, tree_search.NEGATIVE_INFINITY,
+                 tree_search.INFINITY, None, settings, None, False, False)),
+                            alpha.value))
+        (value, _, nodes, _, _), shared = results[0]
+        self.assertEqual(value, shared)
+        (bound, _, refuted_nodes, _, _), shared = results[1]
+        self.assertEqual(value + 1, shared)
+        self.assertLessEqual(bound, value)
+        self.assertLess(refuted_nodes, nodes)
+
+    def test_time_limit(self):
+        start = time.time()
+        analysis = self.workers.analyze(STARTING_BOARD, True, time_limit=0.5)
+        self.assertLess(time.time() - start, 10)
+        self.assertGreaterEqual(analysis.depth, 1)
+        self.assertLess(analysis.depth, tree_search.MAX_DEPTH)
+        self.assertIn(analysis.move, moves.find_children(STARTING_BOARD))
+        self.assertIn(self.workers.find_move(TEST_BOARD1, True, max_depth=3),
+                      moves.find_children(TEST_BOARD1))
+
+    def test_draws(self):
+        # The workers score repetitions of the game as draws (see
+        # tree_search_test.DrawTest).
+        board = '------B--------B-------R--------'
+        children = moves.find_children(board)
+        game = []
+        for child in children:
+            game += [child, board]
+        game.pop()
+        self.assertGreater(self.workers.analyze(board, True, max_depth=4,
+                                                history=None).score, DRAW)
+        self.assertEqual(DRAW, self.workers.analyze(
+            board, True, max_depth=4, history=game).score)
+
+
+if __name__ == '__main__':
+    unittest.main()
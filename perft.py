@@ -0,0 +1,121 @@
+"""Perft: the number of leaves of the game tree at a fixed depth.
+
+Perft counts are the standard check of a move generator (they are known
+for the starting position: 7, 49, 302, 1469, 7361, 36768, 179740, 845931,
+3963680, 18391564, ...) and a benchmark of its speed.  The counts are
+computed on bitboards with the moves one ply above the leaves counted by
+bitboard.count_moves rather than generated, and optionally with the
+counts of the subtrees memoized by position and depth, which makes the
+deep counts from the starting position practical as most of the tree is
+made of transpositions.  reference_perft counts with the string move
+generator of the moves module, which the bitboards are checked against.
+
+Usage:
+  python perft.py [--board BOARD] [--divide] [--no-cache] DEPTH
+"""
+__author__ = 'lhurd'
+
+import argparse
+import time
+
+import moves
+from bitboard import count_moves, find_children, flip, from_string, to_string
+from moves_test import STARTING_BOARD
+
+
+def _position(board):
+    if isinstance(board, basestring):
+        return from_string(board)
+    return board
+
+
+def _perft(position, depth, cache):
+    if depth <= 1:
+        return count_moves(position) if depth else 1
+    if cache is not None:
+        key = (position, depth)
+        count = cache.get(key)
+        if count is not None:
+            return count
+    count = 0
+    for child in find_children(position):
+        count += _perft(flip(child), depth - 1, cache)
+    if cache is not None:
+        cache[key] = count
+    return count
+
+
+def perft(board, depth, memoize=True):
+    """Number of leaves of the game tree of a position at a depth.
+
+    Args:
+      board: board string or bitboard.Position with black to move
+      depth: number of plies
+      memoize: whether to cache the counts of the subtrees
+
+    Returns:
+      number of positions reached after depth plies (counting each way
+      of reaching them).
+    """
+    return _perft(_position(board), depth, {} if memoize else None)
+
+
+def reference_perft(board, depth):
+    """Perft with the string move generator of the moves module (without
+    counting the last ply nor memoizing).
+
+    Args:
+      board: board string with black to move
+      depth: number of plies
+    """
+    if depth == 0:
+        return 1
+    return sum(reference_perft(moves.flip(child), depth - 1)
+               for child in moves.find_children(board))
+
+
+def divide(board, depth, memoize=True):
+    """Perft broken down by the moves of the position, for finding the
+    move where two move generators disagree.
+
+    Args:
+      board: board string or bitboard.Position with black to move
+      depth: number of plies (at least 1)
+      memoize: whether to cache the counts of the subtrees
+
+    Returns:
+      list of (child board string, count) tuples in the order of
+      bitboard.find_children, where the count is the number of leaves
+      below the child.
+    """
+    cache = {} if memoize else None
+    return [(to_string(child), _perft(flip(child), depth - 1, cache))
+            for child in find_children(_position(board))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Count perft leaves.')
+    parser.add_argument('depth', type=int)
+    parser.add_argument('--board', default=STARTING_BOARD,
+                        help='board string with black to move')
+    parser.add_argument('--divide', action='store_true',
+                        help='print the count of each move')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='do not memoize the subtree counts')
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    if args.divide:
+        counts = divide(args.board, args.depth, not args.no_cache)
+        for child, count in counts:
+            print child, count
+        total = sum(count for _, count in counts)
+    else:
+        total = perft(args.board, args.depth, not args.no_cache)
+    elapsed = max(time.time() - start, 1e-9)
+    print 'perft(%d) = %d in %.2fs (%d leaves/s)' % (
+        args.depth, total, elapsed, total / elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Tests for perft."""
+
+__author__ = 'lhurd'
+
+import unittest
+
+import moves
+import perft
+from moves_test import STARTING_BOARD, TEST_BOARD1, TEST_BOARD3
+
+# Leaf counts from the starting position.
+STARTING_COUNTS = [1, 7, 49, 302, 1469, 7361, 36768, 179740, 845931]
+
+
+class PerftTest(unittest.TestCase):
+    def test_starting_position(self):
+        self.assertEqual(STARTING_COUNTS,
+                         [perft.perft(STARTING_BOARD, depth)
+                          for depth in range(len(STARTING_COUNTS))])
+        self.assertEqual(STARTING_COUNTS[:6],
+                         [perft.perft(STARTING_BOARD, depth, memoize=False)
+                          for depth in range(6)])
+
+    def test_string_generator(self):
+        # The string move generator of the moves module must agree.
+        self.assertEqual(STARTING_COUNTS[:5],
+                         [perft.reference_perft(STARTING_BOARD, depth)
+                          for depth in range(5)])
+        for board in (TEST_BOARD1, TEST_BOARD3):
+            for depth in range(6):
+                self.assertEqual(perft.reference_perft(board, depth),
+                                 perft.perft(board, depth))
+
+    def test_divide(self):
+        counts = perft.divide(STARTING_BOARD, 4)
+        self.assertEqual(7, len(counts))
+        self.assertEqual(STARTING_COUNTS[4], sum(c for _, c in counts))
+        for child, count in counts:
+            self.assertEqual(perft.reference_perft(moves.flip(child), 3),
+                             count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,304 @@
+"""Searching on the opponent's time.
+
+After the engine has chosen a move the opponent (usually a person) takes
+a while to reply and the engine would otherwise be idle.  A Ponderer
+spends that time searching, in a background thread, the positions that
+each reply of the opponent would leave.  When the next request is for
+one of them with the same settings (evaluator, tablebase, history of the
+game and so on, which the pondering searches with) and it was pondered
+for at least as long (or as deep) as the request asks for, the answer is
+immediate.  Otherwise the search starts from the entries the pondering
+left in the transposition table, which is shared with the normal
+searches.  Replies in the opening book are left to the book.
+
+The replies are deepened one iteration at a time in turn, starting with
+the reply the principal variation expects, so the time is spread over
+all of them with the most likely one first.  Pondering stops as soon as
+the next request arrives (or stop() is called), after max_time or when
+every reply reached max_depth.  Its memory is bounded by the
+transposition table and by max_replies.
+"""
+__author__ = 'lhurd'
+
+import logging
+import random
+import threading
+import time
+
+import tree_search
+from bitboard import find_children, flip, from_string, to_string
+from history import History
+from ordering import MoveOrderer
+from transposition import TranspositionTable
+from tree_search import (INITIAL_DEPTH, MAX_DEPTH, Analysis, Search,
+                         SearchTimeout, _search_root)
+
+MAX_REPLIES = 16
+# Seconds after which pondering gives up.
+MAX_TIME = 60.0
+
+
+class _Reply(object):
+    """The search of a position that a reply of the opponent would leave.
+
+    Attributes:
+      board: board string of the position
+      is_black: True if black is to move in it
+      settings: the other arguments of tree_search.analyze it is searched
+        with (see _settings)
+      children: children of the position (as in tree_search.analyze),
+        the best of the last iteration first
+      values: values of the children at depth (None before the first
+        iteration)
+      depth: depth of the last iteration that finished
+      elapsed: seconds spent searching the position
+      nodes: number of nodes searched
+    """
+
+    def __init__(self, board, is_black, settings):
+        self.board = board
+        self.is_black = is_black
+        self.settings = settings
+        self.position = from_string(board)
+        if not is_black:
+            self.position = flip(self.position)
+        self.children = find_children(self.position)
+        self.orderer = MoveOrderer()
+        self.values = None
+        self.depth = 0
+        self.elapsed = 0.0
+        self.nodes = 0
+
+    def covers(self, time_limit, max_depth):
+        """True if the result is as good as that of a search with the
+        given time limit and depth (see tree_search.analyze).
+        """
+        if len(self.children) <= 1:
+            return True
+        if time_limit is None:
+            return self.depth >= (INITIAL_DEPTH if max_depth is None
+                                  else max_depth)
+        return self.depth > 0 and (
+            self.elapsed >= time_limit or
+            self.depth >= (MAX_DEPTH if max_depth is None else max_depth))
+
+    def search(self, table, deadline):
+        """A Search of the position with the settings."""
+        settings = self.settings
+        history = settings.get('history', ())
+        if history is not None:
+            history = History(list(history) + [self.board], self.is_black)
+        kwargs = dict((name, settings[name]) for name in (
+            'tablebase', 'quiescence_depth', 'evaluator', 'late_moves',
+            'late_move_reduction', 'late_move_depth', 'futility_margin',
+            'razor_margin') if name in settings)
+        return Search(table, self.orderer, deadline, history=history,
+                      **kwargs)
+
+    def update(self, depth, values):
+        self.depth = depth
+        pairs = sorted(zip(values, self.children), key=lambda p: -p[0])
+        self.values = [value for value, _ in pairs]
+        self.children = [child for _, child in pairs]
+
+    def analysis(self):
+        """The result as a tree_search.Analysis (the principal variation
+        is only the move).
+        """
+        if not self.children:
+            return Analysis(None, None, 0, 0, None, [])
+        if self.values is None:
+            best_value = None
+            best_children = self.children
+        else:
+            best_value = self.values[0]
+            best_children = [child for child, value
+                             in zip(self.children, self.values)
+                             if value == best_value]
+        child = random.choice(best_children)
+        if not self.is_black:
+            child = flip(child)
+        move = to_string(child)
+        return Analysis(move, best_value, self.depth, self.nodes, None,
+                        [move])
+
+
+class Ponderer(object):
+    """Searches for moves and ponders the replies to them.
+
+    Attributes:
+      table: the TranspositionTable of all the searches
+      hits: requests answered from the pondering
+      head_starts: requests for a pondered position that were searched
+        again (with the table filled by the pondering)
+      misses: requests for positions that were not pondered (or were
+        pondered with other settings)
+    """
+
+    def __init__(self, table=None, max_replies=MAX_REPLIES,
+                 max_time=MAX_TIME, max_depth=MAX_DEPTH):
+        """
+        Args:
+          table: TranspositionTable (a new one by default)
+          max_replies: maximum number of replies pondered
+          max_time: seconds after which pondering stops
+          max_depth: depth after which the pondering of a reply stops
+        """
+        self.table = TranspositionTable() if table is None else table
+        self.max_replies = max_replies
+        self.max_time = max_time
+        self.max_depth = max_depth
+        self.hits = 0
+        self.head_starts = 0
+        self.misses = 0
+        self._replies = {}
+        self._thread = None
+        self._search = None
+        self._stopped = False
+
+    def analyze(self, board, is_black, time_limit=None, max_depth=None,
+                **kwargs):
+        """tree_search.analyze using the pondering, which then starts on
+        the replies to the move.
+
+        Args:
+          board: current board string
+          is_black: True if current player is black
+          time_limit: optional number of seconds to search for
+          max_depth: depth of the search (see tree_search.analyze)
+          kwargs: other arguments of tree_search.analyze (the replies are
+            pondered with the same ones)
+
+        Returns:
+          tree_search.Analysis.
+        """
+        self.stop()
+        settings = _settings(kwargs)
+        reply = self._replies.get((board, is_black))
+        self._replies = {}
+        if reply is not None and reply.settings != settings:
+            reply = None
+        if reply is not None and reply.covers(time_limit, max_depth):
+            self.hits += 1
+            analysis = reply.analysis()
+        else:
+            if reply is None:
+                self.misses += 1
+            else:
+                self.head_starts += 1
+            analysis = tree_search.analyze(board, is_black, time_limit,
+                                           max_depth, self.table, **kwargs)
+        if analysis.move is not None:
+            if settings.get('history') is not None:
+                settings['history'] += (board,)
+            self.start(analysis.move, not is_black, analysis.pv[1:2],
+                       **settings)
+        return analysis
+
+    def find_move(self, board, is_black, time_limit=None, max_depth=None):
+        """tree_search.find_move using the pondering."""
+        return self.analyze(board, is_black, time_limit, max_depth).move
+
+    def start(self, board, is_black, expected=(), **kwargs):
+        """Start pondering the replies in a position (stopping any earlier
+        pondering).
+
+        Args:
+          board: board string
+          is_black: True if the opponent (black) is to reply
+          expected: boards after the replies to ponder first
+          kwargs: arguments of tree_search.analyze to ponder with, the
+            history ending before board
+        """
+        self.stop()
+        settings = _settings(kwargs)
+        if settings.get('history') is not None:
+            settings['history'] += (board,)
+        book = settings.get('book')
+        position = from_string(board)
+        if not is_black:
+            position = flip(position)
+        boards = []
+        for child in find_children(position):
+            if book is not None and book.probe(flip(child)):
+                continue
+            if not is_black:
+                child = flip(child)
+            boards.append(to_string(child))
+        boards.sort(key=lambda b: b not in expected)
+        replies = [_Reply(b, not is_black, settings)
+                   for b in boards[:self.max_replies]]
+        self._replies = dict(((r.board, r.is_black), r) for r in replies)
+        self._stopped = False
+        self._thread = threading.Thread(target=self._ponder, args=(replies,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop pondering (the results so far are kept)."""
+        if self._thread is None:
+            return
+        self._stopped = True
+        search = self._search
+        if search is not None:
+            search.deadline = 0
+        self._thread.join()
+        self._thread = None
+
+    def wait(self, timeout=None):
+        """Wait for the pondering to finish on its own.
+
+        Returns:
+          True if it has finished.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def metrics(self):
+        """The counters as a dictionary (for JSON)."""
+        return {'hits': self.hits, 'head_starts': self.head_starts,
+                'misses': self.misses, 'pondered': len(self._replies)}
+
+    def _ponder(self, replies):
+        self.table.new_search()
+        deadline = time.time() + self.max_time
+        for depth in range(1, self.max_depth + 1):
+            searched = False
+            for reply in replies:
+                if len(reply.children) <= 1:
+                    # There is nothing to decide.
+                    continue
+                search = reply.search(self.table, deadline)
+                self._search = search
+                # stop() sets _stopped before it cancels self._search so
+                # either it has cancelled this search or this sees it.
+                if self._stopped:
+                    return
+                start = time.time()
+                try:
+                    values = _search_root(reply.position, reply.children,
+                                          depth, search)
+                except SearchTimeout:
+                    return
+                finally:
+                    reply.elapsed += time.time() - start
+                    reply.nodes += search.nodes
+                reply.update(depth, values)
+                searched = True
+            if not searched:
+                break
+        logging.info('Pondered %d replies to depth %d', len(replies),
+                     max(r.depth for r in replies) if replies else 0)
+
+
+def _settings(kwargs):
+    """The arguments of tree_search.analyze that change its result, with
+    the history as a tuple.
+    """
+    settings = dict(kwargs)
+    settings.pop('stats', None)
+    if settings.get('history') is not None:
+        settings['history'] = tuple(settings['history'])
+    return settings
@@ -0,0 +1,122 @@
+"""Tests for pondering."""
+
+__author__ = 'lhurd'
+
+import time
+import unittest
+
+import moves
+import tree_search
+from history import DRAW
+from moves_test import STARTING_BOARD, TEST_BOARD1
+from ponder import Ponderer
+from transposition import TranspositionTable
+
+
+def _replies(board, is_black):
+    """The boards after the replies of the opponent to a move by black
+    (is_black) or red.
+    """
+    if is_black:
+        return [moves.flip(b) for b in moves.find_children(
+            moves.flip(board))]
+    return moves.find_children(board)
+
+
+class PonderTest(unittest.TestCase):
+    def test_hit(self):
+        ponderer = Ponderer(TranspositionTable(1 << 16), max_depth=3)
+        move = ponderer.find_move(STARTING_BOARD, True, max_depth=3)
+        self.assertTrue(ponderer.wait(30))
+        reply = _replies(move, True)[0]
+        analysis = ponderer.analyze(reply, True, max_depth=3)
+        self.assertEqual(1, ponderer.hits)
+        self.assertEqual(3, analysis.depth)
+        self.assertIn(analysis.move, moves.find_children(reply))
+        self.assertEqual(tree_search.analyze(
+            reply, True, max_depth=3, table=TranspositionTable(64)).score,
+                         analysis.score)
+        # The pondering goes on with the replies to the new move.
+        self.assertEqual(len(_replies(analysis.move, True)),
+                         ponderer.metrics()['pondered'])
+        ponderer.stop()
+
+    def test_red(self):
+        # Red moves from the flipped starting position and black replies.
+        board = moves.flip(STARTING_BOARD)
+        ponderer = Ponderer(TranspositionTable(1 << 16), max_depth=2)
+        move = ponderer.find_move(board, False, max_depth=2)
+        self.assertTrue(ponderer.wait(30))
+        reply = moves.find_children(move)[0]
+        analysis = ponderer.analyze(reply, False, max_depth=2)
+        self.assertEqual(1, ponderer.hits)
+        self.assertIn(analysis.move, [moves.flip(b) for b in
+                                      moves.find_children(moves.flip(reply))])
+        ponderer.stop()
+
+    def test_head_start_and_miss(self):
+        ponderer = Ponderer(TranspositionTable(1 << 16), max_depth=2)
+        move = ponderer.find_move(STARTING_BOARD, True, max_depth=2)
+        self.assertTrue(ponderer.wait(30))
+        # Deeper than what was pondered.
+        ponderer.analyze(_replies(move, True)[0], True, max_depth=4)
+        self.assertEqual(1, ponderer.head_starts)
+        ponderer.analyze(TEST_BOARD1, True, max_depth=2)
+        self.assertEqual(2, ponderer.misses)
+        ponderer.stop()
+
+    def test_settings(self):
+        # Two black kings against a red king near the 40 move rule, which
+        # makes the line a draw.
+        board = '------B--------B-------R--------'
+        move = '--B------------B-------R--------'
+        reply = '--B------------B---R------------'
+        game = [board] * 76
+        history = game + [board, move]
+        ponderer = Ponderer(TranspositionTable(1 << 16), max_depth=3)
+        ponderer.start(move, False, history=game + [board])
+        self.assertTrue(ponderer.wait(30))
+        analysis = ponderer.analyze(reply, True, max_depth=3,
+                                    history=history)
+        self.assertEqual(1, ponderer.hits)
+        self.assertEqual(DRAW, analysis.score)
+        self.assertEqual(DRAW, tree_search.analyze(
+            reply, True, max_depth=3, table=TranspositionTable(64),
+            history=history).score)
+        # Other settings are a miss.
+        ponderer.start(move, False, history=game + [board])
+        self.assertTrue(ponderer.wait(30))
+        ponderer.analyze(reply, True, max_depth=3, history=None)
+        self.assertEqual(1, ponderer.hits)
+        self.assertEqual(1, ponderer.misses)
+        ponderer.stop()
+
+    def test_time_limit(self):
+        ponderer = Ponderer(TranspositionTable(1 << 16), max_time=0.5)
+        move = ponderer.find_move(STARTING_BOARD, True, time_limit=0.1)
+        self.assertTrue(ponderer.wait(5))
+        reply = _replies(move, True)[0]
+        # The reply was pondered for longer than asked for, so the answer
+        # is the result of the pondering rather than a new search.
+        pondered = ponderer._replies[(reply, True)]
+        self.assertGreater(pondered.elapsed, 0.01)
+        depth = pondered.depth
+        self.assertGreater(depth, 0)
+        analysis = ponderer.analyze(reply, True, time_limit=0.01)
+        self.assertEqual(1, ponderer.hits)
+        self.assertEqual(depth, analysis.depth)
+        ponderer.stop()
+
+    def test_stop(self):
+        ponderer = Ponderer(TranspositionTable(1 << 16))
+        ponderer.find_move(STARTING_BOARD, True, max_depth=1)
+        time.sleep(0.2)
+        self.assertFalse(ponderer.wait(0))
+        start = time.time()
+        ponderer.stop()
+        self.assertLess(time.time() - start, 0.5)
+        self.assertTrue(ponderer.wait(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
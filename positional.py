@@ -0,0 +1,177 @@
+"""Evaluation with positional features as well as material.
+
+evaluate.evaluate only counts material, so it cannot tell apart the
+quiet moves that make up most of a game.  This evaluation is a weighted
+sum of features, each counted for black and for red (from red's side of
+the board) and taken as the difference:
+
+  man          men
+  king         kings
+  advancement  men in the opponent's half of the board
+  back_rank    men still guarding the back rank
+  center       checkers on the eight center squares
+  mobility     moves (not counting jumps) of all the checkers
+  runaway      men with no opponent left between them and the king row
+  tempo        sum of the rows the men have advanced
+
+which keeps evaluation(board) == -evaluation(flip(board)) as the evaluate
+module requires.  The weights are read from a JSON file mapping the
+names of the features to their values (missing names keep their default
+values), written by hand or fitted to the results of games by tune.py.
+vector_evaluate.positional_features computes the same features for many
+positions at once.
+"""
+__author__ = 'lhurd'
+
+import json
+import os
+
+from bitboard import (BWD_STEPS, FWD_STEPS, MASK, _shift, flip, from_string,
+                      popcount, square)
+from evaluate import INFINITY, NEGATIVE_INFINITY
+from moves import FWD_NEIGHBORS
+
+FEATURES = ('man', 'king', 'advancement', 'back_rank', 'center', 'mobility',
+            'runaway', 'tempo')
+DEFAULT_WEIGHTS = {'man': 20, 'king': 30, 'advancement': 1, 'back_rank': 2,
+                   'center': 1, 'mobility': 1, 'runaway': 5, 'tempo': 0}
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'positional_weights.json')
+
+# Squares from black's side of the board.
+OPPONENT_HALF_SQUARES = range(16, 28)
+BACK_RANK_SQUARES = range(0, 4)
+CENTER_SQUARES = (9, 10, 13, 14, 17, 18, 21, 22)
+
+
+def _cone(origin):
+    """The squares a man on a square can reach moving forward."""
+    squares = set()
+    frontier = [origin]
+    while frontier:
+        for target in FWD_NEIGHBORS[frontier.pop()]:
+            if target not in squares:
+                squares.add(target)
+                frontier.append(target)
+    return sorted(squares)
+
+# The squares in front of a man on each square.
+CONES = tuple(_cone(s) for s in range(32))
+
+
+def _mask(squares):
+    mask = 0
+    for s in squares:
+        mask |= 1 << s
+    return mask
+
+OPPONENT_HALF = _mask(OPPONENT_HALF_SQUARES)
+BACK_RANK = _mask(BACK_RANK_SQUARES)
+CENTER = _mask(CENTER_SQUARES)
+CONE_MASKS = tuple(_mask(cone) for cone in CONES)
+ROW_MASKS = tuple(0xF << (4 * row) for row in range(8))
+
+
+def load_weights(path=WEIGHTS_FILE):
+    """Read weights from a file.
+
+    Args:
+      path: JSON file mapping feature names to weights
+
+    Returns:
+      tuple of the weights in the order of FEATURES.
+    """
+    with open(path) as f:
+        values = json.load(f)
+    unknown = set(values) - set(FEATURES)
+    if unknown:
+        raise ValueError('Unknown features in %s: %s' % (
+            path, ', '.join(sorted(unknown))))
+    return tuple(values.get(name, DEFAULT_WEIGHTS[name]) for name in FEATURES)
+
+
+def save_weights(weights, path=WEIGHTS_FILE):
+    """Write weights (in the order of FEATURES) to a file."""
+    with open(path, 'w') as f:
+        json.dump(dict(zip(FEATURES, weights)), f, indent=2,
+                  separators=(',', ': '), sort_keys=True)
+        f.write('\n')
+
+
+if os.path.exists(WEIGHTS_FILE):
+    WEIGHTS = load_weights()
+else:
+    WEIGHTS = tuple(DEFAULT_WEIGHTS[name] for name in FEATURES)
+
+
+def _side_features(mine, theirs, kings):
+    """The features of the checkers of black (mine) in a position."""
+    men = mine & ~kings
+    empty = ~(mine | theirs) & MASK
+    mobility = 0
+    for steps, movers in ((FWD_STEPS, mine), (BWD_STEPS, mine & kings)):
+        for mask, n in steps:
+            mobility += popcount(_shift(movers & mask, n) & empty)
+    runaways = 0
+    bits = men
+    while bits:
+        bit = bits & -bits
+        bits ^= bit
+        if not theirs & CONE_MASKS[square(bit)]:
+            runaways += 1
+    tempo = 0
+    for row in range(1, 7):
+        tempo += row * popcount(men & ROW_MASKS[row])
+    return (popcount(men), popcount(mine & kings),
+            popcount(men & OPPONENT_HALF), popcount(men & BACK_RANK),
+            popcount(mine & CENTER), mobility, runaways, tempo)
+
+
+def features(position):
+    """The features of a position (black minus red).
+
+    Args:
+      position: bitboard.Position
+
+    Returns:
+      tuple of the values of FEATURES.
+    """
+    black, red, kings = position
+    flipped_black, flipped_red, flipped_kings = flip(position)
+    return tuple(b - r for b, r in zip(
+        _side_features(black, red, kings),
+        _side_features(flipped_black, flipped_red, flipped_kings)))
+
+
+def evaluate_position(position, weights=None):
+    """Evaluate a bitboard position.
+
+    Args:
+      position: bitboard.Position
+      weights: weights in the order of FEATURES (by default those read
+        from WEIGHTS_FILE)
+
+    Returns:
+      an integer which is positive if black has the upper hand.
+    """
+    black, red, _ = position
+    if not black:
+        return NEGATIVE_INFINITY
+    if not red:
+        return INFINITY
+    if weights is None:
+        weights = WEIGHTS
+    return int(round(sum(w * f for w, f in zip(weights,
+                                               features(position)))))
+
+
+def evaluate(board):
+    """Version of evaluate_position for a board string."""
+    return evaluate_position(from_string(board))
+
+
+def evaluate_board(board):
+    """Version of evaluate_position for a board.Board (from the point of
+    view of the player to move, like evaluate.evaluate_board).
+    """
+    return evaluate_position(board.oriented())
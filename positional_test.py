@@ -0,0 +1,81 @@
+"""Tests for the positional evaluation."""
+
+__author__ = 'lhurd'
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import bitboard
+import moves
+import positional
+from board import RED, Board
+from evaluate import INFINITY, NEGATIVE_INFINITY, evaluate
+from vector_evaluate_test import _random_boards
+
+
+class PositionalTest(unittest.TestCase):
+    def test_features(self):
+        # A black man on square 13 and a red king on 27: the man can step
+        # to 16 and 17, nothing stands in its way and it is on row 3.
+        position = bitboard.from_string('-' * 13 + 'b' + '-' * 13 + 'R'
+                                        + '-' * 4)
+        self.assertEqual(dict(man=1, king=-1, advancement=0, back_rank=0,
+                              center=1, mobility=0, runaway=1, tempo=3),
+                         dict(zip(positional.FEATURES,
+                                  positional.features(position))))
+        # With a red man in front of it the man is no longer a runaway.
+        position = bitboard.from_string('-' * 13 + 'b' + '-' * 10 + 'r'
+                                        + '-' * 7)
+        self.assertEqual(0, positional.features(position)[6])
+
+    def test_cones(self):
+        self.assertEqual([], positional.CONES[28])
+        self.assertEqual([28, 29], positional.CONES[24])
+        self.assertEqual([24, 28, 29], positional.CONES[20])
+
+    def test_symmetry(self):
+        for board in _random_boards(100):
+            self.assertEqual(positional.evaluate(board),
+                             -positional.evaluate(moves.flip(board)))
+
+    def test_material_only(self):
+        weights = (20, 30, 0, 0, 0, 0, 0, 0)
+        for board in _random_boards(50):
+            self.assertEqual(evaluate(board), positional.evaluate_position(
+                bitboard.from_string(board), weights))
+
+    def test_terminal(self):
+        self.assertEqual(INFINITY, positional.evaluate('b' + '-' * 31))
+        self.assertEqual(NEGATIVE_INFINITY,
+                         positional.evaluate('r' + '-' * 31))
+
+    def test_evaluate_board(self):
+        for board in _random_boards(20):
+            position = bitboard.from_string(board)
+            self.assertEqual(
+                -positional.evaluate_position(position),
+                positional.evaluate_board(Board(position, RED)))
+
+    def test_weights_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'weights.json')
+            weights = (21, 32, 1.5, 2, 0, 1, 4, -1)
+            positional.save_weights(weights, path)
+            self.assertEqual(weights, positional.load_weights(path))
+            with open(path, 'w') as f:
+                f.write('{"man": 25}')
+            self.assertEqual(25, positional.load_weights(path)[0])
+            self.assertEqual(positional.DEFAULT_WEIGHTS['king'],
+                             positional.load_weights(path)[1])
+            with open(path, 'w') as f:
+                f.write('{"queen": 90}')
+            self.assertRaises(ValueError, positional.load_weights, path)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,295 @@
+"""Binary files of positions and games.
+
+Positions are moved around as 32 character strings, which costs 32 bytes
+or more per position in a file and has to be parsed again.  A record
+file stores each position as its bitboard (see bitboard.Position) in real
+colors and the player to move, with optional fields chosen for the whole
+file:
+
+  SCORE   the score of the position (int16, absent for none)
+  RESULT  the result of the game from black's side: 1 if black won, -1
+          if red won and 0 otherwise
+  MOVE    the move played, as the position it led to (like everywhere
+          else in the program)
+  GAME    the index of the game the position comes from
+
+The file starts with an 8 byte header: the magic string, the version,
+the fields and the size of a record.  The little-endian fixed size
+records follow, so the positions of a game are 13 bytes each with the
+RESULT and GAME fields 18 bytes.  A RecordWriter appends to a file (a
+record cut short by a crash is ignored by the readers) and a RecordReader
+memory-maps it to read records one by one or to view all of them at once
+as a NumPy structured array without copying them.
+
+Usage:
+  python records.py convert GAMES RECORDS
+  python records.py dump RECORDS
+
+where GAMES is the JSON lines output of "batch.py selfplay".
+"""
+__author__ = 'lhurd'
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from bitboard import Position, from_string, to_string
+
+MAGIC = 'CKRD'
+VERSION = 1
+HEADER = struct.Struct('<4sBBH')
+
+# Optional fields.
+SCORE = 1
+RESULT = 2
+MOVE = 4
+GAME = 8
+FIELDS = SCORE | RESULT | MOVE | GAME
+
+NO_SCORE = -32768
+RESULTS = {'black': 1, 'red': -1, None: 0}
+WINNERS = dict((result, winner) for winner, result in RESULTS.items())
+
+# A position in real colors and the player to move, with the optional
+# fields (None when the file does not have them).
+Record = namedtuple('Record', ['position', 'is_black', 'score', 'result',
+                               'move', 'game'])
+
+
+def _layout(fields):
+    """The struct format and NumPy dtype of the records with fields."""
+    layout = [('black', 'I', '<u4'), ('red', 'I', '<u4'),
+              ('kings', 'I', '<u4'), ('is_black', 'B', 'u1')]
+    if fields & SCORE:
+        layout.append(('score', 'h', '<i2'))
+    if fields & RESULT:
+        layout.append(('result', 'b', 'i1'))
+    if fields & MOVE:
+        layout += [('move_black', 'I', '<u4'), ('move_red', 'I', '<u4'),
+                   ('move_kings', 'I', '<u4')]
+    if fields & GAME:
+        layout.append(('game', 'I', '<u4'))
+    return (struct.Struct('<' + ''.join(code for _, code, _ in layout)),
+            np.dtype([(name, dtype) for name, _, dtype in layout]))
+
+
+def from_board(board, is_black=True, **fields):
+    """A Record from a board string.
+
+    Args:
+      board: board string
+      is_black: True if black is to move
+      fields: the optional fields (score, result, move as a board string
+        and game)
+    """
+    move = fields.get('move')
+    if move is not None:
+        move = from_string(move)
+    return Record(from_string(board), is_black, fields.get('score'),
+                  fields.get('result'), move, fields.get('game'))
+
+
+def to_board(record):
+    """The board string of a Record and True if black is to move."""
+    return to_string(record.position), record.is_black
+
+
+def game_records(game):
+    """The records of the positions of a game.
+
+    Args:
+      game: dictionary with the positions (after each move, black moving
+        first) and winner of a game as generated by batch.play_games
+
+    Returns:
+      list of Record with the RESULT and GAME fields.
+    """
+    result = RESULTS[game['winner']]
+    return [from_board(board, i % 2 == 1, result=result, game=game['index'])
+            for i, board in enumerate(game['positions'])]
+
+
+class RecordWriter(object):
+    """Appends records to a file."""
+
+    def __init__(self, path, fields=0):
+        """
+        Args:
+          path: file name (created if it does not exist)
+          fields: the optional fields of the records (those of the file
+            if it exists, which must be the same)
+        """
+        self._struct, _ = _layout(fields)
+        self.fields = fields
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size:
+            existing = _read_header(path)
+            if existing != fields:
+                raise ValueError('%s has fields %d, not %d' % (
+                    path, existing, fields))
+            # Drop a record cut short by an earlier crash.
+            extra = (size - HEADER.size) % self._struct.size
+            if extra:
+                with open(path, 'r+b') as f:
+                    f.truncate(size - extra)
+        self._file = open(path, 'ab')
+        if not size:
+            self._file.write(HEADER.pack(MAGIC, VERSION, fields,
+                                         self._struct.size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, record):
+        """Append a Record (its fields that the file does not have are
+        ignored).
+        """
+        black, red, kings = record.position
+        values = [black, red, kings, record.is_black]
+        fields = self.fields
+        if fields & SCORE:
+            values.append(NO_SCORE if record.score is None else record.score)
+        if fields & RESULT:
+            values.append(record.result or 0)
+        if fields & MOVE:
+            values.extend(record.move or (0, 0, 0))
+        if fields & GAME:
+            values.append(record.game or 0)
+        self._file.write(self._struct.pack(*values))
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _read_header(path):
+    with open(path, 'rb') as f:
+        data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError('%s is not a record file' % path)
+    magic, version, fields, size = HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION or fields & ~FIELDS:
+        raise ValueError('%s is not a record file' % path)
+    if size != _layout(fields)[0].size:
+        raise ValueError('%s has records of %d bytes' % (path, size))
+    return fields
+
+
+def is_record_file(path):
+    """True if a file starts with the header of a record file."""
+    try:
+        _read_header(path)
+    except (IOError, ValueError):
+        return False
+    return True
+
+
+class RecordReader(object):
+    """A memory-mapped record file."""
+
+    def __init__(self, path):
+        self.fields = _read_header(path)
+        self._struct, self.dtype = _layout(self.fields)
+        self._file = open(path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        self._count = (len(self._data) - HEADER.size) // self._struct.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if not -self._count <= i < self._count:
+            raise IndexError('record index out of range')
+        if i < 0:
+            i += self._count
+        return self._record(self._struct.unpack_from(
+            self._data, HEADER.size + i * self._struct.size))
+
+    def __iter__(self):
+        unpack_from = self._struct.unpack_from
+        size = self._struct.size
+        for offset in xrange(HEADER.size, HEADER.size + self._count * size,
+                             size):
+            yield self._record(unpack_from(self._data, offset))
+
+    def _record(self, values):
+        fields = self.fields
+        values = list(values)
+        game = values.pop() if fields & GAME else None
+        move = None
+        if fields & MOVE:
+            move = Position(*values[-3:])
+            del values[-3:]
+        result = values.pop() if fields & RESULT else None
+        score = values.pop() if fields & SCORE else None
+        if score == NO_SCORE:
+            score = None
+        black, red, kings, is_black = values
+        return Record(Position(black, red, kings), bool(is_black), score,
+                      result, move, game)
+
+    def array(self):
+        """All the records as a NumPy structured array (a read-only view
+        of the file valid until close()) with the fields black, red,
+        kings and is_black, score, result, move_black, move_red,
+        move_kings and game as the file has them.
+        """
+        return np.frombuffer(self._data, self.dtype, self._count,
+                             HEADER.size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Record files.')
+    parser.add_argument('command', choices=('convert', 'dump'))
+    parser.add_argument('files', nargs='+',
+                        help='GAMES RECORDS for convert, RECORDS for dump')
+    args = parser.parse_args(argv)
+    if args.command == 'convert':
+        with open(args.files[0]) as f:
+            with RecordWriter(args.files[1], RESULT | GAME) as writer:
+                for line in f:
+                    if line.strip():
+                        game = json.loads(line)
+                        if 'error' not in game:
+                            writer.write_all(game_records(game))
+    else:
+        with RecordReader(args.files[0]) as reader:
+            for record in reader:
+                board, is_black = to_board(record)
+                fields = [board, 'b' if is_black else 'r']
+                for name in ('score', 'result', 'game'):
+                    value = getattr(record, name)
+                    if value is not None:
+                        fields.append('%s=%s' % (name, value))
+                if record.move is not None:
+                    fields.append('move=%s' % to_string(record.move))
+                print ' '.join(fields)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Tests for the record files."""
+
+__author__ = 'lhurd'
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import moves
+import records
+from bitboard import from_string
+from moves_test import STARTING_BOARD, TEST_BOARD1, TEST_BOARD3
+from vector_evaluate_test import _random_boards
+
+
+class RecordsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test.rec')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_board_conversion(self):
+        for board in _random_boards(50) + [TEST_BOARD1, TEST_BOARD3]:
+            for is_black in (True, False):
+                self.assertEqual((board, is_black), records.to_board(
+                    records.from_board(board, is_black)))
+
+    def test_round_trip(self):
+        boards = _random_boards(20)
+        for fields in range(records.FIELDS + 1):
+            path = os.path.join(self.directory, '%d.rec' % fields)
+            written = [records.from_board(
+                board, i % 3 == 0, score=i * 7 - 50 if i % 4 else None,
+                result=i % 3 - 1, move=moves.flip(board),
+                game=i // 5) for i, board in enumerate(boards)]
+            with records.RecordWriter(path, fields) as writer:
+                writer.write_all(written)
+            with records.RecordReader(path) as reader:
+                self.assertEqual(fields, reader.fields)
+                self.assertEqual(len(boards), len(reader))
+                read = list(reader)
+                self.assertEqual(read[-1], reader[-1])
+            for record, expected in zip(read, written):
+                self.assertEqual(expected.position, record.position)
+                self.assertEqual(expected.is_black, record.is_black)
+                for name, field in (('score', records.SCORE),
+                                    ('result', records.RESULT),
+                                    ('move', records.MOVE),
+                                    ('game', records.GAME)):
+                    self.assertEqual(getattr(expected, name)
+                                     if fields & field else None,
+                                     getattr(record, name))
+
+    def test_array(self):
+        boards = _random_boards(30)
+        with records.RecordWriter(self.path, records.RESULT) as writer:
+            for board in boards:
+                writer.write(records.from_board(board, result=1))
+        with records.RecordReader(self.path) as reader:
+            array = reader.array()
+            positions = [from_string(board) for board in boards]
+            np.testing.assert_array_equal([p.black for p in positions],
+                                          array['black'])
+            np.testing.assert_array_equal([p.kings for p in positions],
+                                          array['kings'])
+            self.assertEqual([1] * 30, list(array['result']))
+            self.assertTrue(array['is_black'].all())
+
+    def test_append(self):
+        board = records.from_board(STARTING_BOARD, game=1)
+        with records.RecordWriter(self.path, records.GAME) as writer:
+            writer.write(board)
+        with records.RecordWriter(self.path, records.GAME) as writer:
+            writer.write(board._replace(game=2))
+        with records.RecordReader(self.path) as reader:
+            self.assertEqual([1, 2], [r.game for r in reader])
+        self.assertRaises(ValueError, records.RecordWriter, self.path,
+                          records.SCORE)
+
+    def test_truncated(self):
+        with records.RecordWriter(self.path) as writer:
+            writer.write(records.from_board(STARTING_BOARD))
+        with open(self.path, 'ab') as f:
+            f.write('\x01\x02\x03')
+        with records.RecordReader(self.path) as reader:
+            self.assertEqual(1, len(reader))
+        # The writer drops the partial record.
+        with records.RecordWriter(self.path) as writer:
+            writer.write(records.from_board(TEST_BOARD1, False))
+        with records.RecordReader(self.path) as reader:
+            self.assertEqual([(STARTING_BOARD, True), (TEST_BOARD1, False)],
+                             [records.to_board(r) for r in reader])
+
+    def test_empty(self):
+        records.RecordWriter(self.path, records.RESULT).close()
+        with records.RecordReader(self.path) as reader:
+            self.assertEqual(0, len(reader))
+            self.assertEqual([], list(reader))
+            self.assertEqual(0, len(reader.array()))
+
+    def test_not_a_record_file(self):
+        with open(self.path, 'w') as f:
+            f.write('{"positions": []}\n')
+        self.assertFalse(records.is_record_file(self.path))
+        self.assertRaises(ValueError, records.RecordReader, self.path)
+        self.assertFalse(records.is_record_file(
+            os.path.join(self.directory, 'missing')))
+
+    def test_game_records(self):
+        game = {'index': 3, 'winner': 'red',
+                'positions': _random_boards(1)[:1] * 3}
+        result = records.game_records(game)
+        self.assertEqual([False, True, False], [r.is_black for r in result])
+        self.assertEqual([-1] * 3, [r.result for r in result])
+        self.assertEqual([3] * 3, [r.game for r in result])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+"""Cache of search results for positions that are asked for again.
+
+Many clients of the UI ask for a move in the same positions (the opening,
+common lines, retries) and each request would otherwise start a new
+search.  A ResultCache keeps the Analysis of the most recent searches
+keyed by the board, the player to move and the search settings, evicts
+the least recently used beyond a size limit and can be saved to a file
+to survive restarts.
+
+The cache is safe to share between threads.  When several threads ask
+for the same position at the same time only the first one searches and
+the others wait for its result.
+"""
+__author__ = 'lhurd'
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import tree_search
+
+DEFAULT_CACHE_SIZE = 10000
+
+
+class _Pending(object):
+    """A search in progress that other threads can wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResultCache(object):
+    """LRU cache of tree_search.Analysis results.
+
+    Attributes:
+      hits: lookups answered from the cache
+      misses: lookups that had to search
+      coalesced: lookups that waited for the same search by another
+        thread (also counted in hits)
+      evictions: results dropped to keep the cache within its size
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, path=None):
+        """
+        Args:
+          max_size: maximum number of results kept
+          path: optional file the cache is loaded from (if it exists) and
+            saved to
+        """
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._results = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._results)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Save the cache if it has a file."""
+        if self.path is not None:
+            self.save(self.path)
+
+    def get(self, key, compute):
+        """The result for a key, computed by compute() if it is not in the
+        cache (nor being computed by another thread).
+
+        Args:
+          key: hashable key
+          compute: function of no arguments returning the result
+
+        Returns:
+          the result (exceptions raised by compute are raised in all the
+          threads that asked for it).
+        """
+        with self._lock:
+            result = self._results.pop(key, None)
+            if result is not None:
+                self._results[key] = result
+                self.hits += 1
+                return result
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _Pending()
+                self.misses += 1
+                owner = True
+            else:
+                self.hits += 1
+                self.coalesced += 1
+                owner = False
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+        try:
+            pending.result = compute()
+        except Exception as e:
+            pending.error = e
+            raise
+        else:
+            self.put(key, pending.result)
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.done.set()
+        return pending.result
+
+    def put(self, key, result):
+        """Add a result to the cache."""
+        with self._lock:
+            self._results.pop(key, None)
+            self._results[key] = result
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def analyze(self, board, is_black, time_limit=None, max_depth=None,
+                table=tree_search.TABLE, **kwargs):
+        """Cached version of tree_search.analyze (the stats of cached
+        results are None).
+
+        Args:
+          board: current board string
+          is_black: True if current player is black
+          time_limit: optional number of seconds to search for
+          max_depth: depth of the search
+          table: TranspositionTable to use
+          kwargs: other arguments of tree_search.analyze that change the
+            result (they are part of the key, with lists such as history
+            as tuples)
+
+        Returns:
+          tree_search.Analysis.
+        """
+        key = (board, is_black, time_limit, max_depth) + tuple(
+            (name, _to_key(value)) for name, value in sorted(kwargs.items()))
+
+        def search():
+            analysis = tree_search.analyze(board, is_black, time_limit,
+                                           max_depth, table, **kwargs)
+            return analysis._replace(stats=None)
+
+        return self.get(key, search)
+
+    def find_move(self, board, is_black, time_limit=None, max_depth=None):
+        """Cached version of tree_search.find_move."""
+        return self.analyze(board, is_black, time_limit, max_depth).move
+
+    def metrics(self):
+        """The counters as a dictionary (for JSON)."""
+        lookups = self.hits + self.misses
+        return {'size': len(self._results), 'max_size': self.max_size,
+                'hits': self.hits, 'misses': self.misses,
+                'coalesced': self.coalesced, 'evictions': self.evictions,
+                'hit_rate': float(self.hits) / lookups if lookups else 0.0}
+
+    def save(self, path):
+        """Write the cache to a file (replacing it atomically).  The
+        results of searches with objects among their settings (such as a
+        tablebase or a book) are not saved.
+        """
+        with self._lock:
+            items = [[list(key), list(result)]
+                     for key, result in self._results.items()
+                     if _is_json(key)]
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(items, f)
+        os.rename(temporary, path)
+
+    def load(self, path):
+        """Add the results saved in a file to the cache."""
+        with open(path) as f:
+            items = json.load(f)
+        for key, result in items:
+            analysis = tree_search.Analysis(*result)
+            self.put(_from_json(key), analysis._replace(
+                move=_from_json(analysis.move),
+                pv=[_from_json(board) for board in analysis.pv]))
+
+
+def _to_key(value):
+    """Convert a search setting to a hashable value (tuples for lists and
+    sorted tuples of items for dictionaries).
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_to_key(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _to_key(v)) for k, v in value.items()))
+    return value
+
+
+def _is_json(value):
+    """True if a key survives a round trip through JSON."""
+    if isinstance(value, tuple):
+        return all(_is_json(v) for v in value)
+    return value is None or isinstance(value, (basestring, bool, int, long,
+                                               float))
+
+
+def _from_json(value):
+    """Convert a value decoded from JSON back to the types of the cache
+    (tuples for lists and str for unicode).
+    """
+    if isinstance(value, list):
+        return tuple(_from_json(v) for v in value)
+    if isinstance(value, unicode):
+        return str(value)
+    return value
@@ -0,0 +1,108 @@
+"""Tests for the search result cache."""
+
+__author__ = 'lhurd'
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import moves
+import positional
+from moves_test import STARTING_BOARD, TEST_BOARD1
+from result_cache import ResultCache
+from transposition import TranspositionTable
+
+
+class ResultCacheTest(unittest.TestCase):
+    def test_lru(self):
+        cache = ResultCache(max_size=2)
+        self.assertEqual(1, cache.get('a', lambda: 1))
+        self.assertEqual(2, cache.get('b', lambda: 2))
+        # Using a makes b the least recently used.
+        self.assertEqual(1, cache.get('a', lambda: 0))
+        self.assertEqual(3, cache.get('c', lambda: 3))
+        self.assertEqual(4, cache.get('b', lambda: 4))
+        self.assertEqual(2, len(cache))
+        metrics = cache.metrics()
+        self.assertEqual(1, metrics['hits'])
+        self.assertEqual(4, metrics['misses'])
+        self.assertEqual(2, metrics['evictions'])
+
+    def test_coalescing(self):
+        cache = ResultCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 42
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(cache.get('key', compute)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([42] * 5, results)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(4, cache.metrics()['coalesced'])
+
+    def test_errors(self):
+        cache = ResultCache()
+        self.assertRaises(ZeroDivisionError, cache.get, 'key', lambda: 1 / 0)
+        self.assertEqual(1, cache.get('key', lambda: 1))
+
+    def test_analyze(self):
+        cache = ResultCache()
+        table = TranspositionTable(1024)
+        analysis = cache.analyze(TEST_BOARD1, True, max_depth=3, table=table)
+        self.assertIn(analysis.move, moves.find_children(TEST_BOARD1))
+        self.assertIs(analysis, cache.analyze(TEST_BOARD1, True, max_depth=3,
+                                              table=table))
+        # Other settings are another search.
+        cache.analyze(TEST_BOARD1, True, max_depth=2, table=table)
+        self.assertEqual({'size': 2, 'hits': 1, 'misses': 2},
+                         dict((k, cache.metrics()[k])
+                              for k in ('size', 'hits', 'misses')))
+        # Lists are part of the key as tuples.
+        history = [STARTING_BOARD, TEST_BOARD1]
+        analysis = cache.analyze(TEST_BOARD1, True, max_depth=2, table=table,
+                                 history=history)
+        self.assertIs(analysis, cache.analyze(TEST_BOARD1, True, max_depth=2,
+                                              table=table,
+                                              history=list(history)))
+        self.assertEqual(3, len(cache))
+
+    def test_persistence(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'cache.json')
+            with ResultCache(path=path) as cache:
+                analysis = cache.analyze(STARTING_BOARD, True, max_depth=2)
+            cache = ResultCache(path=path)
+            self.assertEqual(analysis, cache.analyze(
+                STARTING_BOARD, True, max_depth=2,
+                table=None))
+            self.assertEqual(1, cache.metrics()['hits'])
+            # The results of searches with objects among their settings
+            # are only kept in memory.
+            analysis = cache.analyze(STARTING_BOARD, True, max_depth=2,
+                                     history=[STARTING_BOARD])
+            cache.analyze(STARTING_BOARD, True, max_depth=2,
+                          evaluator=positional.evaluate_board)
+            cache.close()
+            cache = ResultCache(path=path)
+            self.assertEqual(2, len(cache))
+            self.assertEqual(analysis, cache.analyze(
+                STARTING_BOARD, True, max_depth=2, history=[STARTING_BOARD]))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,521 @@
+"""HTTP/JSON server computing moves in a pool of worker processes.
+
+  POST /move     {"board": ..., "is_black": true, "time_limit": 1.0}
+                 optionally with "max_depth" (the search goes straight to
+                 that depth when there is no time limit) and "deadline",
+                 the seconds the client is willing to wait (by default the
+                 time limit plus DEADLINE_MARGIN)
+  GET /metrics   counters of the server and of its cache
+
+Answers to /move are the move (null if the game is lost), score, depth,
+nodes, principal variation (pv) and seconds of the search, or an error:
+
+  400  the request is malformed
+  503  the queue of requests waiting for a worker is full
+  504  the deadline passed before the search finished
+
+Each connection is served by its own thread, which puts the request in a
+bounded queue and waits.  One dispatcher thread per worker process takes
+requests from the queue and hands them to its process.  A search is
+limited to the time left before the deadline of its request.  A search
+still running when its deadline passes, or when its client disconnects,
+is abandoned by killing the worker process and starting a new one, so a
+slow position only ever holds up its own worker.  Identical requests are
+answered from a ResultCache and only searched once when they arrive at
+the same time.  With --ponder each worker searches the replies to its
+last move while it waits for the next request (see ponder.py).
+
+Usage:
+  python server.py serve [--port P] [--workers N] [--queue-size Q]
+                         [--cache-size C] [--cache-file F] [--ponder]
+  python server.py load [--url U] [--clients N] [--requests R] [--time T]
+"""
+__author__ = 'lhurd'
+
+import argparse
+import BaseHTTPServer
+import functools
+import json
+import logging
+import multiprocessing
+import Queue
+import select
+import socket
+import SocketServer
+import sys
+import threading
+import time
+import urllib2
+
+import tree_search
+from moves_test import STARTING_BOARD
+from ponder import Ponderer
+from result_cache import ResultCache
+from transposition import DEFAULT_SIZE, TranspositionTable
+
+DEFAULT_PORT = 8080
+QUEUE_SIZE = 16
+# Time allowed on top of the time limit for the first iteration of the
+# search (which always finishes) and for passing the result around.
+DEADLINE_MARGIN = 1.0
+MAX_TIME_LIMIT = 60.0
+MAX_REQUEST_DEPTH = 20
+BOARD_CHARACTERS = frozenset('bBrR-')
+
+
+class RequestError(Exception):
+    """Base class of the errors answered with an HTTP error status."""
+    status = 500
+
+
+class BadRequest(RequestError):
+    status = 400
+
+
+class Overloaded(RequestError):
+    status = 503
+
+
+class DeadlineExceeded(RequestError):
+    status = 504
+
+
+class _Request(object):
+    """A search waiting for or running in a worker."""
+
+    def __init__(self, board, is_black, time_limit, max_depth, deadline):
+        self.board = board
+        self.is_black = is_black
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.deadline = deadline
+        self.cancelled = False
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.done.set()
+
+
+def _worker_main(connection, table_size, ponder):
+    """Run searches sent over connection until it is closed (pondering
+    while waiting for the next one if ponder is True).
+    """
+    table = TranspositionTable(table_size)
+    analyze = functools.partial(tree_search.analyze, table=table)
+    if ponder:
+        analyze = Ponderer(table).analyze
+    while True:
+        try:
+            board, is_black, time_limit, max_depth = connection.recv()
+        except EOFError:
+            return
+        start = time.time()
+        try:
+            analysis = analyze(board, is_black, time_limit, max_depth)
+            connection.send({'move': analysis.move, 'score': analysis.score,
+                             'depth': analysis.depth,
+                             'nodes': analysis.nodes, 'pv': analysis.pv,
+                             'seconds': time.time() - start})
+        except Exception as e:
+            connection.send({'error': repr(e)})
+
+
+class _Worker(object):
+    """A worker process and the pipe to it."""
+
+    def __init__(self, table_size, ponder):
+        self.table_size = table_size
+        self.ponder = ponder
+        self.process = None
+        self.connection = None
+        self.start()
+
+    def start(self):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(child, self.table_size, self.ponder))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def search(self, request, poll_interval=0.05):
+        """Run the search of a request in the process.
+
+        Returns:
+          the result dictionary.
+
+        Raises:
+          DeadlineExceeded if the deadline passed or the request was
+          cancelled (the process is then restarted).
+        """
+        time_limit = request.time_limit
+        remaining = request.deadline - time.time()
+        if time_limit is not None:
+            time_limit = min(time_limit, remaining - DEADLINE_MARGIN)
+            time_limit = max(time_limit, 0.0)
+        self.connection.send((request.board, request.is_black, time_limit,
+                              request.max_depth))
+        while not self.connection.poll(poll_interval):
+            if request.cancelled or time.time() > request.deadline:
+                self.restart()
+                raise DeadlineExceeded('search abandoned after %.2fs' % (
+                    time.time() - request.deadline + remaining))
+        return self.connection.recv()
+
+
+class SearchService(object):
+    """A bounded queue of searches served by a pool of worker processes.
+
+    Attributes:
+      completed: searches that finished
+      rejected: requests refused because the queue was full
+      expired: requests whose deadline passed before a worker was free
+      abandoned: searches stopped because of their deadline or because
+        the client went away
+    """
+
+    def __init__(self, workers=None, queue_size=QUEUE_SIZE,
+                 table_size=DEFAULT_SIZE, cache=None, ponder=False):
+        """
+        Args:
+          workers: number of processes (defaults to the number of CPUs)
+          queue_size: maximum number of requests waiting for a worker
+          table_size: size of the transposition table of each worker
+          cache: optional ResultCache
+          ponder: whether the workers ponder the replies to their moves
+            between requests (see ponder.Ponderer), which pays off when
+            the same client keeps getting the same worker, e.g. with a
+            single worker
+        """
+        self.workers = workers or multiprocessing.cpu_count()
+        self.cache = cache
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.abandoned = 0
+        self._queue = Queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._workers = [_Worker(table_size, ponder)
+                         for _ in range(self.workers)]
+        self._threads = []
+        for worker in self._workers:
+            thread = threading.Thread(target=self._dispatch, args=(worker,))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        for worker in self._workers:
+            worker.stop()
+        if self.cache is not None:
+            self.cache.close()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _dispatch(self, worker):
+        for request in iter(self._queue.get, None):
+            if request.cancelled or time.time() > request.deadline:
+                self._count('expired')
+                request.finish(error=DeadlineExceeded(
+                    'deadline passed while queued'))
+                continue
+            try:
+                result = worker.search(request)
+            except DeadlineExceeded as e:
+                self._count('abandoned')
+                request.finish(error=e)
+                continue
+            if 'error' in result:
+                request.finish(error=RequestError(result['error']))
+            else:
+                self._count('completed')
+                request.finish(result)
+
+    def search(self, board, is_black, time_limit=None, max_depth=None,
+               deadline=None, cancelled=None):
+        """Search a position in a worker (or take the result from the
+        cache).
+
+        Args:
+          board: board string
+          is_black: True if black is to move
+          time_limit: optional seconds to search for
+          max_depth: depth of the search (see tree_search.analyze)
+          deadline: seconds to wait for the result (by default the time
+            limit plus DEADLINE_MARGIN)
+          cancelled: optional function returning True when the result is
+            no longer wanted
+
+        Returns:
+          dictionary of the move, score, depth, nodes, pv and seconds.
+
+        Raises:
+          Overloaded, DeadlineExceeded or RequestError.
+        """
+        if deadline is None:
+            deadline = (time_limit or 0) + DEADLINE_MARGIN
+        deadline += time.time()
+
+        def compute():
+            request = _Request(board, is_black, time_limit, max_depth,
+                               deadline)
+            try:
+                self._queue.put_nowait(request)
+            except Queue.Full:
+                self._count('rejected')
+                raise Overloaded('too many requests waiting')
+            while not request.done.wait(0.05):
+                if cancelled is not None and cancelled():
+                    request.cancelled = True
+            if request.error is not None:
+                raise request.error
+            return request.result
+
+        if self.cache is None:
+            return compute()
+        return self.cache.get((board, is_black, time_limit, max_depth),
+                              compute)
+
+    def metrics(self):
+        result = {'workers': self.workers, 'queued': self._queue.qsize(),
+                  'completed': self.completed, 'rejected': self.rejected,
+                  'expired': self.expired, 'abandoned': self.abandoned}
+        if self.cache is not None:
+            result['cache'] = self.cache.metrics()
+        return result
+
+
+def parse_request(data):
+    """Check the JSON body of a /move request.
+
+    Returns:
+      tuple of board, is_black, time_limit, max_depth and deadline.
+
+    Raises:
+      BadRequest.
+    """
+    try:
+        request = json.loads(data)
+    except ValueError:
+        raise BadRequest('body is not JSON')
+    if not isinstance(request, dict):
+        raise BadRequest('body is not a JSON object')
+    board = request.get('board')
+    if (not isinstance(board, basestring) or len(board) != 32
+            or not set(board) <= BOARD_CHARACTERS):
+        raise BadRequest('board must be 32 characters of "bBrR-"')
+    is_black = request.get('is_black', True)
+    if not isinstance(is_black, bool):
+        raise BadRequest('is_black must be true or false')
+    values = []
+    for name, limit in (('time_limit', MAX_TIME_LIMIT),
+                        ('deadline', MAX_TIME_LIMIT + DEADLINE_MARGIN)):
+        value = request.get(name)
+        if value is not None and (
+                isinstance(value, bool) or
+                not isinstance(value, (int, float)) or
+                not 0 < value <= limit):
+            raise BadRequest('%s must be a number in (0, %s]' % (name,
+                                                                 limit))
+        values.append(value)
+    time_limit, deadline = values
+    max_depth = request.get('max_depth')
+    if max_depth is not None and (
+            isinstance(max_depth, bool) or
+            not isinstance(max_depth, (int, long)) or
+            not 1 <= max_depth <= MAX_REQUEST_DEPTH):
+        raise BadRequest('max_depth must be an integer in [1, %s]' %
+                         MAX_REQUEST_DEPTH)
+    if time_limit is None and max_depth is None:
+        raise BadRequest('time_limit or max_depth is required')
+    return str(board), is_black, time_limit, max_depth, deadline
+
+
+def _disconnected(connection):
+    """True if the client closed its end of a connection."""
+    try:
+        readable, _, _ = select.select([connection], [], [], 0)
+        return bool(readable) and not connection.recv(1, socket.MSG_PEEK)
+    except (socket.error, select.error):
+        return True
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self._reply(404, {'error': 'not found'})
+            return
+        self._reply(200, self.server.service.metrics())
+
+    def do_POST(self):
+        if self.path != '/move':
+            self._reply(404, {'error': 'not found'})
+            return
+        start = time.time()
+        try:
+            length = int(self.headers.getheader('content-length') or 0)
+            board, is_black, time_limit, max_depth, deadline = (
+                parse_request(self.rfile.read(length)))
+            result = self.server.service.search(
+                board, is_black, time_limit, max_depth, deadline,
+                cancelled=lambda: _disconnected(self.connection))
+        except RequestError as e:
+            self._reply(e.status, {'error': str(e)})
+            return
+        result = dict(result, latency=time.time() - start)
+        self._reply(200, result)
+
+    def _reply(self, status, body):
+        data = json.dumps(body, sort_keys=True)
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except socket.error:
+            # The client has gone away.
+            pass
+
+    def handle(self):
+        try:
+            BaseHTTPServer.BaseHTTPRequestHandler.handle(self)
+        except socket.error:
+            pass
+
+    def finish(self):
+        try:
+            BaseHTTPServer.BaseHTTPRequestHandler.finish(self)
+        except socket.error:
+            pass
+
+    def log_message(self, format, *args):
+        logging.debug(format, *args)
+
+
+class MoveServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """HTTP server answering requests with a SearchService."""
+
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        BaseHTTPServer.HTTPServer.__init__(self, address, _Handler)
+        self.service = service
+
+
+def load_test(url, clients=8, requests=10, time_limit=0.1,
+              boards=(STARTING_BOARD,)):
+    """Send requests to a server from several threads.
+
+    Args:
+      url: address of the server (e.g. http://localhost:8080)
+      clients: number of concurrent clients
+      requests: number of requests per client
+      time_limit: time limit of each search
+      boards: positions to ask for (in turn)
+
+    Returns:
+      dictionary with the number of answers by status and the latencies
+      of the successful requests (median, 90th percentile and maximum).
+    """
+    statuses = {}
+    latencies = []
+    lock = threading.Lock()
+
+    def client(index):
+        for i in range(requests):
+            body = json.dumps({'board': boards[(index + i) % len(boards)],
+                               'is_black': True, 'time_limit': time_limit})
+            start = time.time()
+            try:
+                urllib2.urlopen(url + '/move', body).read()
+                status = 200
+            except urllib2.HTTPError as e:
+                status = e.code
+            except urllib2.URLError:
+                status = 0
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(time.time() - start)
+
+    start = time.time()
+    threads = [threading.Thread(target=client, args=(i,))
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    return {'statuses': statuses, 'seconds': time.time() - start,
+            'median': percentile(0.5), 'p90': percentile(0.9),
+            'max': latencies[-1] if latencies else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Checkers move server.')
+    parser.add_argument('mode', choices=('serve', 'load'))
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE)
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help='number of results to cache (0 for none)')
+    parser.add_argument('--cache-file')
+    parser.add_argument('--ponder', action='store_true',
+                        help='search on the opponent\'s time')
+    parser.add_argument('--url', default='http://localhost:%d' % DEFAULT_PORT)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=10)
+    parser.add_argument('--time', type=float, default=0.1)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.mode == 'load':
+        print json.dumps(load_test(args.url, args.clients, args.requests,
+                                   args.time), sort_keys=True)
+        return
+    cache = None
+    if args.cache_size:
+        cache = ResultCache(args.cache_size, args.cache_file)
+    service = SearchService(args.workers, args.queue_size, cache=cache,
+                            ponder=args.ponder)
+    server = MoveServer(('', args.port), service)
+    logging.info('Serving on port %d with %d workers', args.port,
+                 service.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Tests for the move server."""
+
+__author__ = 'lhurd'
+
+import json
+import threading
+import time
+import unittest
+import urllib2
+
+import moves
+import server
+from moves_test import STARTING_BOARD, TEST_BOARD1
+
+
+class ParseRequestTest(unittest.TestCase):
+    def test_valid(self):
+        self.assertEqual(
+            (STARTING_BOARD, False, 0.5, None, None),
+            server.parse_request(json.dumps({'board': STARTING_BOARD,
+                                             'is_black': False,
+                                             'time_limit': 0.5})))
+        self.assertEqual(
+            (STARTING_BOARD, True, None, 3, 2),
+            server.parse_request(json.dumps({'board': STARTING_BOARD,
+                                             'max_depth': 3,
+                                             'deadline': 2})))
+
+    def test_invalid(self):
+        for body in ('not json', '[]', '{}',
+                     json.dumps({'board': 'b' * 31, 'time_limit': 1}),
+                     json.dumps({'board': 'x' * 32, 'time_limit': 1}),
+                     json.dumps({'board': STARTING_BOARD}),
+                     json.dumps({'board': STARTING_BOARD, 'is_black': 1,
+                                 'time_limit': 1}),
+                     json.dumps({'board': STARTING_BOARD, 'time_limit': -1}),
+                     json.dumps({'board': STARTING_BOARD, 'time_limit': '1'}),
+                     json.dumps({'board': STARTING_BOARD, 'max_depth': 100}),
+                     # Depths are whole plies.
+                     json.dumps({'board': STARTING_BOARD, 'max_depth': 0.5}),
+                     json.dumps({'board': STARTING_BOARD, 'max_depth': 2.0}),
+                     json.dumps({'board': STARTING_BOARD, 'max_depth': 0}),
+                     json.dumps({'board': STARTING_BOARD,
+                                 'max_depth': True})):
+            self.assertRaises(server.BadRequest, server.parse_request, body)
+
+
+class SearchServiceTest(unittest.TestCase):
+    def test_ponder(self):
+        service = server.SearchService(workers=1, queue_size=1,
+                                       table_size=1 << 16, ponder=True)
+        try:
+            result = service.search(STARTING_BOARD, True, max_depth=4)
+            reply = moves.flip(moves.find_children(
+                moves.flip(str(result['move'])))[0])
+            time.sleep(1)
+            result = service.search(reply, True, max_depth=4)
+            self.assertGreaterEqual(result['depth'], 4)
+            self.assertIn(result['move'], moves.find_children(reply))
+            # Answered from the pondering.
+            self.assertLess(result['seconds'], 0.01)
+        finally:
+            service.close()
+
+
+class MoveServerTest(unittest.TestCase):
+    def setUp(self):
+        self.service = server.SearchService(workers=1, queue_size=1,
+                                            table_size=1 << 16)
+        self.server = server.MoveServer(('localhost', 0), self.service)
+        self.url = 'http://localhost:%d' % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.service.close()
+
+    def post(self, request):
+        try:
+            response = urllib2.urlopen(self.url + '/move',
+                                       json.dumps(request))
+            return 200, json.loads(response.read())
+        except urllib2.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def metrics(self):
+        return json.loads(urllib2.urlopen(self.url + '/metrics').read())
+
+    def test_move(self):
+        status, result = self.post({'board': TEST_BOARD1, 'is_black': True,
+                                    'max_depth': 3})
+        self.assertEqual(200, status)
+        self.assertIn(result['move'], moves.find_children(TEST_BOARD1))
+        self.assertEqual(3, result['depth'])
+        self.assertEqual(1, self.metrics()['completed'])
+
+    def test_bad_request(self):
+        status, result = self.post({'board': 'nonsense'})
+        self.assertEqual(400, status)
+        self.assertIn('board', result['error'])
+
+    def test_deadline(self):
+        start = time.time()
+        status, result = self.post({'board': STARTING_BOARD,
+                                    'max_depth': 20, 'deadline': 0.3})
+        self.assertEqual(504, status)
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(1, self.metrics()['abandoned'])
+        # The worker was replaced.
+        status, _ = self.post({'board': STARTING_BOARD, 'max_depth': 2})
+        self.assertEqual(200, status)
+
+    def test_time_limit_within_deadline(self):
+        status, result = self.post({'board': STARTING_BOARD,
+                                    'time_limit': 5, 'deadline': 1.5})
+        self.assertEqual(200, status)
+        self.assertLess(result['latency'], 1.5)
+
+    def test_backpressure(self):
+        # One search running and one queued fill the server.
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.post(
+            {'board': STARTING_BOARD, 'max_depth': 20, 'deadline': 1})))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.2)
+        status, result = self.post({'board': STARTING_BOARD,
+                                    'max_depth': 2})
+        self.assertEqual(503, status)
+        self.assertIn('too many', result['error'])
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, self.metrics()['rejected'])
+
+    def test_load_test(self):
+        report = server.load_test(self.url, clients=2, requests=2,
+                                  time_limit=0.05)
+        self.assertEqual(4, sum(report['statuses'].values()))
+        self.assertIn(200, report['statuses'])
+
+
+if __name__ == '__main__':
+    unittest.main()
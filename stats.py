@@ -0,0 +1,155 @@
+"""Statistics on the work done by the tree search.
+
+Collecting statistics is optional: negamax only touches a SearchStats
+when one is attached to its Search, so that a search without one pays a
+single comparison per node.  Pass a SearchStats to tree_search.analyze
+to collect them and optionally register hooks to be called as the root
+children and the iterations of the search finish, e.g. for logging or
+for exporting to a monitoring system.
+"""
+__author__ = 'lhurd'
+
+from collections import defaultdict
+
+
+class SearchStats(object):
+    """Counters for one call to tree_search.analyze.
+
+    Attributes:
+      nodes: calls to negamax
+      leaves: positions evaluated with the static evaluation
+      quiescence_nodes: nodes searched by the quiescence search (also
+        counted in nodes)
+      delta_prunes: captures skipped by the delta pruning of the
+        quiescence search
+      cutoffs: beta cut-offs
+      table_probes: transposition table lookups
+      table_hits: lookups that found the position
+      table_cutoffs: lookups whose result was used without searching
+      tablebase_hits: positions scored by the endgame tablebase
+      draws: positions scored as draws by repetition or the 40 move rule
+      reductions: late moves searched to a reduced depth
+      re_searches: reduced searches repeated at full depth because the
+        move turned out better than expected
+      futility_prunes: positions one ply from the horizon whose moves
+        were pruned because their static evaluation was far below alpha
+      razors: positions two plies from the horizon whose static
+        evaluation was far below alpha and that were cut because a search
+        a ply shallower failed low too
+      ply_nodes: number of interior nodes at each ply
+      ply_children: number of children searched at each ply (the moves
+        after a cut-off are not generated)
+      aspiration_failures: iterations searched again with a full window
+        because the score fell outside the aspiration window
+      iterations: list of (depth, nodes, seconds) for each completed
+        iteration of the search
+      root_children: list of (child, value, nodes, seconds) for the root
+        children searched in the last iteration (which may not have
+        finished if the search ran out of time)
+      elapsed: seconds spent in the search
+    """
+
+    def __init__(self, on_root_child=None, on_iteration=None):
+        """
+        Args:
+          on_root_child: optional function called with the stats, child,
+            value, nodes and seconds after each root child is searched
+          on_iteration: optional function called with the stats, depth,
+            nodes and seconds after each iteration
+        """
+        self.on_root_child = on_root_child
+        self.on_iteration = on_iteration
+        self.nodes = 0
+        self.leaves = 0
+        self.quiescence_nodes = 0
+        self.delta_prunes = 0
+        self.cutoffs = 0
+        self.table_probes = 0
+        self.table_hits = 0
+        self.table_cutoffs = 0
+        self.tablebase_hits = 0
+        self.draws = 0
+        self.reductions = 0
+        self.re_searches = 0
+        self.futility_prunes = 0
+        self.razors = 0
+        self.ply_nodes = defaultdict(int)
+        self.ply_children = defaultdict(int)
+        self.aspiration_failures = 0
+        self.iterations = []
+        self.root_children = []
+        self.elapsed = 0.0
+
+    def root_child(self, child, value, nodes, seconds):
+        self.root_children.append((child, value, nodes, seconds))
+        if self.on_root_child is not None:
+            self.on_root_child(self, child, value, nodes, seconds)
+
+    def iteration(self, depth, nodes, seconds):
+        self.iterations.append((depth, nodes, seconds))
+        if self.on_iteration is not None:
+            self.on_iteration(self, depth, nodes, seconds)
+
+    def add(self, other):
+        """Add the counters of the search of a part of the tree (such as a
+        root child searched by a parallel.ParallelSearch worker).
+        """
+        for name in ('leaves', 'quiescence_nodes', 'delta_prunes',
+                     'cutoffs', 'table_probes', 'table_hits',
+                     'table_cutoffs', 'tablebase_hits', 'draws',
+                     'reductions', 're_searches', 'futility_prunes',
+                     'razors'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for ply, count in other.ply_nodes.items():
+            self.ply_nodes[ply] += count
+        for ply, count in other.ply_children.items():
+            self.ply_children[ply] += count
+
+    def branching_factor(self, ply):
+        """Average number of children searched by the interior nodes at a
+        ply.
+        """
+        if not self.ply_nodes.get(ply):
+            return 0.0
+        return float(self.ply_children[ply]) / self.ply_nodes[ply]
+
+    def effective_branching_factor(self):
+        """Growth in nodes from one iteration to the next (in the last two
+        iterations).
+        """
+        if len(self.iterations) < 2 or not self.iterations[-2][1]:
+            return 0.0
+        return float(self.iterations[-1][1]) / self.iterations[-2][1]
+
+    def nodes_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.nodes / self.elapsed
+
+    def as_dict(self):
+        """The statistics as a dictionary of plain values (for JSON)."""
+        return {
+            'nodes': self.nodes,
+            'leaves': self.leaves,
+            'quiescence_nodes': self.quiescence_nodes,
+            'delta_prunes': self.delta_prunes,
+            'cutoffs': self.cutoffs,
+            'table_probes': self.table_probes,
+            'table_hits': self.table_hits,
+            'table_cutoffs': self.table_cutoffs,
+            'tablebase_hits': self.tablebase_hits,
+            'draws': self.draws,
+            'reductions': self.reductions,
+            're_searches': self.re_searches,
+            'futility_prunes': self.futility_prunes,
+            'razors': self.razors,
+            'branching_factors': dict((ply, self.branching_factor(ply))
+                                      for ply in sorted(self.ply_nodes)),
+            'effective_branching_factor': self.effective_branching_factor(),
+            'aspiration_failures': self.aspiration_failures,
+            'iterations': self.iterations,
+            'root_children': [(value, nodes, seconds) for _, value, nodes,
+                              seconds in self.root_children],
+            'elapsed': self.elapsed,
+            'nodes_per_second': self.nodes_per_second(),
+        }
@@ -0,0 +1,45 @@
+"""Tests for the search statistics."""
+
+__author__ = 'lhurd'
+
+import unittest
+
+import tree_search
+from moves_test import STARTING_BOARD
+from stats import SearchStats
+from transposition import TranspositionTable
+
+
+class SearchStatsTest(unittest.TestCase):
+    def test_counters(self):
+        iterations = []
+        children = []
+        stats = SearchStats(
+            on_root_child=lambda s, *args: children.append(args),
+            on_iteration=lambda s, *args: iterations.append(args))
+        analysis = tree_search.analyze(STARTING_BOARD, True, time_limit=60,
+                                       max_depth=4,
+                                       table=TranspositionTable(1024),
+                                       stats=stats)
+        self.assertIs(stats, analysis.stats)
+        self.assertEqual(analysis.nodes, stats.nodes)
+        self.assertEqual([1, 2, 3, 4], [i[0] for i in iterations])
+        self.assertEqual(analysis.nodes, sum(i[1] for i in iterations))
+        self.assertEqual(7 * 4, len(children))
+        self.assertEqual(7, len(stats.root_children))
+        self.assertEqual(7.0, stats.branching_factor(1))
+        self.assertGreater(stats.leaves, 0)
+        self.assertGreater(stats.cutoffs, 0)
+        self.assertGreater(stats.table_hits, 0)
+        self.assertLessEqual(stats.table_cutoffs, stats.table_hits)
+        self.assertLessEqual(stats.table_hits, stats.table_probes)
+        self.assertGreater(stats.nodes_per_second(), 0)
+        self.assertEqual(stats.nodes, stats.as_dict()['nodes'])
+
+    def test_disabled(self):
+        self.assertIsNone(tree_search.analyze(STARTING_BOARD, True,
+                                              max_depth=2).stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,315 @@
+"""Endgame tablebases for positions with few checkers.
+
+Every position is seen from the point of view of the player to move
+(black, as in the rest of the program) and belongs to the table of its
+material signature: the numbers of black men, black kings, red men and
+red kings.  A table stores one signed 16-bit value per position:
+
+   0    draw (or a position that cannot occur)
+   d>0  the player to move wins in d plies
+  -d-1  the player to move loses in d plies
+
+The position index is the combination of the ranks of the sets of squares
+of each kind of checker in the combinatorial number system, so that
+lookups are a few table lookups and a read from a memory-mapped file.
+Tables are written in the byte order of the machine.
+
+Tables are solved by retrograde analysis.  A quiet move leads to a
+position of the swapped signature (the opponent is to move) so a table
+is solved together with its mirror image.  Captures lead to tables with
+fewer checkers and promotions to tables with more kings and these are
+solved first (recursively, on demand).  Within a pair of tables results
+are propagated backwards from the positions whose value is known in
+order of increasing distance so that the winner takes the shortest and
+the loser the longest way.
+
+Usage:
+  python tablebase.py [--pieces N] DIRECTORY
+"""
+__author__ = 'lhurd'
+
+import argparse
+import logging
+import mmap
+import os
+import struct
+from array import array
+from collections import defaultdict
+from itertools import combinations
+
+from bitboard import Position, find_children, flip, popcount
+from evaluate import INFINITY
+
+DEFAULT_PIECES = 4
+
+# Scores of won positions are below INFINITY (a win found by the search
+# itself) and go down with the distance to the win.
+WIN_SCORE = INFINITY - 1000
+
+BLACK_KING_ROW = 0xF0000000
+RED_KING_ROW = 0x0000000F
+
+BINOMIAL = [[0] * 33 for _ in range(33)]
+for _n in range(33):
+    BINOMIAL[_n][0] = 1
+    for _k in range(1, _n + 1):
+        BINOMIAL[_n][_k] = BINOMIAL[_n - 1][_k - 1] + BINOMIAL[_n - 1][_k]
+# RANK_TERMS[i][bit] is the contribution of the i-th (from 0) lowest
+# square of a set to its rank.
+RANK_TERMS = [dict((1 << s, BINOMIAL[s][i + 1]) for s in range(32))
+              for i in range(32)]
+
+
+def signature(position):
+    """The material signature (black men, black kings, red men, red kings)
+    of a position.
+    """
+    black, red, kings = position
+    black_kings = popcount(black & kings)
+    red_kings = popcount(red & kings)
+    return (popcount(black) - black_kings, black_kings,
+            popcount(red) - red_kings, red_kings)
+
+
+def mirror(sig):
+    """The signature of the flipped position."""
+    return sig[2], sig[3], sig[0], sig[1]
+
+
+def table_size(sig):
+    size = 1
+    for k in sig:
+        size *= BINOMIAL[32][k]
+    return size
+
+
+def _rank(bits):
+    rank = 0
+    i = 0
+    while bits:
+        bit = bits & -bits
+        bits ^= bit
+        rank += RANK_TERMS[i][bit]
+        i += 1
+    return rank
+
+
+def index(position, sig):
+    """Index of a position in the table of its signature."""
+    black, red, kings = position
+    result = 0
+    for bits, k in ((black & ~kings, sig[0]), (black & kings, sig[1]),
+                    (red & ~kings, sig[2]), (red & kings, sig[3])):
+        result = result * BINOMIAL[32][k] + _rank(bits)
+    return result
+
+
+def _positions(sig):
+    """Generate all legal positions of a signature."""
+    def sets(k, allowed):
+        for squares in combinations(range(32), k):
+            bits = 0
+            for s in squares:
+                bits |= 1 << s
+            if not bits & ~allowed:
+                yield bits
+
+    for black_men in sets(sig[0], ~BLACK_KING_ROW):
+        for black_kings in sets(sig[1], ~black_men):
+            black = black_men | black_kings
+            for red_men in sets(sig[2], ~(black | RED_KING_ROW)):
+                for red_kings in sets(sig[3], ~(black | red_men)):
+                    yield Position(black, red_men | red_kings,
+                                   black_kings | red_kings)
+
+
+def signatures(max_pieces):
+    """All signatures with at least one checker on each side and at most
+    max_pieces in total.
+    """
+    result = []
+    for total in range(2, max_pieces + 1):
+        for black in range(1, total):
+            for bk in range(black + 1):
+                for rk in range(total - black + 1):
+                    result.append((black - bk, bk, total - black - rk, rk))
+    return result
+
+
+def file_name(directory, sig):
+    return os.path.join(directory, '%d%d%d%d.tb' % sig)
+
+
+class Generator(object):
+    """Solves tables and writes them to a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.tables = {}
+
+    def table(self, sig):
+        """The solved table of a signature (solving it if necessary)."""
+        if sig not in self.tables:
+            name = file_name(self.directory, sig)
+            if os.path.exists(name):
+                values = array('h')
+                with open(name, 'rb') as f:
+                    values.fromfile(f, table_size(sig))
+                self.tables[sig] = values
+            else:
+                self._solve((sig, mirror(sig)))
+        return self.tables[sig]
+
+    def _solve(self, sigs):
+        sigs = sorted(set(sigs))
+        logging.info('Solving %s', sigs)
+        offsets = {}
+        total = 0
+        for sig in sigs:
+            offsets[sig] = total
+            total += table_size(sig)
+        values = array('h', [0]) * total
+        # Number of children whose value is not yet known to be a win for
+        # the opponent and the parents of each position (within sigs).
+        remaining = array('i', [-1]) * total
+        parents = defaultdict(list)
+        # Values known from the start (by distance).
+        events = defaultdict(list)
+        for sig in sigs:
+            offset = offsets[sig]
+            for position in _positions(sig):
+                node = offset + index(position, sig)
+                children = find_children(position)
+                remaining[node] = len(children)
+                if not children:
+                    events[0].append((node, -1))
+                for child in children:
+                    opponent = flip(child)
+                    if not opponent.black:
+                        value = -1
+                    else:
+                        child_sig = signature(opponent)
+                        if child_sig in offsets:
+                            parents[offsets[child_sig]
+                                    + index(opponent, child_sig)].append(node)
+                            continue
+                        value = self.table(child_sig)[
+                            index(opponent, child_sig)]
+                    if value:
+                        events[value if value > 0 else -value - 1].append(
+                            (node, value, True))
+        # Propagate values in order of distance.  An event (node, value)
+        # gives the value of node and (node, value, True) the value of a
+        # child of node from outside the tables being solved.
+        distance = 0
+        while events:
+            for event in events.pop(distance, ()):
+                if len(event) == 3:
+                    targets = (event[0],)
+                else:
+                    node, value = event
+                    if values[node]:
+                        continue
+                    values[node] = value
+                    targets = parents.pop(node, ())
+                for parent in targets:
+                    if values[parent] or remaining[parent] <= 0:
+                        continue
+                    value = event[1]
+                    if value < 0:
+                        # The opponent loses so we win.
+                        events[distance + 1].append((parent, distance + 1))
+                        remaining[parent] = 0
+                    else:
+                        remaining[parent] -= 1
+                        if not remaining[parent]:
+                            events[distance + 1].append(
+                                (parent, -(distance + 1) - 1))
+            distance += 1
+        for sig in sigs:
+            table = values[offsets[sig]:offsets[sig] + table_size(sig)]
+            self.tables[sig] = table
+            if self.directory:
+                with open(file_name(self.directory, sig), 'wb') as f:
+                    table.tofile(f)
+
+
+def generate(directory, max_pieces=DEFAULT_PIECES):
+    """Solve and write all tables with up to max_pieces checkers.
+
+    Args:
+      directory: where to write the tables (tables already there are
+        reused)
+      max_pieces: largest number of checkers on the board
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    generator = Generator(directory)
+    for sig in signatures(max_pieces):
+        generator.table(sig)
+
+
+class Tablebase(object):
+    """Memory-mapped tables for probing during the search."""
+
+    def __init__(self, directory):
+        """Map all the tables found in a directory.
+
+        Args:
+          directory: directory written by generate()
+        """
+        self.directory = directory
+        self._tables = {}
+        self._files = []
+        self.max_pieces = 0
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.tb'):
+                continue
+            sig = tuple(int(c) for c in name[:-3])
+            f = open(os.path.join(directory, name), 'rb')
+            self._files.append(f)
+            self._tables[sig] = mmap.mmap(f.fileno(), 0,
+                                          access=mmap.ACCESS_READ)
+            self.max_pieces = max(self.max_pieces, sum(sig))
+
+    def close(self):
+        for table in self._tables.values():
+            table.close()
+        for f in self._files:
+            f.close()
+
+    def lookup(self, position):
+        """Raw table value of a position (see the module documentation)
+        or None if there is no table for it.
+        """
+        if not position.black or not position.red:
+            return None
+        sig = signature(position)
+        table = self._tables.get(sig)
+        if table is None:
+            return None
+        return struct.unpack_from('=h', table, 2 * index(position, sig))[0]
+
+    def score(self, position):
+        """Score of a position for the player to move on the scale of the
+        search or None if there is no table for it.
+        """
+        value = self.lookup(position)
+        if value is None or value == 0:
+            return value
+        if value > 0:
+            return WIN_SCORE - value
+        return -value - 1 - WIN_SCORE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate tablebases.')
+    parser.add_argument('directory')
+    parser.add_argument('--pieces', type=int, default=DEFAULT_PIECES)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    generate(args.directory, args.pieces)
+
+
+if __name__ == '__main__':
+    main()
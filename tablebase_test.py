@@ -0,0 +1,74 @@
+"""Tests for the endgame tablebases."""
+
+__author__ = 'lhurd'
+
+import shutil
+import tempfile
+import unittest
+
+import tablebase
+import tree_search
+from bitboard import find_children, flip, from_string
+
+
+class TablebaseTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        # Two kings against one and everything it depends on.
+        tablebase.Generator(cls.directory).table((0, 2, 0, 1))
+        cls.tablebase = tablebase.Tablebase(cls.directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tablebase.close()
+        shutil.rmtree(cls.directory)
+
+    def test_index(self):
+        for sig in ((1, 0, 1, 0), (0, 2, 0, 1)):
+            indices = set(tablebase.index(p, sig)
+                          for p in tablebase._positions(sig))
+            self.assertEqual(len(indices), len(set(tablebase._positions(sig))))
+            self.assertLess(max(indices), tablebase.table_size(sig))
+
+    def test_values(self):
+        # Every value must follow from the values of the children.
+        for sig in ((0, 2, 0, 1), (0, 1, 0, 2), (0, 1, 0, 1)):
+            for position in list(tablebase._positions(sig))[::37]:
+                values = [tablebase.WIN_SCORE if not flip(c).black
+                          else -self.tablebase.score(flip(c))
+                          for c in find_children(position)]
+                expected = max(values) if values else -tablebase.WIN_SCORE
+                if expected > 0:
+                    expected -= 1
+                elif expected < 0:
+                    expected += 1
+                self.assertEqual(expected, self.tablebase.score(position))
+
+    def test_scores(self):
+        # Black kings on 0 and 29 with the red king on 14: black wins.
+        position = from_string('B-------------R--------------B--')
+        self.assertGreater(self.tablebase.lookup(position), 0)
+        self.assertLess(self.tablebase.score(flip(position)), 0)
+        # A king each is a draw.
+        self.assertEqual(0, self.tablebase.score(
+            from_string('B-------------R-----------------')))
+        # Nothing for positions without a table.
+        self.assertIsNone(self.tablebase.score(from_string(
+            'bbbbbbbbbbbb--------rrrrrrrrrrrr')))
+
+    def test_find_move_converts(self):
+        board = 'B-------------R--------------B--'
+        black = True
+        for _ in range(100):
+            board = tree_search.find_move(board, black, max_depth=1,
+                                          tablebase=self.tablebase)
+            if board is None:
+                break
+            black = not black
+        self.assertIsNone(board)
+        self.assertFalse(black)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""Zobrist hashing and a transposition table for the tree search.
+
+The search always looks at a position from the point of view of the
+player to move (see moves.flip) so the side to move is implied by the
+orientation of the position and the hash of a position is only ever
+compared with hashes of positions in the same orientation.
+
+Flipping a position is the most common operation in the search.  To make
+it free we keep two hashes for every position: the hash of the position
+and the hash of its flip.  The second uses a key table built from the
+first (a black man on square i in a position is a red man on square
+31 - i in the flipped one) so board.Board updates both incrementally from
+the squares that changed and flipping a position just swaps them.
+"""
+__author__ = 'lhurd'
+
+import random
+
+EXACT = 0
+LOWER = 1  # The value is a lower bound (the search failed high).
+UPPER = 2  # The value is an upper bound (the search failed low).
+
+DEFAULT_SIZE = 1 << 18
+
+_rng = random.Random(20150101)
+
+# Keys indexed by piece type (black man, black king, red man, red king)
+# and then by the bit of the square.
+KEYS = tuple(dict((1 << i, _rng.getrandbits(64)) for i in range(32))
+             for _ in range(4))
+FLIPPED_KEYS = tuple(dict((1 << i, KEYS[kind ^ 2][1 << (31 - i)])
+                          for i in range(32))
+                     for kind in range(4))
+
+
+def _piece_sets(position):
+    black, red, kings = position
+    return (black & ~kings, black & kings, red & ~kings, red & kings)
+
+
+def _hash(sets, keys):
+    h = 0
+    for bits, table in zip(sets, keys):
+        while bits:
+            bit = bits & -bits
+            bits ^= bit
+            h ^= table[bit]
+    return h
+
+
+def hash_position(position):
+    """Compute the hashes of a position from scratch.
+
+    Args:
+      position: bitboard.Position
+
+    Returns:
+      tuple of the hash of the position and the hash of its flip.
+    """
+    sets = _piece_sets(position)
+    return _hash(sets, KEYS), _hash(sets, FLIPPED_KEYS)
+
+
+class TranspositionTable(object):
+    """Fixed size two-tier transposition table.
+
+    Each slot holds two entries: the first is only replaced by a search
+    at least as deep (or by any search once it is left over from an
+    earlier call to new_search()) and the second is always replaced.
+    Entries are tuples of (key, depth, value, bound, move, generation).
+    """
+
+    def __init__(self, size=DEFAULT_SIZE):
+        """Create an empty table.
+
+        Args:
+          size: number of slots (the table holds up to twice as many
+            entries).
+        """
+        self.size = size
+        self.generation = 0
+        self._deep = [None] * size
+        self._recent = [None] * size
+
+    def new_search(self):
+        """Mark existing entries as belonging to an earlier search so that
+        they can be reused but will give way to new results.
+        """
+        self.generation += 1
+
+    def clear(self):
+        self._deep = [None] * self.size
+        self._recent = [None] * self.size
+
+    def probe(self, key):
+        """Look up a position.
+
+        Args:
+          key: position hash
+
+        Returns:
+          the entry tuple or None.
+        """
+        index = key % self.size
+        entry = self._deep[index]
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self._recent[index]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, value, bound, move):
+        """Record the result of a search.
+
+        Args:
+          key: position hash
+          depth: depth to which the position was searched
+          value: the value found
+          bound: EXACT, LOWER or UPPER
+          move: the best child found (or None)
+        """
+        index = key % self.size
+        entry = (key, depth, value, bound, move, self.generation)
+        deep = self._deep[index]
+        if (deep is None or deep[1] <= depth or deep[0] == key
+                or deep[5] != self.generation):
+            if deep is not None and deep[0] != key:
+                self._recent[index] = deep
+            self._deep[index] = entry
+        else:
+            self._recent[index] = entry
+
+    def __len__(self):
+        return (sum(1 for e in self._deep if e is not None)
+                + sum(1 for e in self._recent if e is not None))
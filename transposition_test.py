@@ -0,0 +1,51 @@
+"""Tests for Zobrist hashing and the transposition table."""
+
+__author__ = 'lhurd'
+
+import unittest
+
+import bitboard
+import transposition
+from board import RED, Board
+import tree_search
+from moves_test import STARTING_BOARD, TEST_BOARD1, TEST_BOARD3
+
+
+class TranspositionTest(unittest.TestCase):
+    def test_replacement(self):
+        table = transposition.TranspositionTable(size=1)
+        table.store(1, 5, 10, transposition.EXACT, None)
+        table.store(2, 3, 20, transposition.LOWER, None)
+        # The shallower search goes to the always replace tier.
+        self.assertEqual(5, table.probe(1)[1])
+        self.assertEqual(3, table.probe(2)[1])
+        table.store(3, 1, 30, transposition.UPPER, None)
+        self.assertIsNone(table.probe(2))
+        # A deeper search takes over the first tier.
+        table.store(4, 7, 40, transposition.EXACT, None)
+        self.assertEqual(40, table.probe(4)[2])
+        self.assertEqual(10, table.probe(1)[2])
+        self.assertEqual(2, len(table))
+        # Entries from an earlier search give way to new ones.
+        table.new_search()
+        table.store(5, 0, 50, transposition.EXACT, None)
+        self.assertEqual(50, table.probe(5)[2])
+        self.assertIsNone(table.probe(1))
+
+    def test_negamax_values(self):
+        table = transposition.TranspositionTable(size=1024)
+        for board in (STARTING_BOARD, TEST_BOARD1, TEST_BOARD3):
+            position = bitboard.from_string(board)
+            for child in bitboard.find_children(position):
+                self.assertEqual(
+                    tree_search.negamax(Board(child, RED), 4,
+                                        tree_search.NEGATIVE_INFINITY,
+                                        tree_search.INFINITY),
+                    tree_search.negamax(Board(child, RED), 4,
+                                        tree_search.NEGATIVE_INFINITY,
+                                        tree_search.INFINITY,
+                                        tree_search.Search(table)))
+
+
+if __name__ == '__main__':
+    unittest.main()
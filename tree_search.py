@@ -1,80 +1,693 @@
 import random
 import logging
+import time
+from collections import namedtuple
 
-from evaluate import evaluate
-from moves import find_children, has_jump, flip
+from bitboard import find_children, flip, from_string, popcount, to_string
+from board import CROWN, KING, RED, Board
+from evaluate import KING_VALUE, MAN_VALUE, evaluate_board
+from history import DRAW, History, is_drawn, is_progress
 from moves_test import STARTING_BOARD
+from ordering import MoveOrderer, staged_moves
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
 
 __author__ = 'lhurd'
 
 NEGATIVE_INFINITY = -99999
 INFINITY = 99999
 INITIAL_DEPTH = 8
+MAX_DEPTH = 40
+# Longest sequence of captures followed beyond the nominal depth.
+QUIESCENCE_DEPTH = 16
+# Allowance for the positional part of the evaluation when deciding that
+# a capture cannot raise alpha (None to search every capture).
+DELTA_MARGIN = 10
+# Half width of the window around the score of the previous iteration.
+ASPIRATION_WINDOW = 20
+# Number of moves searched at full depth before the quiet moves that
+# follow are searched LATE_MOVE_REDUCTION plies shallower, at depths of
+# at least LATE_MOVE_DEPTH (None to search every move at full depth).
+LATE_MOVES = 3
+LATE_MOVE_REDUCTION = 1
+LATE_MOVE_DEPTH = 3
+# Margins by which the static evaluation of a quiet position must fall
+# short of alpha for its moves to be pruned one ply from the horizon
+# (futility pruning) or, two plies from the horizon, for a search one ply
+# shallower to be tried first and the position cut if it fails low too
+# (razoring) (None to disable them).
+FUTILITY_MARGIN = MAN_VALUE
+RAZOR_MARGIN = 2 * MAN_VALUE
 
+# Shared by consecutive calls to find_move so that the results of the
+# search for one move can be reused when searching for the next.
+TABLE = TranspositionTable()
 
-def find_move(board, is_black):
+# The result of analyze().  The score is from the point of view of the
+# player to move and is None if there was nothing to search.  The stats
+# are those passed to analyze (if any).  The principal variation is the
+# list of boards expected to follow, starting with the move.
+Analysis = namedtuple('Analysis', ['move', 'score', 'depth', 'nodes',
+                                   'stats', 'pv'])
+
+
+class SearchTimeout(Exception):
+    """Raised by negamax when the deadline of the search has passed."""
+
+
+class Search(object):
+    """The state shared by all the nodes of a search."""
+
+    def __init__(self, table=None, orderer=None, deadline=None,
+                 tablebase=None, stats=None,
+                 quiescence_depth=QUIESCENCE_DEPTH,
+                 delta_margin=DELTA_MARGIN, evaluator=evaluate_board,
+                 history=None, late_moves=LATE_MOVES,
+                 late_move_reduction=LATE_MOVE_REDUCTION,
+                 late_move_depth=LATE_MOVE_DEPTH,
+                 futility_margin=FUTILITY_MARGIN, razor_margin=RAZOR_MARGIN,
+                 workers=None):
+        """
+        Args:
+          table: optional TranspositionTable
+          orderer: optional ordering.MoveOrderer
+          deadline: optional time.time() after which negamax raises
+            SearchTimeout
+          tablebase: optional tablebase.Tablebase
+          stats: optional stats.SearchStats
+          quiescence_depth: maximum number of captures searched by
+            quiesce
+          delta_margin: margin of the delta pruning in quiesce (None to
+            disable it)
+          evaluator: static evaluation of a board.Board from the point
+            of view of the player to move (evaluate.evaluate_board or
+            positional.evaluate_board)
+          history: optional history.History of the game, which makes the
+            search score repetitions and the 40 move rule as draws
+          late_moves: number of moves searched at full depth before the
+            late move reductions (None to disable them)
+          late_move_reduction: number of plies the late moves are reduced
+            by
+          late_move_depth: smallest depth at which late moves are reduced
+          futility_margin: margin of the futility pruning (None to
+            disable it)
+          razor_margin: margin of the razoring (None to disable it)
+          workers: optional parallel.ParallelSearch that searches the
+            children of the root after the first
+        """
+        self.table = table
+        self.orderer = orderer
+        self.deadline = deadline
+        self.tablebase = tablebase
+        self.stats = stats
+        self.quiescence_depth = quiescence_depth
+        self.delta_margin = delta_margin
+        self.evaluator = evaluator
+        self.history = history
+        self.late_moves = late_moves
+        self.late_move_reduction = late_move_reduction
+        self.late_move_depth = late_move_depth
+        self.futility_margin = futility_margin
+        self.razor_margin = razor_margin
+        self.workers = workers
+        self.nodes = 0
+        # The best line of moves found from each ply of the current path
+        # and, for each child of the root, the line that follows it.
+        self.pv = {}
+        self.lines = {}
+
+
+def find_move(board, is_black, time_limit=None, max_depth=None, table=TABLE,
+              tablebase=None, book=None, history=()):
     """Find the computer's move.
 
     Args:
       board: current board string
       is_black: True if current player is black
+      time_limit: optional number of seconds to search for
+      max_depth: depth of the search (see analyze)
+      table: TranspositionTable to use (None to search without one)
+      tablebase: optional tablebase.Tablebase
+      book: optional opening_book.OpeningBook
+      history: earlier positions of the game (see analyze)
 
     Returns:
       The best move or None if the game has been lost.
     """
+    return analyze(board, is_black, time_limit, max_depth, table,
+                   tablebase, book, history=history).move
+
+
+def analyze(board, is_black, time_limit=None, max_depth=None, table=TABLE,
+            tablebase=None, book=None, stats=None,
+            quiescence_depth=QUIESCENCE_DEPTH, evaluator=evaluate_board,
+            history=(), late_moves=LATE_MOVES,
+            late_move_reduction=LATE_MOVE_REDUCTION,
+            late_move_depth=LATE_MOVE_DEPTH, futility_margin=FUTILITY_MARGIN,
+            razor_margin=RAZOR_MARGIN, workers=None):
+    """Search a position.
+
+    Without a time limit the search goes straight to max_depth.  With one
+    it deepens one ply at a time, searching the best moves of the previous
+    iteration first, and returns the result of the deepest iteration that
+    finished before the deadline.
+
+    Args:
+      board: current board string
+      is_black: True if current player is black
+      time_limit: optional number of seconds to search for
+      max_depth: depth of the search (defaults to INITIAL_DEPTH without a
+        time limit and MAX_DEPTH with one)
+      table: TranspositionTable to use (None to search without one)
+      tablebase: optional tablebase.Tablebase used both inside the search
+        and, if it covers the position, instead of the search
+      book: optional opening_book.OpeningBook consulted before searching
+        (book moves have no score)
+      stats: optional stats.SearchStats to fill in
+      quiescence_depth: maximum number of captures searched beyond
+        max_depth
+      evaluator: static evaluation (see Search)
+      history: board strings of the positions of the game before board,
+        one per ply, for detecting draws (repetitions within the search
+        are scored as draws even without them), or None to search
+        without draw detection
+      late_moves: see Search
+      late_move_reduction: see Search
+      late_move_depth: see Search
+      futility_margin: see Search
+      razor_margin: see Search
+      workers: optional parallel.ParallelSearch whose processes search
+        the children of the root after the first (see Search)
+
+    Returns:
+      Analysis with the best move (None if the game has been lost), its
+      score, the depth reached, the number of nodes searched, stats and
+      principal variation.
+    """
+    start = time.time()
     # The UI uses the convention that unused spaces are '-'.
+    position = from_string(board)
     if not is_black:
-        board = flip(board)
-    best_child = None
-    best_children = []
-    best_value = NEGATIVE_INFINITY
-    for child in find_children(board):
-        value = negamax(child, INITIAL_DEPTH, NEGATIVE_INFINITY, INFINITY)
-        if value > best_value:
-            best_value = value
-            best_children = []
-        if value >= best_value:
-            best_children.append(child)
+        position = flip(position)
+    if table is not None:
+        table.new_search()
+    if workers is not None:
+        workers.new_search()
+    children = find_children(position)
+    best_children = children
+    best_value = None
+    depth = 0
+    if history is not None:
+        history = History(list(history) + [board], is_black)
+    search = Search(table, MoveOrderer(), tablebase=tablebase, stats=stats,
+                    quiescence_depth=quiescence_depth, evaluator=evaluator,
+                    history=history, late_moves=late_moves,
+                    late_move_reduction=late_move_reduction,
+                    late_move_depth=late_move_depth,
+                    futility_margin=futility_margin,
+                    razor_margin=razor_margin, workers=workers)
+    deadline = None
+    values = None
+    book_move = None
+    if book is not None and children:
+        book_move = book.choose(position, children)
+    if tablebase is not None and children and book_move is None:
+        values = _probe_children(tablebase, children)
+    if book_move is not None:
+        best_children = [book_move]
+        depths = []
+    elif values is not None:
+        best_value = max(values)
+        best_children = [child for child, value in zip(children, values)
+                         if value == best_value]
+        depths = []
+    elif not children:
+        depths = []
+    elif time_limit is None:
+        depths = [INITIAL_DEPTH if max_depth is None else max_depth]
+    elif len(children) > 1:
+        deadline = time.time() + time_limit
+        depths = range(1, (MAX_DEPTH if max_depth is None else max_depth) + 1)
+    else:
+        # There is nothing to decide.
+        depths = []
+    for depth in depths:
+        # The first iteration always runs to completion so that there is a
+        # result to return.
+        search.deadline = deadline if depth > 1 else None
+        iteration_start = time.time()
+        iteration_nodes = search.nodes
+        try:
+            if best_value is None:
+                values = _search_root(position, children, depth, search)
+            else:
+                # Expect a score close to that of the previous iteration
+                # and search again with a full window if it is not.
+                alpha = best_value - ASPIRATION_WINDOW
+                beta = best_value + ASPIRATION_WINDOW
+                values = _search_root(position, children, depth, search,
+                                      alpha, beta)
+                if not alpha < max(values) < beta:
+                    if stats is not None:
+                        stats.aspiration_failures += 1
+                    values = _search_root(position, children, depth, search)
+        except SearchTimeout:
+            depth -= 1
+            break
+        if stats is not None:
+            stats.iteration(depth, search.nodes - iteration_nodes,
+                            time.time() - iteration_start)
+        best_value = max(values)
+        best_children = [child for child, value in zip(children, values)
+                         if value == best_value]
+        # Search the most promising moves first in the next iteration.
+        children = [child for value, child in
+                    sorted(zip(values, children), key=lambda p: -p[0])]
     # If there are ties, choose randomly from among the tied choices.
-    if best_children:
+    best_child = None
+    if workers is not None and workers.deterministic and best_children:
+        best_child = best_children[0]
+    elif best_children:
         best_child = best_children[random.randint(0, len(best_children) - 1)]
         # best_child = best_children[0]
 
-    if best_child and not is_black:
-        result = flip(best_child)
-    else:
-        result = best_child
-    logging.info('Input %s Is Black %s Output %s' % (board, is_black, result))
-    return result
+    line = []
+    if best_child:
+        line.append(best_child)
+        line_board = Board(best_child, RED)
+        for move in search.lines.get(best_child, ()):
+            line_board.make(move)
+            line.append(line_board.position())
+        # The line stops where the search used the table instead of
+        # searching, so follow the best moves stored there.
+        while table is not None and len(line) <= depth:
+            entry = table.probe(line_board.key())
+            if (entry is None or entry[4] is None
+                    or not line_board.is_legal(entry[4])):
+                break
+            line_board.make(entry[4])
+            line.append(line_board.position())
+    if not is_black:
+        line = [flip(p) for p in line]
+    pv = [to_string(p) for p in line]
+    result = pv[0] if pv else None
+    logging.info('Input %s Is Black %s Depth %d First move cut-offs %.2f '
+                 'Output %s' % (board, is_black, depth,
+                                search.orderer.first_move_cutoff_rate(),
+                                result))
+    if stats is not None:
+        stats.nodes = search.nodes
+        stats.elapsed = time.time() - start
+        logging.info('Nodes %d Nodes per second %.0f', stats.nodes,
+                     stats.nodes_per_second())
+    return Analysis(result, best_value, depth, search.nodes, stats, pv)
+
 
+def _probe_children(tablebase, children):
+    """Values of the children of the root from the tablebase or None if
+    it does not cover all of them.
+    """
+    values = []
+    for child in children:
+        opponent = flip(child)
+        if not opponent.black:
+            values.append(INFINITY)
+            continue
+        value = tablebase.score(opponent)
+        if value is None:
+            return None
+        values.append(-value)
+    return values
+
+
+def _search_root(position, children, depth, search,
+                 alpha=NEGATIVE_INFINITY, beta=INFINITY):
+    """Search the children of the root by principal variation search.
+
+    The first child is searched with the window (alpha, beta) and each of
+    the others with a null window just below the best value so far, which
+    only tells whether it is at least as good.  Those that are get
+    searched again for their exact value.  With search.workers the
+    children after the first are searched in parallel (with the best
+    value known when each starts).  The line that follows each child is
+    left in search.lines.
 
-def negamax(board, depth, alpha, beta):
-    """Perform an alpha beta search of the move tree using the symmetry
-    that we can flip the board to always look at things from black's point
-    of view.
+    Returns:
+      list of values of the children: exact for the best children (and
+      all those that tie with them) if the best value is within the
+      window, upper bounds for the others.
+    """
+    stats = search.stats
+    if stats is not None:
+        stats.root_children = []
+    history = search.history
+    if history is not None:
+        quiet = history.quiet
+    lines = {}
+    values = []
+    best = None
+    for child in children:
+        if best is not None and search.workers is not None:
+            if history is not None:
+                history.quiet = quiet
+            rest = children[len(values):]
+            results = search.workers.search_children(position, rest, depth,
+                                                     search, best, beta)
+            for other, (value, line) in zip(rest, results):
+                lines[other] = line
+                values.append(value)
+            break
+        start = time.time()
+        nodes = search.nodes
+        board = Board(child, RED)
+        if history is not None:
+            history.quiet = 0 if is_progress(position, child) else quiet + 1
+        if best is None:
+            value = negamax(board, depth, -beta, -alpha, search)
+        else:
+            value = negamax(board, depth, -best, 1 - best, search)
+            if best <= value < beta:
+                value = negamax(board, depth, -beta, 1 - best, search)
+        lines[child] = search.pv.get(1, [])
+        if best is None or value > best:
+            best = value
+        values.append(value)
+        if stats is not None:
+            stats.root_child(child, value, search.nodes - nodes,
+                             time.time() - start)
+    if history is not None:
+        history.quiet = quiet
+    search.lines = lines
+    return values
+
+
+def negamax(board, depth, alpha, beta, search=None, ply=1):
+    """Perform an alpha beta search of the move tree by making and
+    unmaking the moves on a single board.
 
     Args:
-      board: board string
+      board: board.Board after the move to evaluate (i.e. with the
+        opponent to move); it is left as it was unless the search times
+        out
       depth: depth of search (overridden if captures are possible)
       alpha: the alpha cut-off
       beta: the beta cut-off
+      search: optional Search with the tables and limits of the search
+      ply: distance from the root of the player to move
 
     Returns:
-      The evaluation value (integer) of the initial move represented by
-      board.
+      The evaluation value (integer) of the move that led to board for
+      the player who made it.
     """
 
-    # We do not stop the search if there are pending captures.
-    if depth <= 0 and not has_jump(board):
-        return evaluate(board)
+    # Only the moves of kings that capture nothing can lead back to a
+    # position, and it takes at least four of them.
+    if (search is not None and search.history is not None
+            and search.history.quiet >= 4):
+        history = search.history
+        if (history.quiet >= history.limit
+                or history.seen[board.side].get(board.hash)):
+            search.pv[ply] = []
+            if search.stats is not None:
+                search.stats.draws += 1
+            return DRAW
+    if depth <= 0:
+        return quiesce(board, alpha, beta, search, ply)
+    stats = None
+    if search is not None:
+        search.nodes += 1
+        stats = search.stats
+        pv = search.pv
+        pv[ply] = []
+        value = _probe_tablebase(board, search)
+        if value is not None:
+            return value
+    if search is None:
+        best_value = NEGATIVE_INFINITY
+        for move in board.moves():
+            board.make(move)
+            value = negamax(board, depth - 1, -beta, -alpha)
+            board.unmake(move)
+            best_value = max(best_value, value)
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return -best_value
+
+    if search.deadline is not None and time.time() > search.deadline:
+        raise SearchTimeout()
+    if stats is not None:
+        stats.ply_nodes[ply] += 1
+    table = search.table
+    hash_move = None
+    if table is not None:
+        key = board.key()
+        entry = table.probe(key)
+        if stats is not None:
+            stats.table_probes += 1
+            stats.table_hits += entry is not None
+        if entry is not None:
+            _, entry_depth, value, bound, hash_move, _ = entry
+            if entry_depth >= depth and (
+                    bound == EXACT or (bound == LOWER and value >= beta)
+                    or (bound == UPPER and value <= alpha)):
+                if stats is not None:
+                    stats.table_cutoffs += 1
+                return -value
+    # Captures are compulsory so either all the moves are captures or
+    # none of them is.
+    quiet_moves = not board.has_jump()
+    if quiet_moves and depth <= 2 and beta - alpha == 1 and (
+            search.futility_margin is not None
+            or search.razor_margin is not None) and board.any_moves():
+        # A null window search near the horizon only needs to know
+        # whether the position is better than alpha, which a quiet move
+        # is unlikely to make it if the static evaluation is well below.
+        static = search.evaluator(board)
+        if (depth == 2 and search.razor_margin is not None
+                and static + search.razor_margin <= alpha):
+            # Check that a search one ply shallower fails low too before
+            # cutting the position there.
+            value = _razor(board, alpha, search, ply)
+            if value <= alpha:
+                if stats is not None:
+                    stats.razors += 1
+                return -value
+        elif (depth == 1 and search.futility_margin is not None
+                and static + search.futility_margin <= alpha):
+            if stats is not None:
+                stats.futility_prunes += 1
+            return -(static + search.futility_margin)
+    late_moves = search.late_moves
+    reduce_late_moves = (late_moves is not None and quiet_moves
+                         and depth >= search.late_move_depth)
+    orderer = search.orderer
+    # The moves after a cut-off are never generated.
+    moves = staged_moves(board, hash_move, orderer, ply, not quiet_moves)
+    # The position is on the line being searched until all its moves are.
+    history = search.history
+    tracking = False
+    if history is not None:
+        quiet = history.quiet
+        if board.kings:
+            tracking = True
+            seen = history.seen[board.side]
+            position_hash = board.hash
+            seen[position_hash] = seen.get(position_hash, 0) + 1
+        elif quiet:
+            # Every move is a move of a man.
+            history.quiet = 0
+    original_alpha = alpha
     best_value = NEGATIVE_INFINITY
-    children = find_children(flip(board))
-    for child in children:
-        value = negamax(child, depth - 1, -beta, -alpha)
+    best_move = None
+    for index, move in enumerate(moves):
+        if stats is not None:
+            stats.ply_children[ply] += 1
+        board.make(move)
+        if tracking:
+            history.quiet = quiet + 1 if move[4] == KING and not move[2] else 0
+        value = None
+        if reduce_late_moves and index >= late_moves:
+            # The moves ordered last are unlikely to be good so check
+            # that they are not with a shallower null window search and
+            # search them fully only if it fails.
+            value = negamax(board, depth - 1 - search.late_move_reduction,
+                            -alpha - 1, -alpha, search, ply + 1)
+            if stats is not None:
+                stats.reductions += 1
+            if value > alpha:
+                if stats is not None:
+                    stats.re_searches += 1
+                value = None
+        if value is None:
+            if index == 0 or beta - alpha == 1:
+                value = negamax(board, depth - 1, -beta, -alpha, search,
+                                ply + 1)
+            else:
+                # Principal variation search: the first move is expected
+                # to be the best so only check that the others are not
+                # better.
+                value = negamax(board, depth - 1, -alpha - 1, -alpha,
+                                search, ply + 1)
+                if alpha < value < beta:
+                    value = negamax(board, depth - 1, -beta, -alpha,
+                                    search, ply + 1)
+        board.unmake(move)
+        if value > best_value:
+            best_value = value
+            best_move = move
+            if alpha < value < beta:
+                pv[ply] = [move] + pv.get(ply + 1, [])
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            if orderer is not None:
+                orderer.record_cutoff(move, ply, depth, index)
+            if stats is not None:
+                stats.cutoffs += 1
+            break
+    if history is not None:
+        if tracking:
+            seen[position_hash] -= 1
+        history.quiet = quiet
+    if table is not None:
+        if best_value >= beta:
+            bound = LOWER
+        elif best_value <= original_alpha:
+            bound = UPPER
+        else:
+            bound = EXACT
+        table.store(key, depth, best_value, bound, best_move)
+    return -best_value
+
+
+def _razor(board, alpha, search, ply):
+    """Search the quiet moves of a position one ply deep (with the
+    captures that follow them) with a null window at alpha.
+
+    Returns:
+      the value of the position for the player to move: the best value of
+      the moves if none of them is better than alpha, otherwise the value
+      of the first that is.
+    """
+    best_value = NEGATIVE_INFINITY
+    for move in board.steps():
+        board.make(move)
+        value = quiesce(board, -alpha - 1, -alpha, search, ply + 1)
+        board.unmake(move)
+        if value > best_value:
+            best_value = value
+            if value > alpha:
+                break
+    return best_value
+
+
+def _probe_tablebase(board, search):
+    """Value of board for the player who moved from the tablebase of
+    search or None if it has none for the position.
+    """
+    tablebase = search.tablebase
+    if tablebase is None or sum(board.material) > tablebase.max_pieces:
+        return None
+    value = tablebase.score(board.oriented())
+    if value is None:
+        return None
+    if search.stats is not None:
+        search.stats.tablebase_hits += 1
+    return -value
+
+
+def _gain(move):
+    """Material won by a move."""
+    captured_kings = move.captured_kings
+    gain = (MAN_VALUE * popcount(move.captured ^ captured_kings)
+            + KING_VALUE * popcount(captured_kings))
+    if move.kind == CROWN:
+        gain += KING_VALUE - MAN_VALUE
+    return gain
+
+
+def quiesce(board, alpha, beta, search=None, ply=1, depth=0):
+    """Search the captures of a position at the end of the main search
+    until it is quiet.
+
+    Captures are compulsory so a player with a capture must make one
+    while a player without one stands pat: the static evaluation is taken
+    as the value of the position, since there is usually a move that at
+    least keeps it.  Captures that would not raise alpha even if they won
+    their material outright (plus search.delta_margin) are skipped, on
+    the guess that the forced replies do not change that, and a position
+    whose captures are all skipped fails low.
+
+    Args:
+      board: board.Board after the move to evaluate (as for negamax)
+      alpha: the alpha cut-off
+      beta: the beta cut-off
+      search: optional Search
+      ply: distance from the root of the player to move
+      depth: number of captures searched so far (up to
+        search.quiescence_depth)
+
+    Returns:
+      The evaluation value (integer) of the move that led to board for
+      the player who made it.
+    """
+    stats = None
+    max_depth = QUIESCENCE_DEPTH
+    delta_margin = DELTA_MARGIN
+    evaluator = evaluate_board
+    if search is not None:
+        search.nodes += 1
+        stats = search.stats
+        max_depth = search.quiescence_depth
+        delta_margin = search.delta_margin
+        evaluator = search.evaluator
+        search.pv[ply] = []
+        if stats is not None:
+            stats.quiescence_nodes += 1
+        value = _probe_tablebase(board, search)
+        if value is not None:
+            return value
+    if not board.has_jump():
+        if stats is not None:
+            stats.leaves += 1
+        # A player who cannot move has lost whatever the material says.
+        if not board.any_moves():
+            return INFINITY
+        return -evaluator(board)
+    stand_pat = evaluator(board)
+    if depth >= max_depth:
+        if stats is not None:
+            stats.leaves += 1
+        return -stand_pat
+    if search is not None and search.deadline is not None and (
+            time.time() > search.deadline):
+        raise SearchTimeout()
+    jumps = list(board.jumps())
+    if len(jumps) > 1:
+        jumps.sort(key=_gain, reverse=True)
+    best_value = NEGATIVE_INFINITY
+    pruned = False
+    for move in jumps:
+        if delta_margin is not None and (
+                stand_pat + _gain(move) + delta_margin <= alpha):
+            # A guess rather than a bound: captures are compulsory, so the
+            # replies can be forced captures that swing the material
+            # either way, but a capture that falls this far short of
+            # alpha rarely raises it.
+            if stats is not None:
+                stats.delta_prunes += 1
+            pruned = True
+            continue
+        board.make(move)
+        value = quiesce(board, -beta, -alpha, search, ply + 1, depth + 1)
+        board.unmake(move)
         best_value = max(best_value, value)
         alpha = max(alpha, value)
         if alpha >= beta:
             break
+    if pruned and best_value < alpha:
+        # The pruned captures were not searched, so all that is known is
+        # that (by the guess) they fail low.
+        best_value = alpha
     return -best_value
 
 
@@ -85,12 +698,15 @@ if __name__ == '__main__':
     # NEGATIVE_INFINITY, INFINITY)
     bd = STARTING_BOARD
     black = True
-    i = 0
+    game = [bd]
     while bd:
-        bd = find_move(bd, black)
+        bd = find_move(bd, black, history=game[:-1])
         if not bd:
             print '%s wins.' % ('red' if black else 'black')
             break
         black = not black
-        i += 1
-        print '%3d %s' % (i, bd)
+        game.append(bd)
+        print '%3d %s' % (len(game) - 1, bd)
+        if is_drawn(game):
+            print 'Draw.'
+            break
@@ -0,0 +1,292 @@
+"""Tests for the tree search."""
+
+__author__ = 'lhurd'
+
+import time
+import unittest
+
+import bitboard
+import moves
+import positional
+import tree_search
+from board import RED, Board
+from history import DRAW, History
+from moves_test import STARTING_BOARD, TEST_BOARD1, TEST_BOARD2
+from ordering import MoveOrderer
+from stats import SearchStats
+from transposition import TranspositionTable
+
+
+class FindMoveTest(unittest.TestCase):
+    def test_lost_game(self):
+        self.assertIsNone(tree_search.find_move('r' * 12 + '-' * 20, True,
+                                                table=None))
+        self.assertIsNone(tree_search.find_move('r' * 12 + '-' * 20, True,
+                                                time_limit=0.1))
+
+    def test_legal_move(self):
+        for board in (STARTING_BOARD, TEST_BOARD1):
+            self.assertIn(tree_search.find_move(board, True, max_depth=3,
+                                                table=TranspositionTable(64)),
+                          moves.find_children(board))
+            self.assertIn(tree_search.find_move(board, False, max_depth=3),
+                          [moves.flip(b) for b in
+                           moves.find_children(moves.flip(board))])
+
+    def test_evaluator(self):
+        for board in (STARTING_BOARD, TEST_BOARD1):
+            analysis = tree_search.analyze(
+                board, True, max_depth=3, table=TranspositionTable(64),
+                evaluator=positional.evaluate_board)
+            self.assertIn(analysis.move, moves.find_children(board))
+
+    def test_time_limit(self):
+        start = time.time()
+        move = tree_search.find_move(STARTING_BOARD, True, time_limit=0.2,
+                                     table=TranspositionTable(1024))
+        self.assertLess(time.time() - start, 1)
+        self.assertIn(move, moves.find_children(STARTING_BOARD))
+
+    def test_single_move(self):
+        # Black must take the checkers on squares 9 and 18 and there is
+        # nothing to search.
+        board = '-----b---r--------r-------------'
+        self.assertEqual('-' * 23 + 'b' + '-' * 8,
+                         tree_search.find_move(board, True, time_limit=0.2))
+
+    def test_winning_move(self):
+        # Taking the last checker of red and blocking the last one (where
+        # either of two moves does it).
+        for board, winning in (
+                ('b----r' + '-' * 26, ['-' * 9 + 'b' + '-' * 22]),
+                ('b---r----------b' + '-' * 16,
+                 ['b---r' + '-' * 13 + 'b' + '-' * 13,
+                  'b---r' + '-' * 14 + 'b' + '-' * 12])):
+            for max_depth in (1, 4):
+                analysis = tree_search.analyze(
+                    board, True, max_depth=max_depth,
+                    table=TranspositionTable(1024))
+                self.assertIn(analysis.move, winning)
+                self.assertEqual([analysis.move], analysis.pv)
+                self.assertEqual(tree_search.INFINITY, analysis.score)
+
+
+class DrawTest(unittest.TestCase):
+    # Two black kings against a red king.
+    BOARD = '------B--------B-------R--------'
+
+    def test_repetition(self):
+        # Every move of black goes back to a position of the game.
+        children = [bitboard.to_string(child) for child in
+                    bitboard.find_children(bitboard.from_string(self.BOARD))]
+        game = []
+        for child in children:
+            game += [child, self.BOARD]
+        game.pop()
+        self.assertGreater(tree_search.analyze(
+            self.BOARD, True, max_depth=4, table=TranspositionTable(1024),
+            history=None).score, 0)
+        stats = SearchStats()
+        analysis = tree_search.analyze(
+            self.BOARD, True, max_depth=4, table=TranspositionTable(1024),
+            stats=stats, history=game)
+        self.assertEqual(DRAW, analysis.score)
+        self.assertIn(analysis.move, children)
+        self.assertGreater(stats.draws, 0)
+        # The same for red.
+        self.assertEqual(DRAW, tree_search.analyze(
+            moves.flip(self.BOARD), False, max_depth=4,
+            table=TranspositionTable(1024),
+            history=[moves.flip(board) for board in game]).score)
+
+    def test_no_progress(self):
+        position = bitboard.from_string(self.BOARD)
+        children = bitboard.find_children(position)
+        history = History([self.BOARD])
+        search = tree_search.Search(TranspositionTable(1024),
+                                    history=history)
+        self.assertTrue(any(tree_search._search_root(
+            position, children, 4, search)))
+        history.quiet = history.limit - 1
+        self.assertEqual([DRAW] * len(children), tree_search._search_root(
+            position, children, 4, search))
+        self.assertEqual(history.limit - 1, history.quiet)
+
+    def test_pv(self):
+        # The lines cut short by repetitions end there.
+        game = ['-------BB------R---------------R',
+                '--------B--B---R---------------R',
+                '--------B--B-------R-----------R']
+        board = '-------BB----------R-----------R'
+        position = bitboard.flip(bitboard.from_string(board))
+        children = bitboard.find_children(position)
+        search = tree_search.Search(TranspositionTable(4096), MoveOrderer(),
+                                    history=History(game + [board], False))
+        tree_search._search_root(position, children, 6, search)
+        for child in children:
+            line_board = Board(child, RED)
+            for move in search.lines[child]:
+                self.assertTrue(line_board.is_legal(move))
+                line_board.make(move)
+
+    def test_search_values(self):
+        # Away from the endgame the draw rules do not change the scores.
+        for board in (STARTING_BOARD, TEST_BOARD1):
+            self.assertEqual(
+                tree_search.analyze(board, True, max_depth=5,
+                                    table=TranspositionTable(1024)).score,
+                tree_search.analyze(board, True, max_depth=5,
+                                    table=TranspositionTable(1024),
+                                    history=None).score)
+
+
+class SelectiveSearchTest(unittest.TestCase):
+    OFF = {'late_moves': None, 'futility_margin': None,
+           'razor_margin': None}
+
+    def _analyze(self, board, depth, **kwargs):
+        stats = SearchStats()
+        analysis = tree_search.analyze(board, True, max_depth=depth,
+                                       table=TranspositionTable(1 << 16),
+                                       stats=stats, **kwargs)
+        self.assertIn(analysis.move, moves.find_children(board))
+        return analysis
+
+    def test_switches(self):
+        counters = ('reductions', 'futility_prunes', 'razors')
+        stats = self._analyze(TEST_BOARD1, 7, **self.OFF).stats
+        self.assertEqual([0, 0, 0], [getattr(stats, c) for c in counters])
+        for counter, option, value in (
+                ('reductions', 'late_moves', tree_search.LATE_MOVES),
+                ('futility_prunes', 'futility_margin',
+                 tree_search.FUTILITY_MARGIN),
+                ('razors', 'razor_margin', tree_search.RAZOR_MARGIN)):
+            kwargs = dict(self.OFF)
+            kwargs[option] = value
+            stats = self._analyze(TEST_BOARD1, 7, **kwargs).stats
+            for other in counters:
+                if other == counter:
+                    self.assertGreater(getattr(stats, other), 0)
+                else:
+                    self.assertEqual(0, getattr(stats, other))
+        self.assertLessEqual(stats.re_searches, stats.reductions)
+
+    def test_margins(self):
+        # Wider margins prune less.
+        prunes = [self._analyze(TEST_BOARD1, 7, futility_margin=margin,
+                                razor_margin=2 * margin).stats
+                  for margin in (0, tree_search.FUTILITY_MARGIN,
+                                 tree_search.INFINITY)]
+        self.assertGreater(prunes[0].futility_prunes,
+                           prunes[1].futility_prunes)
+        self.assertGreaterEqual(prunes[0].razors, prunes[1].razors)
+        self.assertEqual(0, prunes[2].futility_prunes + prunes[2].razors)
+
+    def test_razoring(self):
+        # The static evaluation of black is far below alpha but black has
+        # a move that forces captures winning a man, so a search a ply
+        # shallower does not fail low and the position is not cut.
+        board = Board(bitboard.from_string(
+            '--bbb-b-bbb-----r-rb-rr-r--rr--r'))
+        alpha = tree_search.evaluate_board(board) + tree_search.RAZOR_MARGIN
+        stats = SearchStats()
+        value = -tree_search.negamax(board, 2, alpha, alpha + 1,
+                                     tree_search.Search(stats=stats))
+        self.assertGreater(value, alpha)
+        self.assertEqual(0, stats.razors + stats.futility_prunes)
+
+    def test_late_move_settings(self):
+        kwargs = dict(self.OFF, late_moves=tree_search.LATE_MOVES)
+        self.assertEqual(0, self._analyze(
+            TEST_BOARD1, 7, late_move_depth=8, **kwargs).stats.reductions)
+        stats = self._analyze(TEST_BOARD1, 7, late_move_reduction=2,
+                              **kwargs).stats
+        self.assertGreater(stats.reductions, 0)
+
+    def test_fewer_nodes(self):
+        for board in (STARTING_BOARD, TEST_BOARD1):
+            self.assertLess(self._analyze(board, 7).nodes,
+                            self._analyze(board, 7, **self.OFF).nodes)
+
+
+class QuiescenceTest(unittest.TestCase):
+    def _quiesce(self, board, search=None):
+        return tree_search.quiesce(Board(bitboard.from_string(board)),
+                                   tree_search.NEGATIVE_INFINITY,
+                                   tree_search.INFINITY, search)
+
+    def test_captures(self):
+        # Black takes three checkers and is crowned: a king against a man
+        # (values are for red, who moved last).
+        self.assertEqual(-10, self._quiesce(TEST_BOARD2))
+        self.assertEqual(-10, self._quiesce(
+            TEST_BOARD2, tree_search.Search(delta_margin=None)))
+        # Without captures the static evaluation stands.
+        self.assertEqual(0, self._quiesce(STARTING_BOARD))
+        # The depth limit stops before the captures.
+        self.assertEqual(60, self._quiesce(
+            TEST_BOARD2, tree_search.Search(quiescence_depth=0)))
+        # Captures too small to reach alpha are pruned and the position
+        # fails low at alpha.
+        stats = SearchStats()
+        self.assertEqual(-1000, tree_search.quiesce(
+            Board(bitboard.from_string(TEST_BOARD2)), 1000, 2000,
+            tree_search.Search(stats=stats)))
+        self.assertGreater(stats.delta_prunes, 0)
+
+    def test_stats(self):
+        stats = SearchStats()
+        tree_search.analyze(TEST_BOARD1, True, max_depth=4, stats=stats,
+                            table=TranspositionTable(1024))
+        self.assertGreater(stats.quiescence_nodes, 0)
+        self.assertLess(stats.quiescence_nodes, stats.nodes)
+
+
+class PrincipalVariationTest(unittest.TestCase):
+    def test_root_values(self):
+        # The best value and the best children are those of a full width
+        # search.
+        for board in (STARTING_BOARD, TEST_BOARD1):
+            position = bitboard.from_string(board)
+            children = bitboard.find_children(position)
+            expected = [tree_search.negamax(
+                Board(child, RED), 4, tree_search.NEGATIVE_INFINITY,
+                tree_search.INFINITY) for child in children]
+            values = tree_search._search_root(
+                position, children, 4,
+                tree_search.Search(TranspositionTable(1024), MoveOrderer()))
+            best = max(expected)
+            self.assertEqual(best, max(values))
+            self.assertEqual([v == best for v in expected],
+                             [v == best for v in values])
+
+    def test_aspiration(self):
+        # Deepening with aspiration windows gives the same score as going
+        # straight to the depth.
+        for board in (STARTING_BOARD, TEST_BOARD1):
+            self.assertEqual(
+                tree_search.analyze(board, True, max_depth=5,
+                                    table=TranspositionTable(1024)).score,
+                tree_search.analyze(board, True, time_limit=60, max_depth=5,
+                                    table=TranspositionTable(1024)).score)
+
+    def test_pv(self):
+        analysis = tree_search.analyze(TEST_BOARD1, False, max_depth=5,
+                                       table=TranspositionTable(1024))
+        self.assertEqual(analysis.move, analysis.pv[0])
+        self.assertGreater(len(analysis.pv), 1)
+        # The boards alternate between the moves of red and black.
+        board = TEST_BOARD1
+        black = False
+        for after in analysis.pv:
+            if black:
+                self.assertIn(after, moves.find_children(board))
+            else:
+                self.assertIn(moves.flip(after),
+                              moves.find_children(moves.flip(board)))
+            board = after
+            black = not black
+
+
+if __name__ == '__main__':
+    unittest.main()
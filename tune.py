@@ -0,0 +1,299 @@
+"""Fit the weights of the positional evaluation to the results of games.
+
+This is Texel's method: the result of a game is predicted from each of
+its positions as sigmoid(scale * evaluation), where the evaluation is
+the weighted sum of positional.FEATURES, and the weights are chosen to
+minimize the mean squared error of the predictions over a large number
+of positions.  The scale is fitted first with the starting weights and
+kept fixed, which pins down the units of the weights (a man stays worth
+about 20).
+
+The features of every position are computed once, in batches, into an
+N x len(FEATURES) int8 matrix (8 bytes per position) that can be cached
+in a .npz file along with the results, so that tuning again (with other
+settings or starting weights) does not read the games again.  Each step
+of the optimization is then two matrix-vector products over the whole
+matrix.
+
+The games are the JSON lines written by "batch.py selfplay" or record
+files with the RESULT field (see records.py), which are read much
+faster: every position of a game is labeled with its result, 1 if black
+won, 0 if red won and 1/2 if it was not decided.
+
+Usage:
+  python tune.py [--cache FILE] [--weights FILE] [--output FILE]
+                 [--iterations N] [--rate R] [--skip P] GAMES ...
+"""
+__author__ = 'lhurd'
+
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+import positional
+import records
+import vector_evaluate
+
+# Results of the games as stored in the matrix.
+RED_WIN = 0
+UNDECIDED = 1
+BLACK_WIN = 2
+RESULTS = {'black': BLACK_WIN, 'red': RED_WIN, None: UNDECIDED}
+
+BATCH_SIZE = 100000
+# Opening positions are the same in most games and say little about the
+# result.
+SKIP_PLIES = 4
+ITERATIONS = 500
+LEARNING_RATE = 0.1
+
+
+def read_games(lines, skip=SKIP_PLIES):
+    """Generate the labeled positions of games.
+
+    Args:
+      lines: JSON lines of batch.play_games results
+      skip: number of plies at the start of each game to leave out
+
+    Returns:
+      generator of (board string, result) tuples.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        game = json.loads(line)
+        if 'error' in game:
+            continue
+        result = RESULTS[game['winner']]
+        for board in game['positions'][skip:]:
+            yield str(board), result
+
+
+def build_dataset(positions, batch_size=BATCH_SIZE):
+    """Compute the features of labeled positions.
+
+    Args:
+      positions: iterable of (board string, result) tuples
+      batch_size: number of positions converted at once
+
+    Returns:
+      tuple of the N x len(FEATURES) int8 feature matrix and the int8
+      array of the results.
+    """
+    features = []
+    results = []
+    boards = []
+    batch_results = []
+
+    def flush():
+        features.append(vector_evaluate.positional_features(
+            vector_evaluate.boards_to_array(boards)))
+        results.append(np.array(batch_results, dtype=np.int8))
+        del boards[:]
+        del batch_results[:]
+
+    for board, result in positions:
+        boards.append(board)
+        batch_results.append(result)
+        if len(boards) == batch_size:
+            flush()
+    flush()
+    return np.concatenate(features), np.concatenate(results)
+
+
+def records_dataset(path, skip=SKIP_PLIES, batch_size=BATCH_SIZE):
+    """build_dataset for a record file.
+
+    Args:
+      path: record file with the RESULT field (and the GAME field for
+        leaving out the start of the games)
+      skip: see read_games
+      batch_size: number of positions converted at once
+
+    Returns:
+      see build_dataset.
+    """
+    with records.RecordReader(path) as reader:
+        if not reader.fields & records.RESULT:
+            raise ValueError('%s has no results' % path)
+        data = reader.array()
+        keep = np.ones(len(data), dtype=bool)
+        if reader.fields & records.GAME and len(data):
+            games = data['game']
+            starts = np.flatnonzero(np.concatenate((
+                [True], games[1:] != games[:-1])))
+            lengths = np.diff(np.append(starts, len(data)))
+            keep = np.arange(len(data)) - np.repeat(starts, lengths) >= skip
+        # Copied out of the file before it is closed.
+        data = data[keep]
+    features = [np.zeros((0, len(positional.FEATURES)), dtype=np.int8)]
+    for i in range(0, len(data), batch_size):
+        batch = data[i:i + batch_size]
+        features.append(vector_evaluate.positional_features(
+            vector_evaluate.bitboards_to_array(
+                batch['black'], batch['red'], batch['kings'])))
+    # -1, 0 and 1 are RED_WIN, UNDECIDED and BLACK_WIN.
+    return (np.concatenate(features),
+            (data['result'] + 1).astype(np.int8))
+
+
+def load_dataset(paths, cache=None, skip=SKIP_PLIES):
+    """The feature matrix and results of the games in files, read from
+    the cache if it is newer than all of them.
+
+    Args:
+      paths: files of games (JSON lines or record files)
+      cache: optional .npz file to read or write
+      skip: see read_games
+
+    Returns:
+      see build_dataset.
+    """
+    if cache is not None and os.path.exists(cache) and all(
+            os.path.getmtime(cache) >= os.path.getmtime(path)
+            for path in paths):
+        with np.load(cache) as data:
+            return data['features'], data['results']
+
+    parts = []
+    for path in paths:
+        if records.is_record_file(path):
+            parts.append(records_dataset(path, skip))
+        else:
+            with open(path) as f:
+                parts.append(build_dataset(read_games(f, skip)))
+    features = np.concatenate([part[0] for part in parts])
+    results = np.concatenate([part[1] for part in parts])
+    if cache is not None:
+        np.savez(cache, features=features, results=results)
+    return features, results
+
+
+def _sigmoid(x):
+    # exp overflows to infinity for hopeless positions, giving 0 as it
+    # should.
+    with np.errstate(over='ignore'):
+        return 1 / (1 + np.exp(-x))
+
+
+def error(features, targets, weights, scale):
+    """Mean squared error of the predicted results.
+
+    Args:
+      features: N x len(FEATURES) float matrix
+      targets: array of N results between 0 and 1
+      weights: array of the weights
+      scale: scale of the evaluation in the sigmoid
+
+    Returns:
+      float.
+    """
+    predictions = _sigmoid(np.float32(scale) * features.dot(
+        np.asarray(weights, dtype=features.dtype)))
+    return float(np.mean((predictions - targets) ** 2))
+
+
+def fit_scale(features, targets, weights, low=1e-4, high=1.0,
+              tolerance=1e-5):
+    """The scale minimizing the error for weights (golden section search
+    between low and high).
+    """
+    ratio = (np.sqrt(5) - 1) / 2
+    a = high - ratio * (high - low)
+    b = low + ratio * (high - low)
+    error_a = error(features, targets, weights, a)
+    error_b = error(features, targets, weights, b)
+    while high - low > tolerance:
+        if error_a < error_b:
+            high, b, error_b = b, a, error_a
+            a = high - ratio * (high - low)
+            error_a = error(features, targets, weights, a)
+        else:
+            low, a, error_a = a, b, error_b
+            b = low + ratio * (high - low)
+            error_b = error(features, targets, weights, b)
+    return (low + high) / 2
+
+
+def tune(features, results, weights=None, scale=None,
+         iterations=ITERATIONS, learning_rate=LEARNING_RATE):
+    """Fit the weights to the results.
+
+    Args:
+      features: N x len(FEATURES) int8 matrix from build_dataset
+      results: array of N results from build_dataset
+      weights: starting weights (by default positional.WEIGHTS)
+      scale: scale of the evaluation in the sigmoid (fitted to the
+        starting weights by default)
+      iterations: number of steps of the optimization (Adam over the
+        whole matrix)
+      learning_rate: size of the steps
+
+    Returns:
+      tuple of the weights (in the order of positional.FEATURES), the
+      scale and the final error.
+    """
+    x = features.astype(np.float32)
+    targets = results.astype(np.float32) / BLACK_WIN
+    w = np.array(positional.WEIGHTS if weights is None else weights,
+                 dtype=np.float64)
+    if scale is None:
+        scale = fit_scale(x, targets, w)
+    m = np.zeros_like(w)
+    v = np.zeros_like(w)
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    for step in range(1, iterations + 1):
+        # The products stay in float32 (a float64 vector would convert
+        # the whole matrix at every step).
+        predictions = _sigmoid(np.float32(scale)
+                               * x.dot(w.astype(np.float32)))
+        residuals = ((predictions - targets) * predictions
+                     * (1 - predictions))
+        gradient = (2 * scale / len(targets)) * x.T.dot(residuals)
+        m = beta1 * m + (1 - beta1) * gradient
+        v = beta2 * v + (1 - beta2) * gradient ** 2
+        w -= (learning_rate * m / (1 - beta1 ** step)
+              / (np.sqrt(v / (1 - beta2 ** step)) + epsilon))
+    return tuple(float(value) for value in w), scale, error(x, targets, w,
+                                                            scale)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Tune the positional evaluation.')
+    parser.add_argument('games', nargs='+',
+                        help='JSON lines of batch.py selfplay or record '
+                        'files')
+    parser.add_argument('--cache', help='.npz file of the feature matrix')
+    parser.add_argument('--weights', default=positional.WEIGHTS_FILE,
+                        help='starting weights')
+    parser.add_argument('--output', default=positional.WEIGHTS_FILE,
+                        help='file to write the weights to')
+    parser.add_argument('--iterations', type=int, default=ITERATIONS)
+    parser.add_argument('--rate', type=float, default=LEARNING_RATE)
+    parser.add_argument('--skip', type=int, default=SKIP_PLIES,
+                        help='opening plies of each game to leave out')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    start = time.time()
+    features, results = load_dataset(args.games, args.cache, args.skip)
+    logging.info('%d positions in %.2fs', len(results), time.time() - start)
+    start = time.time()
+    weights, scale, final_error = tune(
+        features, results, positional.load_weights(args.weights),
+        iterations=args.iterations, learning_rate=args.rate)
+    logging.info('Scale %.5f error %.5f in %.2fs', scale, final_error,
+                 time.time() - start)
+    positional.save_weights([round(w, 2) for w in weights], args.output)
+    for name, weight in zip(positional.FEATURES, weights):
+        print '%-12s %8.2f' % (name, weight)
+
+
+if __name__ == '__main__':
+    main()
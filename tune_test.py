@@ -0,0 +1,112 @@
+"""Tests for the tuning of the positional evaluation."""
+
+__author__ = 'lhurd'
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import bitboard
+import positional
+import records
+import tune
+from vector_evaluate_test import _random_boards
+
+
+def _games(boards, winners):
+    return [json.dumps({'index': i, 'winner': winner, 'moves': len(boards),
+                        'positions': boards})
+            for i, winner in enumerate(winners)]
+
+
+class TuneTest(unittest.TestCase):
+    def test_read_games(self):
+        boards = _random_boards(6)
+        lines = _games(boards, ['black', None]) + [
+            '', json.dumps({'index': 2, 'error': 'oops'})]
+        positions = list(tune.read_games(lines, skip=2))
+        self.assertEqual(8, len(positions))
+        self.assertEqual([(b, tune.BLACK_WIN) for b in boards[2:]],
+                         positions[:4])
+        self.assertEqual(tune.UNDECIDED, positions[-1][1])
+
+    def test_build_dataset(self):
+        boards = _random_boards(25)
+        features, results = tune.build_dataset(
+            [(b, tune.RED_WIN) for b in boards], batch_size=10)
+        self.assertEqual(np.int8, features.dtype)
+        self.assertEqual((25, len(positional.FEATURES)), features.shape)
+        self.assertEqual([positional.features(bitboard.from_string(b))
+                          for b in boards],
+                         [tuple(row) for row in features])
+        self.assertEqual([0] * 25, list(results))
+
+    def test_cache(self):
+        directory = tempfile.mkdtemp()
+        try:
+            games = os.path.join(directory, 'games.jsonl')
+            cache = os.path.join(directory, 'features.npz')
+            with open(games, 'w') as f:
+                f.write('\n'.join(_games(_random_boards(10), ['red'])))
+            features, results = tune.load_dataset([games], cache, skip=0)
+            self.assertTrue(os.path.exists(cache))
+            # The cache is used when it is newer than the games.
+            with open(games, 'w') as f:
+                f.write('')
+            os.utime(games, (0, 0))
+            cached, _ = tune.load_dataset([games], cache, skip=0)
+            np.testing.assert_array_equal(features, cached)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_records_dataset(self):
+        directory = tempfile.mkdtemp()
+        try:
+            games = os.path.join(directory, 'games.jsonl')
+            path = os.path.join(directory, 'games.rec')
+            lines = _games(_random_boards(7), ['black', 'red', None])
+            with open(games, 'w') as f:
+                f.write('\n'.join(lines))
+            records.main(['convert', games, path])
+            expected = tune.load_dataset([games], skip=3)
+            for actual in (tune.records_dataset(path, skip=3, batch_size=5),
+                           tune.load_dataset([path], skip=3)):
+                for array, expected_array in zip(actual, expected):
+                    np.testing.assert_array_equal(expected_array, array)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_tune(self):
+        # Results drawn from a known evaluation are explained by weights
+        # close to it.
+        rng = np.random.RandomState(3)
+        features = rng.randint(-4, 5, (20000, len(positional.FEATURES)))
+        features = features.astype(np.int8)
+        true_weights = np.array([20, 30, 3, 2, 1, 2, 6, -1])
+        probabilities = 1 / (1 + np.exp(-0.02 * features.dot(true_weights)))
+        results = np.where(rng.rand(len(features)) < probabilities,
+                           tune.BLACK_WIN, tune.RED_WIN).astype(np.int8)
+        weights, scale, error = tune.tune(features, results,
+                                          weights=true_weights * 0 + 10,
+                                          scale=0.02, iterations=300,
+                                          learning_rate=0.5)
+        self.assertLess(np.abs(np.array(weights) - true_weights).max(), 3)
+        self.assertLess(error, tune.error(
+            features.astype(np.float32),
+            results.astype(np.float32) / tune.BLACK_WIN,
+            np.full(len(weights), 10.0), scale))
+
+    def test_fit_scale(self):
+        features = np.array([[1], [-1]] * 50, dtype=np.float32)
+        targets = np.array([0.9, 0.1] * 50, dtype=np.float32)
+        # sigmoid(scale * 20) == 0.9
+        self.assertAlmostEqual(np.log(9) / 20, tune.fit_scale(
+            features, targets, np.array([20.0])), places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
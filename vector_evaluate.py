@@ -0,0 +1,175 @@
+"""Evaluation of many positions at once with NumPy.
+
+Positions are given either as an N x 32 int8 array with one column per
+square (1 for b, 2 for B, -1 for r, -2 for R and 0 for empty) or as
+arrays of the black, red and kings masks of bitboard positions.
+
+The evaluation is linear in a vector of per-square values for a man and
+for a king seen from the side of the player that owns it.  A red checker
+on square i counts against black like a black checker on square 31 - i,
+which keeps evaluation(board) == -evaluation(flip(board)) as the
+evaluate module requires.  The default weights give the same values as
+evaluate.evaluate: 20 for a man and 30 for a king on any square.
+"""
+__author__ = 'lhurd'
+
+from collections import namedtuple
+from itertools import chain
+
+import numpy as np
+
+import positional
+from evaluate import INFINITY, NEGATIVE_INFINITY
+from moves import BWD_MOVES, FWD_MOVES
+
+SQUARES = 32
+ROWS = np.arange(SQUARES) // 4
+
+# Per-square shapes from black's side that can be combined into weights.
+ADVANCEMENT = ROWS.astype(np.float64)
+BACK_RANK = (ROWS == 0).astype(np.float64)
+CENTER = np.zeros(SQUARES)
+CENTER[[9, 10, 13, 14, 17, 18, 21, 22]] = 1
+
+PIECE_CODES = {'b': 1, 'B': 2, 'r': -1, 'R': -2}
+CODE_TABLE = np.zeros(256, dtype=np.int8)
+for c, code in PIECE_CODES.items():
+    CODE_TABLE[ord(c)] = code
+
+# Sources and targets of the steps of a man and the backward steps of a
+# king, and for each square the squares in front of it, for
+# positional_features.
+FWD_SOURCES, FWD_TARGETS = (np.array(s) for s in zip(*FWD_MOVES))
+BWD_SOURCES, BWD_TARGETS = (np.array(s) for s in zip(*BWD_MOVES))
+CONES = np.zeros((SQUARES, SQUARES), dtype=np.float32)
+for s, cone in enumerate(positional.CONES):
+    CONES[s, cone] = 1
+
+# Per-square values of a man and of a king.
+Weights = namedtuple('Weights', ['man', 'king'])
+
+
+def make_weights(man=20, king=30, advancement=0, back_rank=0, center=0):
+    """Build weights from material values and positional terms.
+
+    Args:
+      man: value of a man
+      king: value of a king
+      advancement: value of each row a man has advanced
+      back_rank: value of a man guarding its back rank
+      center: value of a checker (man or king) on a center square
+
+    Returns:
+      Weights.
+    """
+    return Weights(man + advancement * ADVANCEMENT + back_rank * BACK_RANK
+                   + center * CENTER,
+                   king + center * CENTER + np.zeros(SQUARES))
+
+DEFAULT_WEIGHTS = make_weights()
+
+
+def boards_to_array(boards):
+    """Convert board strings into an N x 32 int8 array."""
+    if not boards:
+        return np.zeros((0, SQUARES), dtype=np.int8)
+    characters = np.frombuffer(''.join(boards), dtype=np.uint8)
+    return CODE_TABLE[characters].reshape(-1, SQUARES)
+
+
+def bitboards_to_array(black, red, kings):
+    """Convert arrays of bitboard masks into an N x 32 int8 array.
+
+    Args:
+      black: array of the black masks
+      red: array of the red masks
+      kings: array of the kings masks
+
+    Returns:
+      N x 32 int8 array.
+    """
+    shifts = np.arange(SQUARES, dtype=np.uint32)
+
+    def unpack(masks):
+        masks = np.asarray(masks, dtype=np.uint32)
+        return ((masks[:, None] >> shifts) & 1).astype(np.int8)
+
+    king_bits = unpack(kings)
+    return (unpack(black) - unpack(red)) * (1 + king_bits)
+
+
+def positions_to_array(positions):
+    """Convert a sequence of bitboard.Position into an N x 32 int8 array."""
+    masks = np.fromiter(chain.from_iterable(positions), dtype=np.uint32,
+                        count=3 * len(positions)).reshape(-1, 3)
+    return bitboards_to_array(masks[:, 0], masks[:, 1], masks[:, 2])
+
+
+def features(squares):
+    """Net counts of checkers on each square for each side.
+
+    Args:
+      squares: N x 32 int8 array
+
+    Returns:
+      N x 64 int8 array whose first 32 columns are the men and the last
+      32 the kings, each +1 for black and -1 for red (with red squares
+      counted from red's side of the board).
+    """
+    red = squares[:, ::-1]
+    return np.hstack(((squares == 1).astype(np.int8) - (red == -1),
+                      (squares == 2).astype(np.int8) - (red == -2)))
+
+
+def _side_features(squares):
+    """The positional features of the checkers coded as positive."""
+    men = squares == 1
+    kings = squares == 2
+    mine = squares > 0
+    empty = squares == 0
+    # float32 so that the product is done by BLAS.
+    theirs = (squares < 0).astype(np.float32)
+    mobility = ((mine[:, FWD_SOURCES] & empty[:, FWD_TARGETS]).sum(axis=1)
+                + (kings[:, BWD_SOURCES] & empty[:, BWD_TARGETS]).sum(axis=1))
+    blocked = theirs.dot(CONES.T) > 0
+    return np.column_stack((
+        men.sum(axis=1), kings.sum(axis=1),
+        men[:, positional.OPPONENT_HALF_SQUARES].sum(axis=1),
+        men[:, positional.BACK_RANK_SQUARES].sum(axis=1),
+        mine[:, positional.CENTER_SQUARES].sum(axis=1), mobility,
+        (men & ~blocked).sum(axis=1), men.dot(ROWS)))
+
+
+def positional_features(squares):
+    """The features of positional.features for many positions.
+
+    Args:
+      squares: N x 32 int8 array
+
+    Returns:
+      N x len(positional.FEATURES) int8 array (black minus red).
+    """
+    return (_side_features(squares)
+            - _side_features(-squares[:, ::-1])).astype(np.int8)
+
+
+def evaluate_array(squares, weights=DEFAULT_WEIGHTS):
+    """Evaluate many positions at once.
+
+    Args:
+      squares: N x 32 int8 array
+      weights: Weights
+
+    Returns:
+      array of N scores, positive when black has the upper hand.
+    """
+    vector = np.concatenate((weights.man, weights.king))
+    scores = features(squares).dot(vector)
+    scores[~(squares < 0).any(axis=1)] = INFINITY
+    scores[~(squares > 0).any(axis=1)] = NEGATIVE_INFINITY
+    return scores
+
+
+def evaluate_positions(positions, weights=DEFAULT_WEIGHTS):
+    """Evaluate a sequence of bitboard.Position."""
+    return evaluate_array(positions_to_array(positions), weights)
@@ -0,0 +1,70 @@
+"""Tests for the vectorized evaluation."""
+
+__author__ = 'lhurd'
+
+import random
+import unittest
+
+import numpy as np
+
+import bitboard
+import moves
+import positional
+import vector_evaluate
+from evaluate import evaluate
+from moves_test import STARTING_BOARD
+
+
+def _random_boards(count, seed=5):
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = STARTING_BOARD
+        for _ in range(rng.randint(1, 100)):
+            children = moves.find_children(board)
+            if not children:
+                break
+            board = moves.flip(rng.choice(children))
+        boards.append(board)
+    return boards
+
+
+class VectorEvaluateTest(unittest.TestCase):
+    def test_matches_evaluate(self):
+        boards = _random_boards(200) + ['bb' + '-' * 30, 'rr' + '-' * 30]
+        self.assertEqual([evaluate(b) for b in boards],
+                         list(vector_evaluate.evaluate_array(
+                             vector_evaluate.boards_to_array(boards))))
+
+    def test_conversions(self):
+        boards = _random_boards(50)
+        squares = vector_evaluate.boards_to_array(boards)
+        positions = [bitboard.from_string(b) for b in boards]
+        np.testing.assert_array_equal(
+            squares, vector_evaluate.positions_to_array(positions))
+
+    def test_symmetry(self):
+        weights = vector_evaluate.make_weights(advancement=1, back_rank=3,
+                                               center=2)
+        boards = _random_boards(100)
+        scores = vector_evaluate.evaluate_array(
+            vector_evaluate.boards_to_array(boards), weights)
+        flipped = vector_evaluate.evaluate_array(
+            vector_evaluate.boards_to_array([moves.flip(b) for b in boards]),
+            weights)
+        np.testing.assert_array_equal(scores, -flipped)
+        # A man on the back rank is worth its material plus the bonus.
+        self.assertEqual(23, vector_evaluate.evaluate_array(
+            vector_evaluate.boards_to_array(['b' + '-' * 30 + 'R']),
+            weights)[0] + 30)
+
+    def test_positional_features(self):
+        boards = _random_boards(200)
+        self.assertEqual(
+            [positional.features(bitboard.from_string(b)) for b in boards],
+            [tuple(row) for row in vector_evaluate.positional_features(
+                vector_evaluate.boards_to_array(boards))])
+
+
+if __name__ == '__main__':
+    unittest.main()